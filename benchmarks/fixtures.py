@@ -0,0 +1,121 @@
+# benchmarks/fixtures.py
+"""
+Synthetic inputs for the healing benchmarks: HTML pages with N interactive elements,
+a local static server for them, and screenshot-like images for the pure CPU visual tier.
+"""
+import functools
+import os
+import random
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+# The element every benchmark heals: its primary selector is deliberately broken
+TARGET_ID = "login-btn-v2"
+TARGET_TEXT = "Log In"
+BROKEN_SELECTOR = "#login-btn-old"
+TARGET_DESCRIPTION = "log in button"
+
+_WORDS = ["save", "cancel", "open", "close", "settings", "profile", "details", "delete", "archive", "share",
+          "export", "import", "filter", "sort", "next", "previous", "help", "search", "upload", "download"]
+
+_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Synthetic {n}</title>
+<style>
+body {{ font-family: sans-serif; margin: 0; }}
+header {{ display: flex; gap: 12px; padding: 16px; background: #1f2937; }}
+#{target_id} {{ background: #2563eb; color: #fff; border: 0; border-radius: 6px; padding: 10px 22px; font-size: 16px; }}
+main {{ display: grid; grid-template-columns: repeat(8, 1fr); gap: 6px; padding: 12px; }}
+.card {{ border: 1px solid #ddd; padding: 4px; font-size: 12px; }}
+</style></head>
+<body>
+<header id="top-bar"><span style="color:#fff">Synthetic app</span>
+<button id="{target_id}">{target_text}</button></header>
+<main id="grid">
+{elements}
+</main>
+</body></html>
+"""
+
+
+def synthetic_page_html(n_elements: int, seed: int = 0) -> str:
+    """A page with `n_elements` interactive candidates (buttons, links, inputs) plus the login target."""
+    rng = random.Random(seed)
+    elements = []
+    for i in range(n_elements - 1):
+        label = f"{rng.choice(_WORDS).title()} {rng.choice(_WORDS)} {i}"
+        kind = i % 4
+        if kind == 0:
+            elements.append(f'<div class="card"><button data-testid="b{i}">{label}</button></div>')
+        elif kind == 1:
+            elements.append(f'<div class="card"><a href="#i{i}">{label}</a></div>')
+        elif kind == 2:
+            elements.append(f'<div class="card"><input type="button" value="{label}"></div>')
+        else:
+            elements.append(f'<div class="card"><div role="button" tabindex="0">{label}</div></div>')
+    return _PAGE.format(n=n_elements, target_id=TARGET_ID, target_text=TARGET_TEXT, elements="\n".join(elements))
+
+
+def write_fixture_pages(directory: str, sizes: list[int]) -> dict[int, str]:
+    """Writes one synthetic page per size. Returns {size: file name}."""
+    os.makedirs(directory, exist_ok=True)
+    pages = {}
+    for size in sizes:
+        name = f"synthetic_{size}.html"
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(synthetic_page_html(size))
+        pages[size] = name
+    return pages
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_directory(directory: str) -> tuple[ThreadingHTTPServer, str]:
+    """Serves `directory` on a free localhost port from a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="bench-fixtures", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def synthetic_template(width: int = 96, height: int = 40) -> np.ndarray:
+    """Grayscale button-like template: filled rounded box with a text-ish pattern."""
+    template = np.full((height, width), 235, np.uint8)
+    cv2.rectangle(template, (2, 2), (width - 3, height - 3), 70, thickness=-1)
+    cv2.putText(template, "Log In", (12, height // 2 + 6), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 250, 2)
+    return template
+
+
+def synthetic_screenshot(width: int, height: int, template: np.ndarray, seed: int = 0,
+                         distractors: int = 60, scale: float = 1.0) -> tuple[np.ndarray, tuple[int, int]]:
+    """
+    Grayscale "screenshot" with noise, distractor boxes and the template pasted once at `scale`.
+    Returns (image, (center_x, center_y)) of the pasted template.
+    """
+    rng = np.random.default_rng(seed)
+    image = rng.integers(200, 255, size=(height, width), dtype=np.uint8)
+    for _ in range(distractors):
+        x, y = int(rng.integers(0, width - 80)), int(rng.integers(0, height - 30))
+        cv2.rectangle(image, (x, y), (x + int(rng.integers(30, 80)), y + int(rng.integers(12, 30))),
+                      int(rng.integers(60, 200)), thickness=-1)
+    pasted = cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    h, w = pasted.shape
+    x, y = width // 3, height // 4
+    image[y:y + h, x:x + w] = pasted
+    return image, (x + w // 2, y + h // 2)
+
+
+def synthetic_boxes(n: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Clustered candidate boxes (as produced around template matches) and their scores, for NMS."""
+    rng = np.random.default_rng(seed)
+    centers = rng.integers(0, 1800, size=(max(1, n // 25), 2))
+    picks = centers[rng.integers(0, len(centers), size=n)] + rng.integers(-6, 7, size=(n, 2))
+    sizes = rng.integers(40, 120, size=(n, 2))
+    boxes = np.hstack([picks, picks + sizes]).astype(np.float32)
+    scores = rng.uniform(0.7, 1.0, size=n).astype(np.float32)
+    return boxes, scores
@@ -0,0 +1,333 @@
+# benchmarks/healing_bench.py
+"""
+Offline latency/memory benchmarks for every healing tier.
+
+Serves synthetic HTML fixtures (100 – 20,000 interactive elements) from a local server and
+measures, per page size and viewport resolution:
+    find_candidates, try_semantic_fallback, try_visual_fallback, find_locator_with_healing
+plus pure CPU benchmarks that need neither a browser nor the model:
+    non_max_suppression, match_template (visual tier core)
+    registry_open, registry_lookup (compiled locator registry, 100 – 10,000 locators)
+
+Each benchmark reports p50/p95/p99/mean latency and the peak Python allocation (tracemalloc,
+measured in a separate untimed call). Benchmarks whose requirements are missing (no Chromium,
+no semantic model) are recorded as skipped with the reason.
+
+Usage:
+    python benchmarks/healing_bench.py --json bench.json
+    python benchmarks/healing_bench.py --sizes 100,1000 --resolutions 1280x720 --repeat 10 --no-model
+    python benchmarks/healing_bench.py --offline-only --json new.json --compare bench.json
+"""
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.fixtures import (TARGET_ID, BROKEN_SELECTOR, TARGET_DESCRIPTION, write_fixture_pages,
+                                 serve_directory, synthetic_template, synthetic_screenshot, synthetic_boxes)
+
+DEFAULT_SIZES = [100, 1000, 5000, 20000]
+DEFAULT_RESOLUTIONS = [(1280, 720), (1920, 1080), (2560, 1440)]
+DEFAULT_NMS_BOXES = [1000, 10000]
+DEFAULT_REGISTRY_SIZES = [100, 10000]
+
+
+def measure(fn, repeat: int, setup=None, warmup: int = 1, quiet: bool = True) -> dict:
+    """
+    Times `repeat` calls of fn() (after `warmup` untimed calls), then runs it once more under
+    tracemalloc for the peak allocation. `setup` runs untimed before every call.
+    Framework prints are swallowed unless quiet=False, so stdout does not skew the timings.
+    """
+    sink = io.StringIO() if quiet else None
+
+    def call():
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+            start = time.perf_counter()
+            fn()
+            elapsed = (time.perf_counter() - start) * 1000
+        if sink:
+            sink.seek(0)
+            sink.truncate()
+        return elapsed
+
+    for _ in range(warmup):
+        call()
+    timings = np.array([call() for _ in range(repeat)])
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {"runs": repeat, "p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3), "mean_ms": round(float(timings.mean()), 3),
+            "min_ms": round(float(timings.min()), 3), "max_ms": round(float(timings.max()), 3),
+            "peak_alloc_kib": round(peak / 1024, 1)}
+
+
+class Report:
+    def __init__(self):
+        self.results: list[dict] = []
+
+    def add(self, name: str, params: dict, stats: dict):
+        self.results.append({"name": name, "params": params, **stats})
+        label = f"{name} {' '.join(f'{k}={v}' for k, v in params.items())}"
+        print(f"{label:<58} p50 {stats['p50_ms']:9.2f} ms | p95 {stats['p95_ms']:9.2f} ms | "
+              f"p99 {stats['p99_ms']:9.2f} ms | peak {stats['peak_alloc_kib']:9.1f} KiB")
+
+    def skip(self, name: str, params: dict, reason: str):
+        self.results.append({"name": name, "params": params, "skipped": reason})
+        print(f"{name} {' '.join(f'{k}={v}' for k, v in params.items())}: skipped ({reason})")
+
+
+def bench_offline(report: Report, resolutions: list[tuple[int, int]], nms_boxes: list[int], repeat: int):
+    """Pure CPU parts of the visual tier: NMS, screenshot decoding and multi-scale template matching."""
+    import cv2
+    from config import NMS_OVERLAP_THRESHOLD, VISUAL_JPEG_QUALITY
+    from utils.screen_capture import decode_gray
+    from utils.visual_healing import non_max_suppression, match_template, match_with_prior
+    from utils.spatial_prior import SPATIAL_PRIOR
+
+    for n in nms_boxes:
+        boxes, scores = synthetic_boxes(n)
+        report.add("non_max_suppression", {"boxes": n},
+                   measure(lambda: non_max_suppression(boxes, scores, NMS_OVERLAP_THRESHOLD), repeat))
+
+    template = synthetic_template()
+    for width, height in resolutions:
+        screenshot, center = synthetic_screenshot(width, height, template)
+        for fmt, params in (("png", []), ("jpeg", [cv2.IMWRITE_JPEG_QUALITY, VISUAL_JPEG_QUALITY])):
+            encoded = cv2.imencode(f".{fmt}", cv2.cvtColor(screenshot, cv2.COLOR_GRAY2BGR), params)[1].tobytes()
+            report.add("decode_gray", {"resolution": f"{width}x{height}", "format": fmt},
+                       measure(lambda: decode_gray(encoded), repeat))
+        report.add("match_template", {"resolution": f"{width}x{height}"},
+                   measure(lambda: match_template(screenshot, template), repeat))
+        # Same search with a spatial prior: the element was last seen 10 px away
+        (cx, cy), (t_h, t_w) = center, template.shape
+        selector = f"bench-prior-{width}x{height}"
+        SPATIAL_PRIOR.record(selector, {"x": cx - t_w / 2 + 10, "y": cy - t_h / 2, "width": t_w, "height": t_h},
+                             (width, height))
+        report.add("match_with_prior", {"resolution": f"{width}x{height}"},
+                   measure(lambda: match_with_prior(screenshot, template, None, selector), repeat))
+
+
+def bench_registry(report: Report, sizes: list[int], repeat: int, workdir: str):
+    """Opening a compiled locator registry and looking a selector up, at growing catalog sizes."""
+    from utils.locator_registry import LocatorRegistry, compile_registry
+
+    def encode(texts):
+        return np.random.default_rng(len(texts)).random((len(texts), 384), dtype=np.float32)
+
+    for n in sizes:
+        path = os.path.join(workdir, f"registry-{n}.bundle")
+        entries = [{"selector": f"#item-{i}", "description": f"item {i} button",
+                    "template": os.path.join(workdir, "missing.png"), "region": ""} for i in range(n)]
+        compile_registry(entries, path, encode=encode, namespace="bench")
+        report.add("registry_open", {"locators": n}, measure(lambda: LocatorRegistry(path), repeat))
+        registry = LocatorRegistry(path)
+        selector = f"#item-{n // 2}"
+        report.add("registry_lookup", {"locators": n}, measure(lambda: registry.lookup(selector), repeat))
+
+
+def model_available() -> str | None:
+    """None if the semantic model loads, else the reason it does not."""
+    try:
+        from config import get_semantic_model
+        with contextlib.redirect_stderr(io.StringIO()):
+            get_semantic_model()
+        return None
+    except Exception as e:
+        return f"semantic model unavailable: {type(e).__name__}"
+
+
+def bench_browser(report: Report, sizes: list[int], resolutions: list[tuple[int, int]], repeat: int,
+                  model_reason: str | None, workdir: str):
+    """Browser-backed tiers against the synthetic pages served from `workdir`."""
+    names = [("find_candidates", s, None) for s in sizes] + \
+            [("try_semantic_fallback", s, None) for s in sizes] + \
+            [("semantic_full_extraction", s, None) for s in sizes] + \
+            [("try_visual_fallback", sizes[0], r) for r in resolutions] + \
+            [("find_locator_with_healing", s, None) for s in sizes]
+
+    try:
+        from playwright.sync_api import sync_playwright
+        playwright = sync_playwright().start()
+    except Exception as e:
+        for name, size, _ in names:
+            report.skip(name, {"elements": size}, f"playwright unavailable: {type(e).__name__}")
+        return
+    try:
+        browser = playwright.chromium.launch(headless=True)
+    except Exception as e:
+        playwright.stop()
+        for name, size, resolution in names:
+            params = {"elements": size} if resolution is None else {"elements": size, "resolution": "%dx%d" % resolution}
+            report.skip(name, params, f"chromium unavailable: {type(e).__name__}")
+        return
+
+    from config import ELEMENT_MAPPING
+    from utils.actions import find_candidates
+    from utils import semantic_healing
+    from utils.semantic_healing import try_semantic_fallback
+    from utils.visual_healing import try_visual_fallback
+    from utils.heal_cache import HEAL_CACHE
+    from healing_strategy import find_locator_with_healing
+
+    pages = write_fixture_pages(os.path.join(workdir, "pages"), sizes)
+    server, base_url = serve_directory(os.path.join(workdir, "pages"))
+    template_path = os.path.join(workdir, "templates", "login_button.png")
+    os.makedirs(os.path.dirname(template_path), exist_ok=True)
+    # The benchmark target, registered like any other mapped element
+    ELEMENT_MAPPING[BROKEN_SELECTOR] = (TARGET_DESCRIPTION, template_path)
+
+    try:
+        page = browser.new_page(viewport={"width": resolutions[0][0], "height": resolutions[0][1]})
+
+        for size in sizes:
+            page.goto(f"{base_url}/{pages[size]}", wait_until="load")
+            if not os.path.exists(template_path):
+                page.locator(f"#{TARGET_ID}").screenshot(path=template_path)
+            params = {"elements": size}
+
+            report.add("find_candidates", params, measure(lambda: find_candidates(page), repeat))
+
+            if model_reason:
+                report.skip("try_semantic_fallback", params, model_reason)
+                report.skip("semantic_full_extraction", params, model_reason)
+                report.skip("find_locator_with_healing", params, model_reason)
+                continue
+            # Repeated heals on an unchanged page: served by the candidate index after the first one
+            report.add("try_semantic_fallback", params,
+                       measure(lambda: try_semantic_fallback(page, TARGET_DESCRIPTION), repeat))
+            # Same heal without the index: extraction of every candidate on each call
+            index_enabled, semantic_healing.CANDIDATE_INDEX_ENABLED = semantic_healing.CANDIDATE_INDEX_ENABLED, False
+            try:
+                report.add("semantic_full_extraction", params,
+                           measure(lambda: try_semantic_fallback(page, TARGET_DESCRIPTION), repeat))
+            finally:
+                semantic_healing.CANDIDATE_INDEX_ENABLED = index_enabled
+            # Cold heal: every call goes through the probe and the healing tiers
+            report.add("find_locator_with_healing", params,
+                       measure(lambda: find_locator_with_healing(page, BROKEN_SELECTOR), repeat,
+                               setup=HEAL_CACHE.clear))
+
+        page.goto(f"{base_url}/{pages[sizes[0]]}", wait_until="load")
+        for width, height in resolutions:
+            page.set_viewport_size({"width": width, "height": height})
+            report.add("try_visual_fallback", {"elements": sizes[0], "resolution": f"{width}x{height}"},
+                       measure(lambda: try_visual_fallback(page, template_path, None, BROKEN_SELECTOR), repeat))
+    finally:
+        ELEMENT_MAPPING.pop(BROKEN_SELECTOR, None)
+        server.shutdown()
+        browser.close()
+        playwright.stop()
+
+
+def _result_key(result: dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results: list[dict], baseline_path: str):
+    """Prints the p50/p95 ratio of each benchmark against a previous JSON report."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {_result_key(r): r for r in json.load(f)["results"] if "skipped" not in r}
+    print(f"\nCompared with {baseline_path} (ratio > 1 is slower):")
+    for result in results:
+        old = baseline.get(_result_key(result))
+        if "skipped" in result or old is None:
+            continue
+        p50 = result["p50_ms"] / max(old["p50_ms"], 1e-9)
+        p95 = result["p95_ms"] / max(old["p95_ms"], 1e-9)
+        label = f"{result['name']} {' '.join(f'{k}={v}' for k, v in result['params'].items())}"
+        print(f"{label:<58} p50 x{p50:5.2f} | p95 x{p95:5.2f}")
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_resolutions(value: str) -> list[tuple[int, int]]:
+    return [tuple(int(v) for v in item.lower().split("x")) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Interactive elements per synthetic page (comma separated)")
+    parser.add_argument("--resolutions", default=",".join("%dx%d" % r for r in DEFAULT_RESOLUTIONS))
+    parser.add_argument("--nms-boxes", default=",".join(map(str, DEFAULT_NMS_BOXES)))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--offline-only", action="store_true", help="Only the pure CPU benchmarks")
+    parser.add_argument("--no-model", action="store_true", help="Skip benchmarks that need the semantic model")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    resolutions = _parse_resolutions(args.resolutions)
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    # Registered before the framework is imported, so it runs after the framework's own atexit flushes
+    workdir = tempfile.mkdtemp(prefix="heal-bench-")
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    # Keep the benchmark's heal cache, probe history, spatial prior, tier stats, locator registry and debug
+    # images out of the project
+    os.environ.setdefault("HEAL_CACHE_PATH", os.path.join(workdir, "heal_cache.json"))
+    os.environ.setdefault("PRIMARY_HISTORY_PATH", os.path.join(workdir, "probe_history.json"))
+    os.environ.setdefault("SPATIAL_PRIOR_PATH", os.path.join(workdir, "spatial_prior.json"))
+    os.environ.setdefault("TIER_STATS_PATH", os.path.join(workdir, "tier_stats.json"))
+    os.environ.setdefault("LOCATOR_REGISTRY_PATH", os.path.join(workdir, "locators.bundle"))
+    os.chdir(workdir)
+
+    report = Report()
+    bench_offline(report, resolutions, [int(n) for n in args.nms_boxes.split(",") if n], args.repeat)
+    bench_registry(report, DEFAULT_REGISTRY_SIZES, args.repeat, workdir)
+    if not args.offline_only:
+        model_reason = "disabled with --no-model" if args.no_model else model_available()
+        bench_browser(report, sizes, resolutions, args.repeat, model_reason, workdir)
+
+    output = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": report.results,
+    }
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+    if compare_path:
+        compare(report.results, compare_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/import_time.py
+"""
+Measures how long it takes to import the framework's modules in a fresh interpreter.
+
+Usage:
+    python benchmarks/import_time.py                       # config, healing_strategy
+    python benchmarks/import_time.py config --repeat 10 --json import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["config", "healing_strategy"]
+
+
+def measure_import(module: str) -> dict:
+    """
+    Imports `module` in a child process with -X importtime.
+    Returns wall time of the child plus the cumulative import time of the module
+    and whether heavy dependencies (torch, sentence_transformers, groq) were loaded.
+    """
+    probe = (
+        f"import sys; import {module}; "
+        "print(','.join(m for m in ('torch', 'sentence_transformers', 'groq') if m in sys.modules))"
+    )
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    # importtime lines: "import time: self [us] | cumulative | imported package"
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative_us = int(parts[1].strip())
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return {"wall_ms": wall_ms, "import_ms": cumulative_us / 1000, "heavy_modules": heavy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        runs = [measure_import(module) for _ in range(args.repeat)]
+        results[module] = {
+            "import_ms_median": statistics.median(r["import_ms"] for r in runs),
+            "wall_ms_median": statistics.median(r["wall_ms"] for r in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+        }
+        r = results[module]
+        print(f"{module:<20} import {r['import_ms_median']:8.1f} ms | process {r['wall_ms_median']:8.1f} ms"
+              f" | heavy deps loaded: {', '.join(r['heavy_modules']) or 'none'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,71 @@
 # config.py
 import os
+import threading
 from dotenv import load_dotenv
 load_dotenv()
 
-from sentence_transformers import SentenceTransformer
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
-# Load model once (shared across modules)
-SEMANTIC_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
+# Model is loaded once (shared across modules), but only on first use:
+# importing sentence_transformers pulls in torch, which most runs never need.
+SEMANTIC_MODEL_NAME = 'all-MiniLM-L6-v2'
+_semantic_model = None
+_semantic_model_lock = threading.Lock()
+
+
+def get_semantic_model():
+    """Returns the shared SentenceTransformer, loading it on the first call (thread-safe)."""
+    global _semantic_model
+    if _semantic_model is None:
+        with _semantic_model_lock:
+            if _semantic_model is None:
+                from sentence_transformers import SentenceTransformer
+                _semantic_model = SentenceTransformer(SEMANTIC_MODEL_NAME)
+    return _semantic_model
+
+
+def __getattr__(name):
+    # `from config import SEMANTIC_MODEL` keeps working, it just loads the model at that point
+    if name == "SEMANTIC_MODEL":
+        return get_semantic_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Start loading the model (and encoding ELEMENT_MAPPING) in a background thread
+# when the pytest session starts. Off by default: runs where the primary locator
+# never fails should not pay for it.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+TEMPLATE_WARMUP = os.getenv("TEMPLATE_WARMUP", "1") != "0"   # Decode ELEMENT_MAPPING templates at session start
+
+# Browser fixtures (conftest.py): headless Chromium and, per (xdist) worker, a pool of warm
+# contexts whose page is reset between tests instead of being torn down
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "1") != "0"
+BROWSER_SLOW_MO_MS = int(os.getenv("BROWSER_SLOW_MO_MS", "0"))         # e.g. 500 with BROWSER_HEADLESS=0 to watch a run
+CONTEXT_POOL_ENABLED = os.getenv("CONTEXT_POOL_ENABLED", "1") != "0"
+CONTEXT_POOL_SIZE = int(os.getenv("CONTEXT_POOL_SIZE", "0"))           # Contexts per worker; 0 = from CPUs and workers
+CONTEXT_POOL_MAX_PER_WORKER = 1            # A worker runs one test at a time: one context, reused
+CONTEXT_POOL_MAX_USES = 50                 # Tests per context before it is replaced by a fresh one
+STORAGE_STATE_PATH = os.getenv("STORAGE_STATE_PATH") or None           # Playwright storage state (e.g. logged in)
+
+# Semantic-tier encoder (utils/semantic_backends.py): auto | onnx | sentence-transformers
+SEMANTIC_BACKEND = os.getenv("SEMANTIC_BACKEND", "auto")       # auto = onnx when an exported model is present
+SEMANTIC_ONNX_DIR = os.getenv("SEMANTIC_ONNX_DIR", os.path.join(PROJECT_ROOT, "models", "all-MiniLM-L6-v2-onnx"))
+SEMANTIC_ONNX_QUANTIZED = os.getenv("SEMANTIC_ONNX_QUANTIZED", "1") == "1"   # Prefer the int8 model
+SEMANTIC_THREADS = int(os.getenv("SEMANTIC_THREADS", str(min(4, os.cpu_count() or 1))))   # 0 = library default
+SEMANTIC_MAX_SEQ_LENGTH = 256              # Token limit of all-MiniLM-L6-v2
+SEMANTIC_EMBEDDING_DTYPE = os.getenv("SEMANTIC_EMBEDDING_DTYPE", "float16")   # Stored embeddings; scored in float32
+
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None    # e.g. http://127.0.0.1:8765 for utils/lpu_stub_server.py
+
+# Groq LPU tier (off by default)
+LPU_ENABLED = os.getenv("LPU_ENABLED", "0") == "1"
+LPU_MODEL = "llama-3.1-8b-instant"
+LPU_PREFILTER_TOP_K = 15                   # Only the semantically closest candidates go into the prompt
+LPU_TIMEOUT_S = 5.0                        # Per-request timeout of the pooled HTTP client
+LPU_MAX_RETRIES = 1
+LPU_STREAM = os.getenv("LPU_STREAM", "1") == "1"   # Stream the answer and stop reading at the first complete index
+LPU_CACHE_SIZE = 1024                      # (description, candidate-set hash) → answer
+
 # Mapping: primary_selector → (semantic_description, template_path)
 ELEMENT_MAPPING = {
     "#checkout-btn": ("checkout button", "templates/checkout_button_template.png"),
@@ -25,10 +83,55 @@ ELEMENT_MAPPING = {
 }
 
 # Thresholds & settings
+PRIMARY_TIMEOUT_MS = 5000                  # Upper bound for the primary locator to become visible
+PRIMARY_MIN_TIMEOUT_MS = 750               # Lower bound of the learned per-selector budget
+PRIMARY_PROBE_SLICE_MS = 250               # Wait slice between "has the page settled?" checks
+PRIMARY_QUIET_MS = 400                     # DOM without mutations for this long (+ loaded, network idle) = settled
+PRIMARY_HISTORY_PATH = os.getenv("PRIMARY_HISTORY_PATH", os.path.join(PROJECT_ROOT, ".primary_probe_history.json"))
+PRIMARY_POLL_INTERVAL_MS = 100             # Batch probing: delay between visibility sweeps
+PRIMARY_SLOW_AFTER_MS = 500                # Async engine: start racing heal tiers once the primary takes this long
+
+# Action pipeline (utils/action_pipeline.py): steps run on elements healing just resolved, so a step that
+# does not complete within ACTION_TIMEOUT_MS is healed again instead of waited on
+ACTION_TIMEOUT_MS = int(os.getenv("ACTION_TIMEOUT_MS", "3000"))
+ACTION_FUSE_FILLS = os.getenv("ACTION_FUSE_FILLS", "1") != "0"   # Consecutive fills of plain inputs in one evaluate
 SEMANTIC_THRESHOLD = 0.7
 VISUAL_THRESHOLD = 0.50
 SCALES = [0.8, 1.0, 1.2]                   # Multi-scale factors
 NMS_OVERLAP_THRESHOLD = 0.3                # IoU threshold for non-max suppression
+VISUAL_TOP_K = 20                          # Strongest local maxima kept per match map before NMS
+VISUAL_PEAK_WINDOW = 5                     # Neighbourhood (px) a match must dominate to count as a peak
+
+# Visual-tier screenshots (utils/screen_capture.py); decoded straight to grayscale
+VISUAL_SCREENSHOT_FORMAT = os.getenv("VISUAL_SCREENSHOT_FORMAT", "jpeg").lower()  # jpeg | png (lossless, slower)
+VISUAL_JPEG_QUALITY = int(os.getenv("VISUAL_JPEG_QUALITY", "90"))
+VISUAL_CAPTURE = os.getenv("VISUAL_CAPTURE", "playwright").lower()  # playwright | cdp (raw Page.captureScreenshot, Chromium)
+VISUAL_REGION_TIMEOUT_MS = int(os.getenv("VISUAL_REGION_TIMEOUT_MS", "2000"))  # Wait for a region element, then search the full viewport
+
+# Coarse-to-fine (pyramid) visual search: match all scales on a downscaled screenshot,
+# then refine only small windows around the best peaks at full resolution
+PYRAMID_DOWNSCALE = 0.5                    # Factor per pyramid level
+PYRAMID_MAX_LEVELS = 3                     # At most 1/8 resolution for the coarse pass
+PYRAMID_MIN_TEMPLATE_SIDE = 12             # Stop downscaling before the template gets smaller than this (px)
+PYRAMID_MIN_IMAGE_AREA = 200_000           # Smaller screenshots (e.g. regions) are matched at full resolution
+PYRAMID_TOP_PEAKS = 5                      # Coarse peaks refined at full resolution
+PYRAMID_REFINE_MARGIN = 4                  # Extra pixels around each refine window
+PYRAMID_COARSE_SLACK = 0.15                # Coarse scores run lower (blur) → accept peaks this far below threshold
+
+# Embedding cache: LRU of normalized vectors, optionally spilled to disk on eviction
+EMBEDDING_CACHE_SIZE = 4096
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR") or None   # e.g. ".embedding_cache"
+
+# Shared embedding service (utils/embedding_service.py): one process owns the model for all xdist workers
+EMBEDDING_SERVICE = os.getenv("EMBEDDING_SERVICE", "auto")        # auto = only under xdist, 1 = always, 0 = off
+EMBEDDING_SERVICE_SOCKET = os.getenv("EMBEDDING_SERVICE_SOCKET") or None   # set → encode through this service
+EMBEDDING_SERVICE_TIMEOUT_S = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT_S", "120"))   # covers the first model load
+EMBEDDING_SERVICE_BATCH_WINDOW_MS = 5.0    # Requests arriving within this window are encoded as one batch
+EMBEDDING_SERVICE_MAX_BATCH = 256          # ... up to this many strings
+
+# Candidate index: semantic heals reuse per-page candidates and embeddings, kept current by a MutationObserver
+CANDIDATE_INDEX_ENABLED = os.getenv("CANDIDATE_INDEX_ENABLED", "1") != "0"
+CANDIDATE_INDEX_TOP_K = 10                 # Best-scoring candidates checked for visibility per description
 
 # Optional: known regions for visual search (reduces false positives)
 REGION_SELECTORS = {
@@ -36,4 +139,55 @@ REGION_SELECTORS = {
     'button:has-text("Login")': 'nav > div > div > div > div.flex.items-center.gap-2',
     'button:has-text("Sign Up")': 'nav > div > div > div > div.flex.items-center.gap-2',
     # Add more if you know approximate locations
-}
\ No newline at end of file
+}
+
+# Compiled locator registry (utils/locator_registry.py): catalogs too large for the dicts above are
+# compiled into one memory-mapped bundle. Used when the file exists; ELEMENT_MAPPING entries win.
+LOCATOR_REGISTRY_PATH = os.getenv("LOCATOR_REGISTRY_PATH", os.path.join(PROJECT_ROOT, "locators.bundle"))
+
+# Persistent heal cache: (primary selector, URL pattern, DOM fingerprint) → healed selector/coordinates
+HEAL_CACHE_ENABLED = os.getenv("HEAL_CACHE_ENABLED", "1") != "0"
+HEAL_CACHE_PATH = os.getenv("HEAL_CACHE_PATH", os.path.join(PROJECT_ROOT, ".heal_cache.json"))
+HEAL_CACHE_MAX_ENTRIES = 5000
+
+# Spatial prior (utils/spatial_prior.py): where each element was last found, per viewport size.
+# The visual tier searches windows around the expected position before the full frame.
+SPATIAL_PRIOR_ENABLED = os.getenv("SPATIAL_PRIOR_ENABLED", "1") != "0"
+SPATIAL_PRIOR_PATH = os.getenv("SPATIAL_PRIOR_PATH", os.path.join(PROJECT_ROOT, ".spatial_prior.json"))
+SPATIAL_PRIOR_SAMPLES = 10                 # Positions kept per selector and viewport size
+SPATIAL_PRIOR_WINDOWS = [3, 8]             # Window sizes tried, in multiples of the element size
+SPATIAL_PRIOR_PRIMARY_REFRESH_S = 60       # Primary successes record a position at most this often per selector
+
+# Tier scheduler (utils/tier_scheduler.py): per page and selector, heal tiers run in order of
+# expected cost to success; tiers that keep failing run only after every other tier missed
+TIER_SCHEDULER_ENABLED = os.getenv("TIER_SCHEDULER_ENABLED", "1") != "0"
+TIER_STATS_PATH = os.getenv("TIER_STATS_PATH", os.path.join(PROJECT_ROOT, ".tier_stats.json"))
+TIER_STATS_DECAY = 0.9                     # Weight of the past per new attempt: recent runs dominate
+TIER_DEMOTE_MIN_SAMPLES = 5                # Attempts before a tier can be demoted to last resort
+TIER_DEMOTE_SUCCESS_RATE = 0.1             # Demote below this (decayed) success rate
+TIER_DEFAULT_COST_MS = {"lpu": 1500.0, "semantic": 300.0, "visual": 400.0}   # Before any history exists
+
+# Telemetry: per-tier spans of every heal (utils/telemetry.py), summarized at the end of a pytest session
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") != "0"
+TELEMETRY_MAX_TRACES = 10000               # Heal traces kept in memory for export
+TELEMETRY_JSONL_PATH = os.getenv("TELEMETRY_JSONL_PATH") or None        # Append traces here at session end
+TELEMETRY_METRICS_PATH = os.getenv("TELEMETRY_METRICS_PATH") or None    # Write OpenMetrics text here at session end
+
+# Artifacts: debug images with the visual click marker (opt-in), written by a background thread
+# into ARTIFACTS_DIR/<timestamp>-<pid>/debug/. Auto-captured templates use the same writer.
+ARTIFACTS_ENABLED = os.getenv("ARTIFACTS_ENABLED", "0") == "1"
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", os.path.join(PROJECT_ROOT, "artifacts"))
+ARTIFACT_SAMPLE_RATE = float(os.getenv("ARTIFACT_SAMPLE_RATE", "1.0"))   # Fraction of visual heals that save one
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "jpg")                     # jpg | png | webp
+ARTIFACT_JPEG_QUALITY = 80                 # Also used for webp
+ARTIFACT_PNG_COMPRESSION = 1               # Fast PNG encoding (templates, ARTIFACT_FORMAT=png)
+ARTIFACT_CROP_PX = int(os.getenv("ARTIFACT_CROP_PX", "0"))               # >0: save only this radius around the marker
+ARTIFACT_QUEUE_SIZE = 64                   # Pending writes; optional artifacts are dropped beyond this
+
+# Heal recorder (opt-in): each heal is archived as one .npz case (DOM candidates, viewport screenshot,
+# template, outcome, tier latencies) for offline replay with `python -m utils.heal_replay run`
+HEAL_RECORD_ENABLED = os.getenv("HEAL_RECORD_ENABLED", "0") == "1"
+HEAL_RECORD_DIR = os.getenv("HEAL_RECORD_DIR", os.path.join(PROJECT_ROOT, "heal_corpus"))
+HEAL_RECORD_PRIMARY = os.getenv("HEAL_RECORD_PRIMARY", "0") == "1"        # Also record primary successes (exact labels)
+HEAL_RECORD_SAMPLE_RATE = float(os.getenv("HEAL_RECORD_SAMPLE_RATE", "1.0"))
+REPLAY_TOLERANCE_PX = 4                    # Replayed point may miss the expected element box by this much
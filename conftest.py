@@ -1,19 +1,123 @@
 # conftest.py (in project root)
+import logging
+import os
+import threading
+
 import pytest
 from playwright.sync_api import sync_playwright, Page
+from config import (MODEL_WARMUP, TEMPLATE_WARMUP, ELEMENT_MAPPING, TELEMETRY_JSONL_PATH, TELEMETRY_METRICS_PATH,
+                    EMBEDDING_SERVICE, EMBEDDING_SERVICE_SOCKET, BROWSER_HEADLESS, BROWSER_SLOW_MO_MS,
+                    CONTEXT_POOL_ENABLED, CONTEXT_POOL_MAX_USES, STORAGE_STATE_PATH)
+
+logger = logging.getLogger(__name__)
+_embedding_service = None
+
+
+def pytest_configure(config):
+    """
+    Starts the shared embedding service once, on the xdist controller (or the single process
+    with EMBEDDING_SERVICE=1). Workers inherit EMBEDDING_SERVICE_SOCKET and never load the model.
+    """
+    global _embedding_service
+    if hasattr(config, "workerinput") or EMBEDDING_SERVICE_SOCKET or EMBEDDING_SERVICE == "0":
+        return
+    if EMBEDDING_SERVICE != "1" and not config.getoption("numprocesses", default=None):
+        return
+    from utils.embedding_service import start_service_process, connect
+    try:
+        _embedding_service, socket_path = start_service_process(warm=MODEL_WARMUP)
+    except Exception as e:
+        logger.warning(f"Embedding service not started ({e}) → workers load their own model")
+        return
+    os.environ["EMBEDDING_SERVICE_SOCKET"] = socket_path     # inherited by xdist workers
+    connect(socket_path)                                      # this process, when not distributed
+
+
+def pytest_unconfigure(config):
+    global _embedding_service
+    if _embedding_service is not None:
+        from utils.embedding_service import stop_service_process
+        stop_service_process(_embedding_service)
+        _embedding_service = None
+
+
+@pytest.fixture(scope="session", autouse=True)
+def heal_warm_up():
+    """
+    Warms the healing tiers in the background while the browser starts: decodes the
+    ELEMENT_MAPPING templates (TEMPLATE_WARMUP=1, default) and loads the semantic model (MODEL_WARMUP=1).
+    """
+    if TEMPLATE_WARMUP:
+        from utils.template_store import TEMPLATE_STORE
+        threading.Thread(target=TEMPLATE_STORE.preload, args=([path for _, path in ELEMENT_MAPPING.values()],),
+                         name="template-warm-up", daemon=True).start()
+    if MODEL_WARMUP:
+        from utils.semantic_healing import start_warm_up_thread
+        start_warm_up_thread()
+    yield
 
 
 @pytest.fixture(scope="session")
 def browser():
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False, slow_mo=500)
+        browser = p.chromium.launch(headless=BROWSER_HEADLESS, slow_mo=BROWSER_SLOW_MO_MS)
         yield browser
         browser.close()
 
 
+@pytest.fixture(scope="session")
+def context_pool(browser):
+    """Warm contexts for this process (one pool per xdist worker), see utils/context_pool.py."""
+    from utils.context_pool import ContextPool, pool_size
+    pool = ContextPool(browser, pool_size(), STORAGE_STATE_PATH, CONTEXT_POOL_MAX_USES)
+    pool.warm()
+    yield pool
+    logger.info(pool.summary())
+    pool.close()
+
+
 @pytest.fixture(scope="function")
-def page(browser):
-    context = browser.new_context()
-    page = context.new_page()
-    yield page
-    context.close()
\ No newline at end of file
+def page(request, browser):
+    """A pooled page, reset after the test (CONTEXT_POOL_ENABLED=0: a fresh context per test)."""
+    if not CONTEXT_POOL_ENABLED:
+        context = browser.new_context(storage_state=STORAGE_STATE_PATH)
+        page = context.new_page()
+        yield page
+        context.close()
+        return
+    pool = request.getfixturevalue("context_pool")
+    pooled = pool.acquire()
+    yield pooled.page
+    pool.release(pooled)
+
+
+def pytest_sessionfinish(session):
+    """xdist worker: hands this process's telemetry to the controller (see pytest_testnodedown)."""
+    if hasattr(session.config, "workeroutput"):
+        from utils.telemetry import TELEMETRY
+        session.config.workeroutput["telemetry"] = TELEMETRY.aggregates()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    """xdist controller: merges a finished worker's telemetry, so the session summary covers every worker."""
+    aggregates = getattr(node, "workeroutput", {}).get("telemetry")
+    if aggregates:
+        from utils.telemetry import TELEMETRY
+        TELEMETRY.merge(aggregates)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Per-tier healing summary of the session (all xdist workers), plus the optional JSONL / OpenMetrics exports."""
+    from utils.telemetry import TELEMETRY
+    if hasattr(config, "workeroutput") or not TELEMETRY.heals:
+        return                                    # workers report through the controller
+    terminalreporter.section("self-healing telemetry")
+    terminalreporter.write_line(TELEMETRY.summary())
+    if TELEMETRY_JSONL_PATH:
+        count = TELEMETRY.export_jsonl(TELEMETRY_JSONL_PATH)
+        terminalreporter.write_line(f"{count} heal traces appended to {TELEMETRY_JSONL_PATH}")
+    if TELEMETRY_METRICS_PATH:
+        with open(TELEMETRY_METRICS_PATH, "w", encoding="utf-8") as f:
+            f.write(TELEMETRY.openmetrics())
+        terminalreporter.write_line(f"OpenMetrics written to {TELEMETRY_METRICS_PATH}")
@@ -1,63 +1,286 @@
 # healing_strategy.py
-from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
-from config import ELEMENT_MAPPING, REGION_SELECTORS
-from utils.semantic_healing import try_semantic_fallback
-from utils.visual_healing import try_visual_fallback, get_or_capture_template
-from utils.groq_lpu_healing import try_lpu_healing
+import logging
+import time
+from playwright.sync_api import Page
+from config import PRIMARY_POLL_INTERVAL_MS, LPU_ENABLED
+from utils.locator_registry import LOCATORS, REGIONS
+from utils.semantic_healing import find_semantic_match, find_semantic_matches
+from utils.visual_healing import try_visual_fallback, try_visual_fallback_batch, ensure_template_captured
+from utils.groq_lpu_healing import find_lpu_match, find_lpu_matches
+from utils.heal_cache import heal_cache_key, heal_cache_keys, lookup_healed, remember_heal
+from utils.primary_probe import probe_primary, page_settled, PROBE_HISTORY
+from utils.spatial_prior import SPATIAL_PRIOR
+from utils.tier_scheduler import TIER_SCHEDULER
+from utils.telemetry import TELEMETRY
+from utils.heal_recorder import HEAL_RECORDER
 
+logger = logging.getLogger(__name__)
+
+@HEAL_RECORDER.recorded
+@TELEMETRY.traced
 def find_locator_with_healing(page: Page, primary_selector: str) -> dict | None:
     """
     Multi-tier healing strategy:
     1. Primary locator
-    2. Semantic fallback
-    3. Visual fallback (multi-scale + NMS)
+    2. Heal cache (previous heal of this selector on the same page)
+    3. Fallback tiers, in the order TIER_SCHEDULER learned for this selector on this page
+       (before any history, by TIER_DEFAULT_COST_MS: semantic fallback, visual fallback,
+       LPU fallback (LPU_ENABLED=1))
+
+    Each tier attempt is recorded as a telemetry span (utils/telemetry.py).
     """
-    if primary_selector not in ELEMENT_MAPPING:
+    if primary_selector not in LOCATORS:
         raise ValueError(f"No mapping defined for selector: {primary_selector}")
 
-    semantic_desc, template_path = ELEMENT_MAPPING[primary_selector]
-    region_selector = REGION_SELECTORS.get(primary_selector)
-
-    print(f"Attempting primary locator: {primary_selector}")
-
-    try:
-        locator = page.locator(primary_selector)
-        get_or_capture_template(page, primary_selector, template_path)
-        locator.wait_for(state="visible", timeout=5000)
-        print("→ Success with primary locator!")
-        return {'type': 'locator', 'value': locator}
-    except PlaywrightTimeoutError:
-        print("→ Primary failed → semantics fallback...")
-
-    # # LPU Locator
-    # lpu_locator = try_lpu_healing(page, semantic_desc)
-    # if lpu_locator:
-    #     try:
-    #         print("→ Success with semantic fallback! Locator is: ", lpu_locator)
-    #         return {'type': 'locator', 'value': lpu_locator}
-    #     except Exception as e:
-    #         print(f"Click failed even after semantic match: {e}")
-    #
-    # print("→ lpu failed → visual fallback...")
-
-
-    # Semantic fallback
-    semantic_locator = try_semantic_fallback(page, semantic_desc)
-    if semantic_locator:
-        try:
-            print("→ Success with semantic fallback!")
-            return {'type': 'locator', 'value': semantic_locator}
-        except Exception as e:
-            print(f"Click failed even after semantic match: {e}")
-
-    print("→ Semantic failed → visual fallback...")
-
-    # Visual fallback
-    visual_result = try_visual_fallback(page, template_path, region_selector, primary_selector)
-    if visual_result:
-        print("→ Success with visual fallback!")
-        return visual_result
-
-    print("→ All fallbacks failed.")
-    # return False
-    return None
\ No newline at end of file
+    semantic_desc, template_path = LOCATORS[primary_selector]
+    region_selector = REGIONS.get(primary_selector)
+
+    logger.info(f"Attempting primary locator: {primary_selector}")
+
+    with TELEMETRY.span("primary") as span:
+        locator = probe_primary(page, primary_selector)
+        if locator is not None:
+            span.found()
+    if locator is not None:
+        logger.info("→ Success with primary locator!")
+        ensure_template_captured(locator, template_path)
+        SPATIAL_PRIOR.record_primary(primary_selector, locator, page.viewport_size)
+        return {'type': 'locator', 'value': locator, 'tier': 'primary', 'verified': True}
+
+    logger.info("→ Primary failed → checking heal cache...")
+
+    # Heal cache
+    with TELEMETRY.span("heal_cache") as span:
+        cache_key = heal_cache_key(page, primary_selector)
+        cached_result = lookup_healed(page, cache_key)
+        if cached_result:
+            span.found()
+    if cached_result:
+        return cached_result
+
+    logger.info("→ No cached heal → fallback tiers...")
+
+    tiers = {"semantic": lambda: _semantic_tier(page, primary_selector, semantic_desc, cache_key),
+             "visual": lambda: _visual_tier(page, primary_selector, template_path, region_selector, cache_key)}
+    if LPU_ENABLED:
+        tiers = {"lpu": lambda: _lpu_tier(page, semantic_desc, cache_key), **tiers}
+    result = _run_scheduled(page, primary_selector, tiers)
+    if result is None:
+        logger.warning("→ All fallbacks failed.")
+    return result
+
+
+def _run_scheduled(page: Page, primary_selector: str, tiers: dict) -> dict | None:
+    """
+    Runs the fallback tiers {name: callable} in TIER_SCHEDULER order, then the ones it demoted
+    as predictably failing. Every attempt feeds the scheduler's statistics.
+    """
+    scheduled, last_resort = TIER_SCHEDULER.order(page.url, primary_selector, list(tiers))
+    for tier in scheduled + last_resort:
+        if tier in last_resort:
+            logger.info(f"→ Trying {tier} as a last resort")
+        start = time.perf_counter()
+        result = tiers[tier]()
+        TIER_SCHEDULER.record(page.url, primary_selector, tier, result is not None,
+                              (time.perf_counter() - start) * 1000, result.get('score') if result else None)
+        if result:
+            return result
+        logger.info(f"→ {tier} fallback failed")
+    return None
+
+
+def _lpu_tier(page: Page, semantic_desc: str, cache_key: str | None) -> dict | None:
+    # LPU fallback (enable with LPU_ENABLED=1)
+    with TELEMETRY.span("lpu") as span:
+        lpu_match = find_lpu_match(page, semantic_desc)
+        if lpu_match:
+            span.found()
+    if not lpu_match:
+        return None
+    logger.info(f"→ Success with LPU fallback! Locator is: {lpu_match['selector']}")
+    result = {'type': 'locator', 'value': page.locator(lpu_match['selector']).first,
+              'selector': lpu_match['selector'], 'tier': 'lpu', 'verified': True}
+    remember_heal(page, cache_key, result, tier="lpu")
+    return result
+
+
+def _semantic_tier(page: Page, primary_selector: str, semantic_desc: str, cache_key: str | None) -> dict | None:
+    with TELEMETRY.span("semantic") as span:
+        semantic_match = find_semantic_match(page, semantic_desc)
+        if semantic_match:
+            span.found()
+    if not semantic_match:
+        return None
+    logger.info("→ Success with semantic fallback!")
+    SPATIAL_PRIOR.record(primary_selector, semantic_match['box'], page.viewport_size)
+    result = {'type': 'locator', 'value': page.locator(semantic_match['selector']).first,
+              'selector': semantic_match['selector'], 'score': semantic_match['score'], 'tier': 'semantic',
+              'verified': True}
+    remember_heal(page, cache_key, result, tier="semantic")
+    return result
+
+
+def _visual_tier(page: Page, primary_selector: str, template_path: str, region_selector: str | None,
+                 cache_key: str | None) -> dict | None:
+    with TELEMETRY.span("visual") as span:
+        visual_result = try_visual_fallback(page, template_path, region_selector, primary_selector)
+        if visual_result:
+            span.found()
+    if not visual_result:
+        return None
+    logger.info("→ Success with visual fallback!")
+    visual_result['tier'] = 'visual'
+    remember_heal(page, cache_key, visual_result, tier="visual")
+    return visual_result
+
+
+def find_locators_with_healing(page: Page, primary_selectors: list[str]) -> dict[str, dict | None]:
+    """
+    Batch version of find_locator_with_healing for many selectors on one page.
+
+    1. Primary locators are probed together and share one PRIMARY_TIMEOUT_MS budget
+    2. Heal cache lookups share one DOM fingerprint
+    3. Semantic fallback: one candidate extraction + one batched encode for all failures
+    4. Visual fallback: one viewport screenshot matched against every remaining template
+    5. LPU fallback (LPU_ENABLED=1): one candidate extraction, one LPU request per failure
+    Steps 3 to 5 run in each selector's TIER_SCHEDULER order, grouped per tier.
+
+    Returns {primary_selector: result or None}, with the same result dicts as the single version.
+    The whole batch is one telemetry trace, with one span per tier.
+    """
+    selectors = list(dict.fromkeys(primary_selectors))
+    for selector in selectors:
+        if selector not in LOCATORS:
+            raise ValueError(f"No mapping defined for selector: {selector}")
+
+    with TELEMETRY.heal(f"batch[{len(selectors)}]") as trace:
+        results = _heal_batch(page, selectors)
+        if trace is not None:
+            trace.tier = "batch"
+    return results
+
+
+def _semantic_batch(page: Page, selectors: list[str], cache_keys: dict, results: dict):
+    """Semantic fallback for several selectors: one candidate extraction + one batched encode."""
+    with TELEMETRY.span("semantic", selectors=len(selectors)) as span:
+        semantic_matches = find_semantic_matches(page, [LOCATORS[selector][0] for selector in selectors])
+        for selector, match in zip(selectors, semantic_matches):
+            if match:
+                SPATIAL_PRIOR.record(selector, match['box'], page.viewport_size)
+                result = {'type': 'locator', 'value': page.locator(match['selector']).first,
+                          'selector': match['selector'], 'score': match['score'], 'tier': 'semantic',
+                          'verified': True}
+                remember_heal(page, cache_keys[selector], result, tier="semantic")
+                results[selector] = result
+        resolved = sum(1 for match in semantic_matches if match)
+        if resolved:
+            span.found(resolved=resolved)
+
+
+def _lpu_batch(page: Page, selectors: list[str], cache_keys: dict, results: dict):
+    """LPU fallback for several selectors: one candidate extraction for all descriptions."""
+    with TELEMETRY.span("lpu", selectors=len(selectors)) as span:
+        lpu_matches = find_lpu_matches(page, [LOCATORS[selector][0] for selector in selectors])
+        for selector, match in zip(selectors, lpu_matches):
+            if match:
+                result = {'type': 'locator', 'value': page.locator(match['selector']).first,
+                          'selector': match['selector'], 'tier': 'lpu', 'verified': True}
+                remember_heal(page, cache_keys[selector], result, tier="lpu")
+                results[selector] = result
+        resolved = sum(1 for match in lpu_matches if match)
+        if resolved:
+            span.found(resolved=resolved)
+
+
+def _visual_batch(page: Page, selectors: list[str], cache_keys: dict, results: dict):
+    """Visual fallback for several selectors: one viewport screenshot for all templates."""
+    with TELEMETRY.span("visual", selectors=len(selectors)) as span:
+        visual_results = try_visual_fallback_batch(
+            page, [(selector, LOCATORS[selector][1], REGIONS.get(selector)) for selector in selectors])
+        for selector, visual_result in visual_results.items():
+            if visual_result:
+                visual_result['tier'] = 'visual'
+                remember_heal(page, cache_keys[selector], visual_result, tier="visual")
+                results[selector] = visual_result
+        resolved = sum(1 for visual_result in visual_results.values() if visual_result)
+        if resolved:
+            span.found(resolved=resolved)
+
+
+def _heal_batch(page: Page, selectors: list[str]) -> dict[str, dict | None]:
+    results: dict[str, dict | None] = {selector: None for selector in selectors}
+
+    # Primary locators: sweep all pending selectors until they are visible, the page settles
+    # without them, or the largest learned budget among them runs out
+    logger.info(f"Attempting {len(selectors)} primary locators")
+    pending = selectors
+    with TELEMETRY.span("primary", selectors=len(selectors)) as span:
+        start = time.monotonic()
+        deadline = start + max(PROBE_HISTORY.timeout_for(selector) for selector in selectors) / 1000
+        while pending:
+            still_pending = []
+            for selector in pending:
+                locator = page.locator(selector).first
+                if locator.is_visible():
+                    PROBE_HISTORY.record(selector, (time.monotonic() - start) * 1000)
+                    ensure_template_captured(locator, LOCATORS[selector][1])
+                    SPATIAL_PRIOR.record_primary(selector, locator, page.viewport_size)
+                    results[selector] = {'type': 'locator', 'value': locator, 'tier': 'primary', 'verified': True}
+                else:
+                    still_pending.append(selector)
+            pending = still_pending
+            if not pending or time.monotonic() >= deadline or page_settled(page):
+                break
+            page.wait_for_timeout(PRIMARY_POLL_INTERVAL_MS)
+        for selector in pending:
+            PROBE_HISTORY.record(selector, None)
+        if len(pending) < len(selectors):
+            span.found(resolved=len(selectors) - len(pending))
+
+    logger.info(f"→ {len(selectors) - len(pending)} found with primary locators, {len(pending)} to heal")
+    if not pending:
+        return results
+
+    # Heal cache
+    with TELEMETRY.span("heal_cache", selectors=len(pending)) as span:
+        cache_keys = heal_cache_keys(page, pending)
+        for selector in pending:
+            results[selector] = lookup_healed(page, cache_keys[selector])
+        resolved = sum(1 for selector in pending if results[selector] is not None)
+        if resolved:
+            span.found(resolved=resolved)
+    pending = [selector for selector in pending if results[selector] is None]
+    if not pending:
+        return results
+
+    # Fallback tiers in rounds: every pending selector moves on to the next tier of its own
+    # TIER_SCHEDULER order, and selectors on the same tier share one batched call
+    batch_tiers = {"semantic": _semantic_batch, "visual": _visual_batch}
+    if LPU_ENABLED:
+        batch_tiers = {"lpu": _lpu_batch, **batch_tiers}
+    plans = {}
+    for selector in pending:
+        scheduled, last_resort = TIER_SCHEDULER.order(page.url, selector, list(batch_tiers))
+        plans[selector] = scheduled + last_resort
+    for round_index in range(len(batch_tiers)):
+        groups: dict[str, list[str]] = {}
+        for selector in pending:
+            groups.setdefault(plans[selector][round_index], []).append(selector)
+        for tier, group in groups.items():
+            if round_index:
+                logger.info(f"→ {len(group)} still unresolved → {tier} fallback...")
+            start = time.perf_counter()
+            batch_tiers[tier](page, group, cache_keys, results)
+            share_ms = (time.perf_counter() - start) * 1000 / len(group)
+            for selector in group:
+                result = results[selector]
+                TIER_SCHEDULER.record(page.url, selector, tier, result is not None, share_ms,
+                                      result.get('score') if result else None)
+        pending = [selector for selector in pending if results[selector] is None]
+        if not pending:
+            break
+
+    failed = [selector for selector in selectors if results[selector] is None]
+    if failed:
+        logger.warning(f"→ All fallbacks failed for: {', '.join(failed)}")
+    return results
@@ -0,0 +1,203 @@
+# healing_strategy_async.py
+import asyncio
+import contextvars
+import logging
+import time
+from playwright.async_api import Page, Locator, TimeoutError as PlaywrightTimeoutError
+from config import PRIMARY_SLOW_AFTER_MS, HEAL_CACHE_ENABLED, CANDIDATE_INDEX_ENABLED
+from utils.dom_candidates import extract_candidates_async
+from utils.locator_registry import LOCATORS, REGIONS
+from utils.candidate_index import index_for
+from utils.semantic_healing import rank_candidates, rank_indexed, report_matches, hidden_top_k
+from utils.visual_healing import locate_in_viewport, capture_template_async
+from utils.screen_capture import decode_gray, capture_bytes_async, region_rect_async
+from utils.template_store import TEMPLATE_STORE
+from utils.heal_cache import HEAL_CACHE
+from utils.primary_probe import PROBE_HISTORY
+from utils.spatial_prior import SPATIAL_PRIOR
+from utils.tier_scheduler import TIER_SCHEDULER
+from utils.telemetry import TELEMETRY
+from utils.heal_recorder import HEAL_RECORDER
+
+logger = logging.getLogger(__name__)
+
+# When several tiers finish in the same event-loop turn, prefer the most reliable one
+_TIER_PRIORITY = {"primary": 0, "semantic": 1, "visual": 2}
+
+
+async def _primary_tier(locator: Locator, primary_selector: str, template_path: str) -> dict | None:
+    locator = locator.first     # what was waited on; the unqualified locator is strict on several matches
+    with TELEMETRY.span("primary") as span:
+        budget_ms = PROBE_HISTORY.timeout_for(primary_selector)
+        span.set(budget_ms=budget_ms)
+        start = time.perf_counter()
+        try:
+            await locator.wait_for(state="visible", timeout=budget_ms)
+        except PlaywrightTimeoutError:
+            logger.info("→ Primary locator timed out")
+            PROBE_HISTORY.record(primary_selector, None)
+            return None
+        PROBE_HISTORY.record(primary_selector, (time.perf_counter() - start) * 1000)
+        span.found()
+    logger.info("→ Success with primary locator!")
+    await SPATIAL_PRIOR.record_primary_async(primary_selector, locator, locator.page.viewport_size)
+    if not TEMPLATE_STORE.has(template_path):
+        try:
+            TEMPLATE_STORE.capture_async(template_path, await locator.screenshot(type="png"))
+        except Exception as e:
+            logger.warning(f"Auto-capture failed: {e}")
+    return {'type': 'locator', 'value': locator, 'tier': 'primary', 'verified': True}
+
+
+def _in_executor(func, *args):
+    """run_in_executor that keeps the current telemetry span visible to `func`."""
+    return asyncio.get_running_loop().run_in_executor(None, contextvars.copy_context().run, func, *args)
+
+
+async def _indexed_semantic_match(page: Page, semantic_desc: str) -> dict | None | bool:
+    """
+    Semantic match through the page's candidate index; False if the index is unusable, or if
+    none of its top-k candidates is visible (a visible one may rank lower).
+    """
+    try:
+        index = index_for(page)
+        TELEMETRY.annotate(index_changes=await index.sync_async(page))
+        ranked = await _in_executor(rank_indexed, index, [semantic_desc])
+        matches = report_matches([semantic_desc], index.pick(ranked, await index.resolve_async(page, ranked)))
+        return False if hidden_top_k(ranked, matches) else matches[0]
+    except Exception as e:
+        logger.warning(f"Candidate index unavailable ({e}) → full extraction")
+        return False
+
+
+async def _semantic_tier(page: Page, semantic_desc: str, primary_selector: str) -> dict | None:
+    with TELEMETRY.span("semantic") as span:
+        # Browser round trips on the loop, the embedding work off it
+        match = await _indexed_semantic_match(page, semantic_desc) if CANDIDATE_INDEX_ENABLED else False
+        if match is False:
+            records = await extract_candidates_async(page, visible_only=True)
+            match = (await _in_executor(rank_candidates, records, [semantic_desc]))[0]
+        if match is None:
+            return None
+        span.found()
+    logger.info("→ Success with semantic fallback!")
+    SPATIAL_PRIOR.record(primary_selector, match['box'], page.viewport_size)
+    return {'type': 'locator', 'value': page.locator(match['selector']).first,
+            'selector': match['selector'], 'score': match['score'], 'tier': 'semantic', 'verified': True}
+
+
+async def _visual_tier(page: Page, template_path: str, region_selector: str | None,
+                       primary_selector: str) -> dict | None:
+    with TELEMETRY.span("visual") as span:
+        # Screenshot and region lookup run concurrently; decode + template matching run in an executor
+        screenshot = capture_bytes_async(page)
+        if region_selector:
+            screenshot_bytes, region_box = await asyncio.gather(
+                screenshot, region_rect_async(page, region_selector))
+            if not region_box:
+                logger.info("→ Region not visible in the viewport — searching the full viewport")
+        else:
+            screenshot_bytes, region_box = await screenshot, None
+
+        # Missing template: auto-captured from the primary element, like the sync tiers
+        template_png = None if TEMPLATE_STORE.has(template_path) else \
+            await capture_template_async(page, primary_selector)
+
+        def locate():
+            template_gray = TEMPLATE_STORE.put_captured(template_path, template_png) if template_png else None
+            return locate_in_viewport(decode_gray(screenshot_bytes), template_path, region_box, primary_selector,
+                                      page.viewport_size, template_gray)
+
+        result = await _in_executor(locate)
+        if result is None:
+            return None
+        span.found()
+    logger.info(f"→ Success with visual fallback! ({result['x']}, {result['y']}) | Score: {result['score']:.3f}")
+    return {**result, 'tier': 'visual'}
+
+
+async def _scheduled_attempt(page: Page, primary_selector: str, tier: str, attempt) -> dict | None:
+    """Awaits one tier attempt and feeds its outcome to TIER_SCHEDULER (cancelled attempts are not counted)."""
+    start = time.perf_counter()
+    try:
+        result = await attempt
+    except Exception:
+        TIER_SCHEDULER.record(page.url, primary_selector, tier, False, (time.perf_counter() - start) * 1000)
+        raise
+    TIER_SCHEDULER.record(page.url, primary_selector, tier, bool(result), (time.perf_counter() - start) * 1000,
+                          result.get('score') if result else None)
+    return result
+
+
+@HEAL_RECORDER.recorded
+@TELEMETRY.traced
+async def find_locator_with_healing_async(page: Page, primary_selector: str) -> dict | None:
+    """
+    Async-API version of healing_strategy.find_locator_with_healing.
+
+    The primary locator gets PRIMARY_SLOW_AFTER_MS to show up on its own. After that the
+    heal cache is checked, then the semantic and visual tiers start concurrently while the
+    primary keeps waiting (a tier TIER_SCHEDULER demoted as predictably failing only starts
+    once the others have missed): DOM candidates and the screenshot are fetched in parallel, and
+    the embedding / template-matching CPU work runs in the default executor.
+    The first tier to return a result above its threshold wins; the others are cancelled
+    (their telemetry spans end as 'cancelled').
+    """
+    if primary_selector not in LOCATORS:
+        raise ValueError(f"No mapping defined for selector: {primary_selector}")
+
+    semantic_desc, template_path = LOCATORS[primary_selector]
+    region_selector = REGIONS.get(primary_selector)
+
+    logger.info(f"Attempting primary locator: {primary_selector}")
+    primary = asyncio.create_task(_primary_tier(page.locator(primary_selector), primary_selector, template_path))
+    done, _ = await asyncio.wait({primary}, timeout=PRIMARY_SLOW_AFTER_MS / 1000)
+    if primary in done and primary.exception() is None and primary.result():
+        return primary.result()
+
+    # Heal cache
+    with TELEMETRY.span("heal_cache") as span:
+        cache_key = await HEAL_CACHE.key_for_async(page, primary_selector) if HEAL_CACHE_ENABLED else None
+        cached_result = await HEAL_CACHE.lookup_async(page, cache_key)
+        if cached_result:
+            span.found()
+    if cached_result:
+        primary.cancel()
+        return cached_result
+
+    tier_runs = {"semantic": lambda: _semantic_tier(page, semantic_desc, primary_selector),
+                 "visual": lambda: _visual_tier(page, template_path, region_selector, primary_selector)}
+    scheduled, last_resort = TIER_SCHEDULER.order(page.url, primary_selector, list(tier_runs))
+    logger.info(f"→ Primary is slow → racing {' and '.join(scheduled) or 'no'} tiers")
+    tasks = {primary: "primary"}
+    for tier in scheduled:
+        tasks[asyncio.create_task(_scheduled_attempt(page, primary_selector, tier, tier_runs[tier]()))] = tier
+    try:
+        while True:
+            if last_resort and set(tasks.values()) <= {"primary"}:
+                # Every scheduled tier missed (the primary may be pending or done): start the predictably failing ones
+                logger.info(f"→ Trying {' and '.join(last_resort)} as a last resort")
+                for tier in last_resort:
+                    tasks[asyncio.create_task(_scheduled_attempt(page, primary_selector, tier, tier_runs[tier]()))] = tier
+                last_resort = []
+            if not tasks:
+                break
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: _TIER_PRIORITY[tasks[t]]):
+                tier = tasks.pop(task)
+                if task.cancelled():
+                    continue
+                if task.exception() is not None:
+                    logger.warning(f"{tier} tier error: {task.exception()}")
+                    continue
+                result = task.result()
+                if result:
+                    if tier != "primary":
+                        await HEAL_CACHE.store_async(page, cache_key, result, tier)
+                    return result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    logger.warning("→ All fallbacks failed.")
+    return None
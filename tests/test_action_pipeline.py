@@ -0,0 +1,132 @@
+# tests/test_action_pipeline.py
+import sys
+import os
+import pytest
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import ELEMENT_MAPPING, ACTION_TIMEOUT_MS
+from utils import action_pipeline
+from utils.action_pipeline import run_actions, Step
+from utils.telemetry import Telemetry
+
+_SELECTORS = ["#user", "#pass", "#remember", "#login", "#search"]
+
+
+class _FakeLocator:
+    def __init__(self, selector, calls, fail=False):
+        self.selector = selector
+        self.calls = calls
+        self.fail = fail
+
+    def _do(self, action, *args, **kwargs):
+        self.calls.append((action, self.selector, args, kwargs))
+        if self.fail:
+            raise RuntimeError(f"element {self.selector} is detached\nlog lines")
+
+    def fill(self, text, **kwargs):
+        self._do("fill", text, **kwargs)
+
+    def click(self, **kwargs):
+        self._do("click", **kwargs)
+
+    def press(self, key, **kwargs):
+        self._do("press", key, **kwargs)
+
+    def wait_for(self, **kwargs):
+        self._do("wait_for", **kwargs)
+
+
+class _FakePage:
+    def __init__(self, fused=()):
+        self.calls = []
+        self.fused = list(fused)    # per call, how many fills the in-page script completes (then all)
+
+    def evaluate(self, script, fills):
+        self.calls.append(("evaluate", [selector for selector, _ in fills]))
+        return min(self.fused.pop(0), len(fills)) if self.fused else len(fills)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    for selector in _SELECTORS:
+        monkeypatch.setitem(ELEMENT_MAPPING, selector, (selector.strip("#"), f"{selector}.png"))
+    state = {"batches": [], "healed": [], "broken": set(), "cache": set(), "invalidated": []}
+
+    def result(page, selector):
+        tier = 'cache' if selector in state["cache"] else 'primary'
+        result = {'type': 'locator', 'value': _FakeLocator(selector, page.calls, selector in state["broken"]),
+                  'tier': tier, 'verified': tier == 'primary'}
+        if tier == 'cache':
+            result['cache_key'] = f"{selector}@lookup"
+        return result
+
+    def batch(page, selectors):
+        state["batches"].append(list(selectors))
+        return {selector: result(page, selector) for selector in selectors}
+
+    def single(page, selector):
+        state["healed"].append(selector)
+        state["broken"].discard(selector)
+        state["cache"].discard(selector)
+        return result(page, selector)
+
+    monkeypatch.setattr(action_pipeline, "find_locators_with_healing", batch)
+    monkeypatch.setattr(action_pipeline, "find_locator_with_healing", single)
+    monkeypatch.setattr(action_pipeline, "TELEMETRY", Telemetry())
+    monkeypatch.setattr(action_pipeline.HEAL_CACHE, "invalidate", state["invalidated"].append)
+    return state
+
+
+def test_form_is_resolved_per_segment_and_fills_are_fused(engine):
+    page = _FakePage()
+    rows = run_actions(page, [("#user", "fill", "alice"), ("#pass", "fill", "secret"), ("#login", "click"),
+                              ("#search", "fill", "shoes"), Step("#search", "press", ("Enter",), {"delay": 5})])
+
+    assert engine["batches"] == [["#user", "#pass", "#login"], ["#search"]]
+    assert page.calls == [("evaluate", ["#user", "#pass"]),
+                          ("click", "#login", (), {"timeout": ACTION_TIMEOUT_MS}),
+                          ("fill", "#search", ("shoes",), {"timeout": ACTION_TIMEOUT_MS}),     # a lone fill is not fused
+                          ("press", "#search", ("Enter",), {"delay": 5, "timeout": ACTION_TIMEOUT_MS})]
+    assert all(row["ok"] for row in rows) and [row["fused"] for row in rows] == [True, True, False, False, False]
+
+
+def test_fill_the_page_script_cannot_do_goes_through_playwright_in_order(engine):
+    engine["cache"].add("#pass")                                # cache hits are not re-waited either
+    page = _FakePage(fused=[1])
+    rows = run_actions(page, [("#user", "fill", "alice"), ("#pass", "fill", "secret"), ("#remember", "fill", "y"),
+                              ("#search", "fill", "z")])
+
+    assert page.calls == [("evaluate", ["#user", "#pass", "#remember", "#search"]),
+                          ("fill", "#pass", ("secret",), {"timeout": ACTION_TIMEOUT_MS}),
+                          ("evaluate", ["#remember", "#search"])]
+    assert [row["fused"] for row in rows] == [True, False, True, True] and rows[1]["tier"] == "cache"
+
+
+def test_failed_step_is_healed_inline_and_unrecoverable_one_stops_the_flow(engine, monkeypatch):
+    engine["broken"].add("#login")
+    page = _FakePage()
+    rows = run_actions(page, [("#user", "fill", "alice"), ("#pass", "fill", "secret"), ("#login", "click"),
+                              ("#search", "fill", "shoes")])
+    assert engine["healed"] == ["#login"] and all(row["ok"] for row in rows) and rows[2]["healed"]
+
+    def unresolvable(page, selector):
+        engine["healed"].append(selector)
+        return None
+
+    monkeypatch.setattr(action_pipeline, "find_locator_with_healing", unresolvable)
+    engine["broken"].add("#login")
+    rows = run_actions(_FakePage(), [("#login", "click"), ("#search", "fill", "shoes")])
+    assert rows[0]["error"] == "element #login is detached" and not rows[0]["ok"]
+    assert rows[1] == {'selector': '#search', 'action': 'fill', 'ok': False, 'tier': None, 'healed': False,
+                       'fused': False, 'error': 'skipped'}
+
+    with pytest.raises(ValueError):
+        run_actions(_FakePage(), [("#unmapped", "click")])
+
+
+def test_failed_cached_step_invalidates_the_entry_it_was_found_under(engine):
+    engine["cache"].add("#login")
+    engine["broken"].add("#login")
+    rows = run_actions(_FakePage(), [("#login", "click")])
+
+    assert engine["invalidated"] == ["#login@lookup"] and rows[0]["ok"] and rows[0]["healed"]
@@ -0,0 +1,69 @@
+# tests/test_artifacts.py
+import sys
+import os
+import threading
+import numpy as np
+import cv2
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import artifacts
+from utils.artifacts import ArtifactWriter
+from utils.telemetry import Telemetry
+
+
+def _screenshot():
+    return np.full((120, 200), 230, np.uint8)
+
+
+def test_debug_marker_is_written_in_background_to_run_dir(tmp_path):
+    writer = ArtifactWriter(str(tmp_path), enabled=True, fmt="jpg")
+
+    assert writer.save_debug_marker(_screenshot(), 50, 60, 'button:has-text("Login")', 0.87)
+    writer.flush()
+
+    files = os.listdir(os.path.join(writer.run_dir, "debug"))
+    assert files == ["00001_button_has_text_Login_0.870.jpg"]
+    image = cv2.imread(os.path.join(writer.run_dir, "debug", files[0]))
+    assert image.shape == (120, 200, 3)
+    assert image[60, 50, 2] > 200 and image[60, 50, 0] < 80       # red marker (BGR)
+
+
+def test_disabled_or_sampled_out_writes_nothing(tmp_path):
+    disabled = ArtifactWriter(str(tmp_path), enabled=False)
+    never = ArtifactWriter(str(tmp_path), enabled=True, sample_rate=0.0)
+
+    assert not disabled.save_debug_marker(_screenshot(), 10, 10)
+    assert not never.save_debug_marker(_screenshot(), 10, 10)
+    assert os.listdir(tmp_path) == []
+
+
+def test_crop_keeps_only_the_marker_neighbourhood(tmp_path):
+    writer = ArtifactWriter(str(tmp_path), enabled=True, fmt="png", crop_px=20)
+
+    writer.save_debug_marker(_screenshot(), 100, 60)
+    writer.flush()
+
+    path = os.path.join(writer.run_dir, "debug", os.listdir(os.path.join(writer.run_dir, "debug"))[0])
+    assert cv2.imread(path).shape == (40, 40, 3)
+
+
+def test_full_queue_drops_optional_but_not_required_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "TELEMETRY", Telemetry())
+    writer = ArtifactWriter(str(tmp_path), enabled=True, queue_size=1)
+    started, release = threading.Event(), threading.Event()
+    done = []
+
+    def blocking_job():
+        started.set()
+        release.wait()
+
+    writer.submit(blocking_job)                      # occupies the writer thread
+    assert started.wait(5)                           # the worker picked it up: the queue is empty again
+    assert writer.submit(done.append, "queued")      # fills the single slot
+    assert not writer.save_debug_marker(_screenshot(), 10, 10)
+    assert writer.dropped == 1
+
+    threading.Timer(0.05, release.set).start()
+    assert writer.submit(done.append, "required", required=True)   # waits for a free slot
+    writer.flush()
+    assert done == ["queued", "required"]
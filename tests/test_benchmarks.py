@@ -0,0 +1,35 @@
+# tests/test_benchmarks.py
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.fixtures import synthetic_page_html, synthetic_template, synthetic_screenshot, TARGET_ID
+from benchmarks.healing_bench import measure
+from utils.visual_healing import match_template
+
+
+def test_measure_reports_percentiles_and_memory():
+    stats = measure(lambda: sum(range(1000)), repeat=5)
+
+    assert stats["runs"] == 5
+    assert stats["min_ms"] <= stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+    assert stats["peak_alloc_kib"] >= 0
+
+
+def test_synthetic_page_has_requested_number_of_candidates():
+    html = synthetic_page_html(100)
+
+    assert html.count(f'id="{TARGET_ID}"') == 1
+    assert html.count('<button') + html.count('<a ') + html.count('type="button"') + html.count('role="button"') == 100
+
+
+def test_synthetic_screenshot_is_matched_at_the_pasted_template():
+    template = synthetic_template()
+    screenshot, (center_x, center_y) = synthetic_screenshot(1280, 720, template)
+
+    match = match_template(screenshot, template)
+
+    assert match is not None
+    found_x = (match['box'][0] + match['box'][2]) // 2
+    found_y = (match['box'][1] + match['box'][3]) // 2
+    assert abs(found_x - center_x) <= 6 and abs(found_y - center_y) <= 6
@@ -0,0 +1,99 @@
+# tests/test_candidate_index.py
+import sys
+import os
+import numpy as np
+import pytest
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import candidate_index, semantic_healing
+from utils.candidate_index import CandidateIndex
+from utils.embedding_cache import EmbeddingCache
+
+_VOCABULARY = ["login", "sign", "checkout", "help"]
+
+
+def _bag_of_words(texts):
+    vectors = np.array([[float(word in text.lower()) for word in _VOCABULARY] + [0.1] for text in texts],
+                       dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    calls = []
+
+    def encoder(texts):
+        calls.extend(texts)
+        return _bag_of_words(texts)
+
+    monkeypatch.setattr(candidate_index, "EMBEDDING_CACHE", EmbeddingCache(encoder))
+    return calls
+
+
+def _record(record_id, text):
+    return {"id": record_id, "tag": "button", "text": text, "attrs": {}}
+
+
+def _delta(upserts=(), removed=(), full=False, token="doc-1"):
+    return {"token": token, "full": full, "upserts": list(upserts), "removed": list(removed)}
+
+
+def test_only_new_or_changed_candidates_are_embedded(encoded):
+    index = CandidateIndex()
+    index.apply(_delta([_record(1, "Login"), _record(2, "Sign up")], full=True))
+    index.embeddings()
+    assert encoded == ["Login", "Sign up"]
+
+    assert index.apply(_delta()) == 0
+    index.embeddings()
+    assert len(encoded) == 2                                   # idle sync: nothing re-encoded
+
+    index.apply(_delta([_record(3, "Checkout"), _record(1, "Log in")], removed=[2]))
+    ids, matrix = index.embeddings()
+    assert sorted(encoded[2:]) == ["Checkout", "Log in"]
+    assert sorted(ids) == [1, 3] and matrix.shape == (2, len(_VOCABULARY) + 1)
+
+
+def test_new_document_starts_over(encoded):
+    index = CandidateIndex()
+    index.apply(_delta([_record(1, "Login")], full=True))
+    index.apply(_delta([_record(1, "Help")], full=True, token="doc-2"))
+
+    assert len(index) == 1 and index.full_scans == 2
+    assert index.rank(_bag_of_words(["help"]), 0.5, 5) == [[(1, pytest.approx(0.995, abs=0.01))]]
+
+
+def test_rank_and_pick_skip_invisible_and_weak_candidates(encoded):
+    index = CandidateIndex()
+    index.apply(_delta([_record(1, "Login"), _record(2, "Login now"), _record(3, "Help")], full=True))
+
+    ranked = index.rank(_bag_of_words(["login", "checkout"]), 0.7, 5)
+    assert {record_id for record_id, _ in ranked[0]} == {1, 2}
+    assert ranked[1] == []                                     # nothing close enough to "checkout"
+
+    box = {"x": 0, "y": 0, "width": 10, "height": 10}
+    resolved = {1: {"visible": False, "box": box, "selector": "#hidden-login"},
+                2: {"visible": True, "box": box, "selector": "#login"}}
+    matches = index.pick(ranked, resolved)
+
+    assert matches[0]["selector"] == "#login" and matches[0]["text"] == "Login now"
+    assert matches[1] is None
+
+
+def test_hidden_top_k_falls_back_to_full_extraction(encoded, monkeypatch):
+    index = CandidateIndex()
+    index.apply(_delta([_record(1, "Login"), _record(2, "Help")], full=True))
+    extracted = []
+    monkeypatch.setattr(index, "sync", lambda page: 0)
+    monkeypatch.setattr(index, "resolve", lambda page, ranked: {1: {"visible": False, "box": {}, "selector": "#a"}})
+    monkeypatch.setattr(semantic_healing, "index_for", lambda page: index)
+    monkeypatch.setattr(semantic_healing, "rank_indexed",
+                        lambda index, descs: index.rank(_bag_of_words(descs), 0.7, 1))
+    monkeypatch.setattr(semantic_healing, "extract_candidates", lambda page, visible_only: extracted.append(visible_only))
+    monkeypatch.setattr(semantic_healing, "rank_candidates",
+                        lambda records, descs: [{"selector": "#login", "score": 0.9, "text": "Login", "box": {}}] * len(descs))
+
+    matches = semantic_healing.find_semantic_matches(object(), ["login", "checkout"])
+
+    assert matches[0]["selector"] == "#login" and matches[1] is None   # "checkout" had no candidate: no extraction
+    assert extracted == [True]
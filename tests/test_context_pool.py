@@ -0,0 +1,179 @@
+# tests/test_context_pool.py
+import sys
+import os
+import json
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import context_pool
+from utils.context_pool import ContextPool, pool_size
+
+
+class _FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = "about:blank"
+        self.closed = False
+        self.calls = []
+        self.listeners = []
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    def close(self):
+        self.closed = True
+        self.context.pages.remove(self)
+
+    def goto(self, url):
+        self.url = url
+        self.calls.append(("goto", url))
+        for handler in self.listeners:
+            handler(self)                                       # the main frame: has .url as well
+
+    def route(self, url, handler):
+        self.calls.append(("route", url))
+
+    def evaluate(self, script, arg=None):
+        self.calls.append(("evaluate", self.url, arg))
+
+    def unroute_all(self, behavior=None):
+        pass
+
+
+class _FakeContext:
+    def __init__(self, options):
+        self.options = options
+        self.pages = []
+        self.cookies = []
+        self.listeners = []
+        if "storage_state" in options:
+            with open(options["storage_state"], encoding="utf-8") as f:
+                self.cookies = json.load(f)["cookies"]
+        self.closed = False
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    once = on
+
+    def add_init_script(self, script):
+        pass
+
+    def expose_binding(self, name, callback):
+        pass
+
+    def expose_function(self, name, callback):
+        pass
+
+    def new_page(self):
+        page = _FakePage(self)
+        self.pages.append(page)
+        for handler in self.listeners:
+            handler(page)
+        return page
+
+    def unroute_all(self, behavior=None):
+        pass
+
+    def clear_cookies(self):
+        self.cookies = []
+
+    def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    def clear_permissions(self):
+        pass
+
+    def set_extra_http_headers(self, headers):
+        pass
+
+    def set_offline(self, offline):
+        pass
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    def set_default_navigation_timeout(self, timeout):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    def new_context(self, **options):
+        context = _FakeContext(options)
+        self.contexts.append(context)
+        return context
+
+
+def test_pool_size_shares_cpus_between_xdist_workers(monkeypatch):
+    assert pool_size(workers=1, cpus=8) == 1                    # one test at a time per worker
+    monkeypatch.setattr(context_pool, "CONTEXT_POOL_MAX_PER_WORKER", 2)
+    assert pool_size(workers=1, cpus=8) == 2
+    assert pool_size(workers=8, cpus=8) == 1
+    assert pool_size(workers=16, cpus=8) == 1
+
+
+def test_released_page_is_reset_and_reused(tmp_path):
+    state = tmp_path / "state.json"
+    cookie = {"name": "session", "value": "abc", "domain": "localhost", "path": "/"}
+    origins = [{"origin": "http://localhost:5000", "localStorage": [{"name": "token", "value": "t"}]}]
+    state.write_text(json.dumps({"cookies": [cookie], "origins": origins}))
+    browser = _FakeBrowser()
+    pool = ContextPool(browser, size=1, storage_state=str(state))
+    pool.warm()
+    assert len(browser.contexts) == 1 and browser.contexts[0].options["storage_state"] == str(state)
+
+    pooled = pool.acquire()
+    page = pooled.page
+    page.goto("http://localhost:5000/cart")
+    pooled.context.new_page().goto("https://pay.example.com/checkout")     # popup opened by the test
+    pooled.context.add_cookies([{"name": "cart", "value": "1", "domain": "localhost", "path": "/"}])
+    pool.release(pooled)
+
+    again = pool.acquire()
+    assert again is pooled and len(browser.contexts) == 1 and pool.reused == 1
+    # A new page per test: the old one is closed along with its handlers, scripts and sessionStorage
+    assert page.closed and pooled.context.pages == [again.page] and again.page.url == "about:blank"
+    assert pooled.context.cookies == [cookie]
+    # Every visited origin is cleared, and reseeded from the storage state
+    assert [call for call in again.page.calls if call[0] == "evaluate"] == [
+        ("evaluate", "http://localhost:5000/__context_pool_reset__", origins[0]["localStorage"]),
+        ("evaluate", "https://pay.example.com/__context_pool_reset__", [])]
+    assert not pooled.origins
+
+    pool.release(again)                                         # nothing visited: no storage round
+    assert not any(call[0] == "goto" for call in pooled.page.calls)
+
+
+def test_worn_out_or_broken_contexts_are_replaced():
+    browser = _FakeBrowser()
+    pool = ContextPool(browser, size=1, max_uses=2)
+    pool.warm()
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(first)                                         # second use: worn out
+    assert first.context.closed and pool.replaced == 1
+    assert len(browser.contexts) == 1                           # the replacement waits for acquire()
+
+    second = pool.acquire()
+    assert second is not first
+    second.context.add_init_script("window.mocked = true")     # cannot be removed from the context
+    pool.release(second)
+    assert second.context.closed and pool.replaced == 2 and len(browser.contexts) == 2
+
+
+def test_warm_contexts_take_turns():
+    browser = _FakeBrowser()
+    pool = ContextPool(browser, size=2)
+    pool.warm()
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+    pool.release(second)
+    assert second is not first and pool.acquire() is first
+    assert [pooled.context for pooled in (first, second)] == browser.contexts and pool.reused == 1
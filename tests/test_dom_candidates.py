@@ -0,0 +1,76 @@
+# tests/test_dom_candidates.py
+import sys
+import os
+import pytest
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.fixtures import synthetic_page_html, TARGET_ID, TARGET_TEXT
+from utils.dom_candidates import extract_candidates, candidate_text, MAX_ATTRIBUTE_LENGTH
+
+# Elements the selector builder has to tell apart: shared ids, quotes in attributes,
+# same-tag siblings without any attribute, candidates with nothing to match on
+EDGE_CASES_HTML = """<!doctype html>
+<html><body>
+<div id="toolbar">
+  <button id="dup">Save</button><button id="dup">Save as</button>
+  <button data-testid='say "hi"'>Greet</button>
+  <a href="#a">Next</a><a href="#b">Next</a>
+  <button class="primary" style="color: red" title="{long_title}">Styled</button>
+</div>
+<section><div role="button">Open</div><div role="button">Open</div></section>
+<input type="submit" value="Send">
+<button aria-label="close"></button>
+<button style="display: none">Hidden</button>
+</body></html>
+""".format(long_title="t" * (MAX_ATTRIBUTE_LENGTH + 20))
+
+
+@pytest.fixture(scope="module")
+def candidate_page():
+    """A Chromium page; the module is skipped when no browser can be launched."""
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        try:
+            browser = p.chromium.launch()
+        except Exception as e:
+            pytest.skip(f"Chromium not available: {e}")
+        yield browser.new_page()
+        browser.close()
+
+
+def _assert_selectors_unique(page, records):
+    selectors = [r['selector'] for r in records]
+    assert len(set(selectors)) == len(selectors)
+    for record in records:
+        assert page.locator(record['selector']).count() == 1, record['selector']
+
+
+def test_records_cover_every_candidate_of_the_synthetic_page(candidate_page):
+    candidate_page.set_content(synthetic_page_html(40))
+    records = extract_candidates(candidate_page)
+
+    assert len(records) == 40
+    for record in records:
+        assert set(record) == {'tag', 'text', 'attrs', 'box', 'visible', 'selector'}
+        assert set(record['box']) == {'x', 'y', 'width', 'height'} and record['visible']
+    target = next(r for r in records if r['text'] == TARGET_TEXT)
+    assert target['tag'] == 'button' and target['selector'] == f"#{TARGET_ID}" and target['attrs'] == {'id': TARGET_ID}
+    assert candidate_text(target) == f"{TARGET_TEXT} id={TARGET_ID}"
+    _assert_selectors_unique(candidate_page, records)
+
+
+def test_selectors_stay_unique_without_unique_attributes(candidate_page):
+    candidate_page.set_content(EDGE_CASES_HTML)
+    records = extract_candidates(candidate_page)
+
+    # The empty aria-labelled button has no text to match on
+    assert [r['text'] for r in records] == ['Save', 'Save as', 'Greet', 'Next', 'Next', 'Styled',
+                                             'Open', 'Open', 'Send', 'Hidden']
+    _assert_selectors_unique(candidate_page, records)
+    by_text = {r['text']: r for r in records}
+    assert by_text['Greet']['selector'] == 'button[data-testid="say \\"hi\\""]'
+    assert by_text['Send']['tag'] == 'input'
+    styled = by_text['Styled']['attrs']
+    assert 'class' not in styled and 'style' not in styled and len(styled['title']) == MAX_ATTRIBUTE_LENGTH
+    assert not by_text['Hidden']['visible']
+    assert [r['text'] for r in extract_candidates(candidate_page, visible_only=True)][-1] == 'Send'
@@ -0,0 +1,54 @@
+# tests/test_embedding_cache.py
+import sys
+import os
+import numpy as np
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.embedding_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    """Deterministic fake encoder that records every string it is asked to encode"""
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen.extend(texts)
+        vecs = np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype=np.float32)
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_only_unseen_strings_are_encoded():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(encoder, max_entries=16)
+
+    first = cache.encode(["Login", "Sign Up", "Login"])
+    second = cache.encode(["Sign Up", "Help"])
+
+    assert encoder.seen == ["Login", "Sign Up", "Help"]
+    assert first.shape == (3, 3)
+    np.testing.assert_array_equal(first[1], second[0])
+    assert cache.encode("Login").shape == (3,)
+
+
+def test_evicted_vectors_spill_to_disk_and_are_reused(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(encoder, max_entries=1, spill_dir=str(tmp_path))
+
+    cache.encode(["a", "b"])          # "a" is evicted and spilled
+    cache.encode(["a"])               # read back from disk, not re-encoded
+
+    assert encoder.seen == ["a", "b"]
+    assert any(tmp_path.rglob("*.npy"))
+
+
+def test_pinned_entries_survive_eviction():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(encoder, max_entries=1)
+
+    cache.pin(["log in button"])
+    cache.encode(["x", "y", "z"])
+    cache.encode("log in button")
+
+    assert encoder.seen.count("log in button") == 1
@@ -0,0 +1,74 @@
+# tests/test_embedding_service.py
+import sys
+import os
+import tempfile
+import threading
+import numpy as np
+import pytest
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import embedding_service
+from utils.embedding_service import EmbeddingService, EmbeddingClient
+
+
+def _fake_encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), ord(t[0]), 1.0] for t in texts], dtype=np.float32)
+    return encode
+
+
+@pytest.fixture
+def service():
+    # Short path: AF_UNIX socket paths are limited to ~100 characters
+    socket_path = os.path.join(tempfile.mkdtemp(), "embed.sock")
+    calls = []
+    server = EmbeddingService(socket_path, _fake_encoder(calls), batch_window_ms=50).start()
+    server.calls = calls
+    yield server
+    server.close()
+
+
+def test_client_round_trip(service):
+    client = EmbeddingClient(service.socket_path, timeout=5)
+
+    assert client.ping()
+    vectors = client.encode(["login", "sign up", "login"])
+
+    assert vectors.dtype == np.float32 and vectors.shape == (3, 3)
+    assert vectors[0].tolist() == [5, ord("l"), 1] and vectors[1].tolist() == [7, ord("s"), 1]
+    assert service.calls == [["login", "sign up"]]        # duplicates encoded once
+
+
+def test_concurrent_requests_share_one_batch(service):
+    results = {}
+
+    def worker(i):
+        results[i] = EmbeddingClient(service.socket_path, timeout=5).encode([f"text {i}", "shared"])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(results[i][0][0] == len(f"text {i}") for i in range(4))
+    assert service.requests == 4 and service.batches < 4
+    assert sum(len(batch) for batch in service.calls) == 5 + (len(service.calls) - 1)   # "shared" once per batch
+
+
+def test_encoder_error_is_reported_to_client(service):
+    service.encode = lambda texts: (_ for _ in ()).throw(ValueError("model missing"))
+
+    with pytest.raises(RuntimeError, match="model missing"):
+        EmbeddingClient(service.socket_path, timeout=5).encode(["login"])
+
+
+def test_remote_encode_falls_back_when_service_is_gone(monkeypatch, tmp_path):
+    monkeypatch.setattr(embedding_service, "_client", None)
+    monkeypatch.setattr(embedding_service, "_client_failed", False)
+    assert embedding_service.remote_encode(["login"]) is None           # nothing configured
+
+    embedding_service.connect(str(tmp_path / "missing.sock"))
+    assert embedding_service.remote_encode(["login"]) is None
+    assert embedding_service._client_failed
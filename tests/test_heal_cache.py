@@ -0,0 +1,46 @@
+# tests/test_heal_cache.py
+import sys
+import os
+import asyncio
+import threading
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import heal_cache
+from utils.heal_cache import HealCache
+from utils.telemetry import Telemetry
+
+
+class _FakeLocator:
+    async def count(self):
+        return 0                                                # the healed element is gone
+
+
+class _FakeAsyncPage:
+    def locator(self, selector):
+        return _FakeLocator()
+
+
+def test_async_api_writes_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(heal_cache, "TELEMETRY", Telemetry())
+    cache = HealCache(str(tmp_path / "heal_cache.json"))
+    writers = []
+    put = cache._put
+
+    def recording_put(key, entry):
+        writers.append((threading.get_ident(), entry is None))
+        put(key, entry)
+
+    cache._put = recording_put
+
+    async def heal_then_go_stale():
+        result = {'type': 'locator', 'selector': '#login-new', 'score': 0.9}
+        await cache.store_async(_FakeAsyncPage(), "key", result, "semantic")
+        assert cache._get("key")["selector"] == "#login-new"
+        assert await cache.lookup_async(_FakeAsyncPage(), "key") is None
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(heal_then_go_stale())
+
+    assert [deleted for _, deleted in writers] == [False, True]
+    assert all(thread != loop_thread for thread, _ in writers)
+    assert HealCache(cache.path)._get("key") is None
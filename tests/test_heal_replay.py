@@ -0,0 +1,108 @@
+# tests/test_heal_replay.py
+import sys
+import os
+import cv2
+import numpy as np
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import ELEMENT_MAPPING
+from utils import heal_recorder, semantic_healing
+from utils.artifacts import ARTIFACT_WRITER
+from utils.embedding_cache import EmbeddingCache
+from utils.heal_recorder import HealRecorder, load_case, save_case, label_case
+from utils.heal_replay import replay, summarize
+from utils.telemetry import Telemetry
+
+_LOGIN = {"tag": "button", "text": "Log in", "attrs": {}, "visible": True, "selector": "#login",
+          "box": {"x": 600.0, "y": 300.0, "width": 180.0, "height": 60.0}}
+_SIGNUP = {"tag": "button", "text": "Sign up", "attrs": {}, "visible": True, "selector": "#signup",
+           "box": {"x": 100.0, "y": 100.0, "width": 180.0, "height": 60.0}}
+
+
+def _screenshot_and_template():
+    rng = np.random.default_rng(5)
+    page = cv2.GaussianBlur((rng.random((720, 1280)) * 255).astype(np.uint8), (0, 0), 3)
+    button = np.full((60, 180), 200, np.uint8)
+    cv2.putText(button, "Login", (10, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 30, 3)
+    page[300:360, 600:780] = button
+    return cv2.imencode(".png", page)[1].tobytes(), cv2.imencode(".png", button)[1].tobytes()
+
+
+class _FakePage:
+    url = "http://localhost/login"
+    viewport_size = {"width": 1280, "height": 720}
+
+    def __init__(self, screenshot):
+        self._screenshot = screenshot
+
+    def evaluate(self, script, args=None):
+        return [_LOGIN, _SIGNUP]
+
+    def screenshot(self, **kwargs):
+        return self._screenshot
+
+
+def _keyword_encoder(texts):
+    vectors = np.array([[t.lower().count("log"), t.lower().count("sign"), 0.1 * len(t)] for t in texts], np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_recorded_visual_heal_replays_without_browser(tmp_path, monkeypatch):
+    screenshot, template = _screenshot_and_template()
+    template_path = tmp_path / "login.png"
+    template_path.write_bytes(template)
+    monkeypatch.setitem(ELEMENT_MAPPING, "#old-login", ("login button", str(template_path)))
+    recorder = HealRecorder(str(tmp_path / "corpus"), enabled=True)
+    telemetry = Telemetry()                 # keeps this heal out of the session's telemetry summary
+    monkeypatch.setattr(heal_recorder, "TELEMETRY", telemetry)
+
+    @recorder.recorded
+    @telemetry.traced
+    def heal(page, primary_selector):
+        with telemetry.span("visual") as span:
+            span.found()
+        return {'type': 'coord', 'x': 690, 'y': 330, 'score': 0.99, 'tier': 'visual'}
+
+    assert heal(_FakePage(screenshot), "#old-login")['x'] == 690
+    ARTIFACT_WRITER.flush()
+    [path] = [str(p) for p in (tmp_path / "corpus").iterdir()]
+
+    case = load_case(path)
+    assert case["outcome"]["tier"] == "visual" and case["expected"]["point"] == [690, 330]
+    assert case["template"] == template and len(case["candidates"]) == 2
+    assert case["trace"]["spans"][0]["name"] == "visual"
+
+    [row] = replay([path], tiers=("visual",))
+    assert row["visual"]["hit"] and abs(row["visual"]["x"] - 690) <= 1
+    assert "visual" in row["recorded_ms"]
+
+
+def test_primary_successes_are_recorded_only_on_request(tmp_path):
+    recorder = HealRecorder(str(tmp_path), enabled=True)
+    assert not recorder.wants({'tier': 'primary'})
+    assert recorder.wants({'tier': 'semantic'}) and recorder.wants(None)
+    assert HealRecorder(str(tmp_path), enabled=True, record_primary=True).wants({'tier': 'primary'})
+    assert not HealRecorder(str(tmp_path)).wants({'tier': 'semantic'})
+
+
+def test_relabelled_semantic_case_reports_accuracy_per_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic_healing, "EMBEDDING_CACHE", EmbeddingCache(_keyword_encoder))
+    screenshot, _ = _screenshot_and_template()
+    path = str(tmp_path / "case.npz")
+    # The live heal picked #signup; the case is then relabelled to the right element
+    save_case(path, {"selector": "#old-login", "description": "login button", "viewport": _FakePage.viewport_size,
+                     "region": None, "candidates": [_LOGIN, _SIGNUP],
+                     "outcome": {"tier": "semantic", "selector": "#signup", "box": _SIGNUP["box"]},
+                     "expected": {"box": _SIGNUP["box"]}, "trace": None}, screenshot, None)
+    [wrong] = replay([path], tiers=("semantic",), semantic_threshold=0.5)
+    assert wrong["semantic"]["selector"] == "#login" and wrong["semantic"]["hit"] is False
+
+    label_case(path, "#login")
+    rows = replay([path], tiers=("semantic", "visual"), semantic_threshold=0.5)
+    assert rows[0]["semantic"]["hit"] is True and rows[0]["visual"] is None      # no template recorded
+
+    summary = summarize(rows, [0.5, 0.95], [0.5])
+    thresholds = summary["tiers"]["semantic"]["thresholds"]
+    assert thresholds[0.5] == {"found": 1, "correct": 1, "accuracy": 1.0}
+    assert thresholds[0.95] == {"found": 0, "correct": 0, "accuracy": 0.0}
+    assert "visual" not in summary["tiers"]
@@ -0,0 +1,171 @@
+# tests/test_healing_strategy.py
+import sys
+import os
+import cv2
+import numpy as np
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import ELEMENT_MAPPING
+import healing_strategy
+from utils import visual_healing
+from utils.artifacts import ARTIFACT_WRITER
+from utils.primary_probe import ProbeHistory
+from utils.spatial_prior import SpatialPrior
+from utils.telemetry import TELEMETRY
+from utils.template_store import TemplateStore
+
+_SELECTORS = {"#a": "alpha button", "#b": "beta button", "#c": "gamma button", "#d": "delta button"}
+
+
+class _Element:
+    def __init__(self, visible=False, png=None, rect=None):
+        self.visible = visible
+        self.png = png
+        self.rect = rect
+        self.first = self
+        self.lookups = 0
+
+    def evaluate(self, script, timeout=None):
+        self.lookups += 1
+        if self.rect is None:
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded.")
+        return self.rect
+
+    def is_visible(self, timeout=None):
+        return self.visible
+
+    def screenshot(self, **kwargs):
+        return self.png
+
+
+class _FakePage:
+    url = "http://localhost:5000/form"
+    viewport_size = {"width": 400, "height": 300}
+
+    def __init__(self, elements=None, screenshot=None):
+        self.elements = elements or {}
+        self._screenshot = screenshot
+
+    def locator(self, selector):
+        return self.elements.get(selector) or _Element()
+
+    def screenshot(self, **kwargs):
+        return self._screenshot
+
+
+class _FakeScheduler:
+    def __init__(self, orders):
+        self.orders = orders
+        self.recorded = []
+
+    def order(self, url, selector, tiers):
+        return [tier for tier in self.orders[selector] if tier in tiers], []
+
+    def record(self, url, selector, tier, success, cost_ms, score=None):
+        self.recorded.append((selector, tier, success))
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    for selector, description in _SELECTORS.items():
+        monkeypatch.setitem(ELEMENT_MAPPING, selector, (description, str(tmp_path / f"{selector[1:]}.png")))
+    state = {"calls": [], "stored": []}
+    monkeypatch.setattr(TELEMETRY, "enabled", False)
+    monkeypatch.setattr(healing_strategy, "PROBE_HISTORY", ProbeHistory(str(tmp_path / "history.json")))
+    monkeypatch.setattr(healing_strategy, "page_settled", lambda page: True)
+    monkeypatch.setattr(healing_strategy, "heal_cache_keys", lambda page, selectors: {s: f"key{s}" for s in selectors})
+    monkeypatch.setattr(healing_strategy, "lookup_healed", lambda page, key: (
+        {'type': 'locator', 'selector': '#delta', 'tier': 'cache'} if key == "key#d" else None))
+    monkeypatch.setattr(healing_strategy, "remember_heal",
+                        lambda page, key, result, tier: state["stored"].append((key, tier)))
+    return state
+
+
+def test_batch_heals_each_selector_in_its_own_tier_order(batch, monkeypatch):
+    scheduler = _FakeScheduler({"#a": ["semantic", "visual"], "#b": ["visual", "semantic"],
+                                "#c": ["semantic", "visual"]})
+    monkeypatch.setattr(healing_strategy, "TIER_SCHEDULER", scheduler)
+    monkeypatch.setattr(healing_strategy.SPATIAL_PRIOR, "enabled", False)
+
+    def semantic(page, descriptions):
+        batch["calls"].append(("semantic", descriptions))
+        return [{'selector': '#alpha', 'score': 0.9, 'text': 'Alpha', 'box': None}
+                if description == "alpha button" else None for description in descriptions]
+
+    def visual(page, targets):
+        batch["calls"].append(("visual", [selector for selector, _, _ in targets]))
+        return {selector: {'type': 'coord', 'x': 5, 'y': 6, 'score': 0.8} if selector == "#b" else None
+                for selector, _, _ in targets}
+
+    monkeypatch.setattr(healing_strategy, "find_semantic_matches", semantic)
+    monkeypatch.setattr(healing_strategy, "try_visual_fallback_batch", visual)
+
+    results = healing_strategy.find_locators_with_healing(_FakePage(), ["#a", "#b", "#c", "#d", "#a"])
+
+    # Round 1: one batched call per tier for the selectors starting there; round 2: what is left
+    assert batch["calls"] == [("semantic", ["alpha button", "gamma button"]), ("visual", ["#b"]),
+                              ("visual", ["#c"])]
+    assert list(results) == ["#a", "#b", "#c", "#d"]
+    assert results["#a"]["selector"] == "#alpha" and results["#a"]["tier"] == "semantic"
+    assert results["#b"] == {'type': 'coord', 'x': 5, 'y': 6, 'score': 0.8, 'tier': 'visual'}
+    assert results["#c"] is None and results["#d"]["tier"] == "cache"
+    assert batch["stored"] == [("key#a", "semantic"), ("key#b", "visual")]
+    assert scheduler.recorded == [("#a", "semantic", True), ("#c", "semantic", False), ("#b", "visual", True),
+                                  ("#c", "visual", False)]
+
+    with pytest.raises(ValueError):
+        healing_strategy.find_locators_with_healing(_FakePage(), ["#a", "#unmapped"])
+
+
+def _png(image):
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+def _frame_with_button():
+    rng = np.random.default_rng(7)
+    frame = cv2.GaussianBlur((rng.random((300, 400)) * 255).astype(np.uint8), (0, 0), 3)
+    button = np.full((40, 120), 210, np.uint8)
+    cv2.putText(button, "Go", (30, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 20, 2)
+    frame[200:240, 100:220] = button
+    return frame, button
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = TemplateStore([0.9, 1.0, 1.1])
+    monkeypatch.setattr(visual_healing, "TEMPLATE_STORE", store)
+    monkeypatch.setattr(visual_healing, "SPATIAL_PRIOR", SpatialPrior(str(tmp_path / "prior.json")))
+    return store
+
+
+def test_visual_batch_auto_captures_missing_templates_like_the_single_tier(tmp_path, store):
+    frame, button = _frame_with_button()
+
+    page = _FakePage({"#go": _Element(visible=True, png=_png(button))}, screenshot=_png(frame))
+    results = visual_healing.try_visual_fallback_batch(page, [("#go", str(tmp_path / "go.png"), None),
+                                                              ("#gone", str(tmp_path / "gone.png"), None)])
+
+    assert abs(results["#go"]["x"] - 160) <= 2 and abs(results["#go"]["y"] - 220) <= 2
+    assert results["#gone"] is None                             # no template and nothing to capture it from
+    assert store.get(str(tmp_path / "go.png")) is not None          # captured, and written in the background
+    ARTIFACT_WRITER.flush()
+    assert (tmp_path / "go.png").exists()
+
+
+
+def test_visual_batch_looks_each_region_up_once_and_falls_back_to_the_viewport(tmp_path, store):
+    frame, button = _frame_with_button()
+    cv2.imwrite(str(tmp_path / "go.png"), button)
+    footer = _Element(rect={"x": 80, "y": 180, "width": 200, "height": 80, "scrollX": 0, "scrollY": 0})
+    missing = _Element()
+    page = _FakePage({"footer": footer, "#missing-region": missing}, screenshot=_png(frame))
+
+    results = visual_healing.try_visual_fallback_batch(page, [
+        ("#go", str(tmp_path / "go.png"), "footer"), ("#go-again", str(tmp_path / "go.png"), "footer"),
+        ("#go-anywhere", str(tmp_path / "go.png"), "#missing-region")])
+
+    assert footer.lookups == 1 and missing.lookups == 1
+    for result in results.values():                             # in the region, or in the full viewport
+        assert abs(result["x"] - 160) <= 2 and abs(result["y"] - 220) <= 2
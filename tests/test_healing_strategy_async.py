@@ -0,0 +1,61 @@
+# tests/test_healing_strategy_async.py
+import sys
+import os
+import asyncio
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import ELEMENT_MAPPING
+import healing_strategy_async
+from utils.telemetry import TELEMETRY
+
+
+class _FakeScheduler:
+    def __init__(self, scheduled, last_resort):
+        self.scheduled, self.last_resort = scheduled, last_resort
+        self.recorded = []
+
+    def order(self, url, selector, tiers):
+        return list(self.scheduled), list(self.last_resort)
+
+    def record(self, url, selector, tier, success, cost_ms, score=None):
+        self.recorded.append((tier, success))
+
+
+class _FakePage:
+    url = "http://localhost:5000/login"
+
+    def locator(self, selector):
+        return None
+
+
+def test_last_resort_tier_runs_when_scheduled_tier_misses_after_primary_timed_out(monkeypatch):
+    calls = []
+
+    async def primary_timed_out(locator, primary_selector, template_path):
+        calls.append("primary")
+        return None
+
+    async def semantic_misses(page, semantic_desc, primary_selector):
+        await asyncio.sleep(0.02)                               # still running when the primary gives up
+        calls.append("semantic")
+        return None
+
+    async def visual_finds_it(page, template_path, region_selector, primary_selector):
+        calls.append("visual")
+        return {'type': 'coord', 'x': 10, 'y': 20, 'score': 0.9, 'tier': 'visual'}
+
+    scheduler = _FakeScheduler(["semantic"], ["visual"])
+    monkeypatch.setitem(ELEMENT_MAPPING, "#login", ("log in button", "login.png"))
+    monkeypatch.setattr(TELEMETRY, "enabled", False)
+    monkeypatch.setattr(healing_strategy_async, "HEAL_CACHE_ENABLED", False)
+    monkeypatch.setattr(healing_strategy_async, "PRIMARY_SLOW_AFTER_MS", 0)
+    monkeypatch.setattr(healing_strategy_async, "TIER_SCHEDULER", scheduler)
+    monkeypatch.setattr(healing_strategy_async, "_primary_tier", primary_timed_out)
+    monkeypatch.setattr(healing_strategy_async, "_semantic_tier", semantic_misses)
+    monkeypatch.setattr(healing_strategy_async, "_visual_tier", visual_finds_it)
+    monkeypatch.setattr(healing_strategy_async.HEAL_CACHE, "store_async", lambda *args: asyncio.sleep(0))
+
+    result = asyncio.run(healing_strategy_async.find_locator_with_healing_async(_FakePage(), "#login"))
+
+    assert calls == ["primary", "semantic", "visual"]
+    assert result['tier'] == 'visual' and scheduler.recorded == [("semantic", False), ("visual", True)]
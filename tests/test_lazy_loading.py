@@ -0,0 +1,89 @@
+# tests/test_lazy_loading.py
+import sys
+import os
+import subprocess
+import threading
+import time
+import types
+import pytest
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+import conftest
+from utils import groq_lpu_healing, semantic_healing
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+THREADS = 8
+
+
+def _counting_module(monkeypatch, name, cls):
+    """Installs a fake module `name` whose `cls` counts its constructor calls (slowly, to widen the race)."""
+    calls = []
+
+    def construct(*args, **kwargs):
+        calls.append((args, kwargs))
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setitem(sys.modules, name, types.SimpleNamespace(**{cls: construct}))
+    return calls
+
+
+def _call_from_threads(fn) -> list:
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+
+    def run(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_importing_the_healing_modules_loads_no_model_or_client():
+    script = ("import sys, config, utils.semantic_healing, utils.groq_lpu_healing; "
+              "print(sorted(m for m in ('sentence_transformers', 'torch', 'groq') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_semantic_model_is_built_once_across_threads(monkeypatch):
+    calls = _counting_module(monkeypatch, "sentence_transformers", "SentenceTransformer")
+    monkeypatch.setattr(config, "_semantic_model", None)
+    models = _call_from_threads(config.get_semantic_model)
+    assert len(calls) == 1 and calls[0][0] == (config.SEMANTIC_MODEL_NAME,)
+    assert all(model is models[0] for model in models)
+    assert config.SEMANTIC_MODEL is models[0]                   # the module attribute goes through the accessor
+
+
+def test_groq_client_is_built_once_across_threads(monkeypatch):
+    calls = _counting_module(monkeypatch, "groq", "Groq")
+    monkeypatch.setattr(groq_lpu_healing, "_client", None)
+    clients = _call_from_threads(groq_lpu_healing.get_groq_client)
+    assert len(calls) == 1 and all(client is clients[0] for client in clients)
+
+
+@pytest.mark.parametrize("model_warmup", [False, True])
+def test_model_warm_up_thread_is_optional(monkeypatch, model_warmup):
+    started = []
+    monkeypatch.setattr(conftest, "TEMPLATE_WARMUP", False)
+    monkeypatch.setattr(conftest, "MODEL_WARMUP", model_warmup)
+    monkeypatch.setattr(semantic_healing, "start_warm_up_thread", lambda: started.append(True))
+    fixture = conftest.heal_warm_up.__wrapped__()
+    next(fixture)
+    assert started == ([True] if model_warmup else [])
+    fixture.close()
+
+
+def test_failed_warm_up_is_logged_not_raised(monkeypatch):
+    def fail():
+        raise RuntimeError("no model here")
+    monkeypatch.setattr(semantic_healing, "warm_up_semantic_tier", fail)
+    thread = semantic_healing.start_warm_up_thread()
+    thread.join(timeout=5)
+    assert not thread.is_alive() and thread.daemon
@@ -0,0 +1,84 @@
+# tests/test_locator_registry.py
+import sys
+import os
+import json
+from collections import ChainMap
+import cv2
+import numpy as np
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.fixtures import synthetic_template, synthetic_screenshot
+from utils.embedding_cache import EmbeddingCache
+from utils.locator_registry import LocatorRegistry, compile_registry, load_catalog, _Locators, _Regions
+from utils.template_store import TemplateStore
+from utils.visual_healing import match_template
+
+
+def _encoder(texts):
+    return np.array([[len(t), t.count("o"), 1.0] for t in texts], np.float32)
+
+
+def _compile(tmp_path, locators):
+    catalog = tmp_path / "locators.json"
+    catalog.write_text(json.dumps({"locators": locators}))
+    bundle = str(tmp_path / "out" / "locators.bundle")
+    compile_registry(load_catalog(str(catalog)), bundle, encode=_encoder, namespace="test-model", scales=[0.8, 1.0, 1.2])
+    return LocatorRegistry(bundle)
+
+
+def test_compiled_bundle_answers_like_element_mapping(tmp_path):
+    (tmp_path / "templates").mkdir()
+    cv2.imwrite(str(tmp_path / "templates" / "login.png"), synthetic_template())
+    registry = _compile(tmp_path, [
+        {"selector": "#login", "description": "log in button", "template": "templates/login.png", "region": "nav"},
+        {"selector": "#signup", "description": "sign up button"},
+    ] + [{"selector": f"#item-{i}", "description": f"item {i}"} for i in range(2000)])
+
+    assert len(registry) == 2002 and registry.region_count == 1
+    assert registry.lookup("#login") == {"description": "log in button", "template_path": "registry:0",
+                                         "region_selector": "nav"}
+    # No template file yet: the path auto-capture will write to, resolved from the catalog
+    assert registry.lookup("#signup")["template_path"] == str(tmp_path / "templates" / "signup.png")
+    assert registry.lookup("#item-1234")["description"] == "item 1234" and registry.lookup("#missing") is None
+
+    locators = ChainMap({"#signup": ("registration button", "signup.png")}, _Locators(registry))
+    assert locators["#signup"] == ("registration button", "signup.png")         # config wins
+    assert locators["#login"] == ("log in button", "registry:0") and "#item-7" in locators
+    assert ChainMap({}, _Regions(registry)).get("#login") == "nav" and ChainMap({}, _Regions(registry)).get("#signup") is None
+
+
+def test_bundled_templates_are_served_without_decoding(tmp_path):
+    template = synthetic_template()
+    cv2.imwrite(str(tmp_path / "login.png"), template)
+    registry = _compile(tmp_path, [{"selector": "#login", "description": "log in button", "template": "login.png"}])
+    store = TemplateStore([0.8, 1.0, 1.2], registry=registry)
+
+    assert store.has("registry:0") and not store.has("registry:1")
+    assert np.array_equal(store.get("registry:0"), template)
+    t_h, t_w = template.shape
+    variants = store.variants("registry:0")
+    assert set(variants) == {(t_w, t_h, cv2.INTER_LINEAR), (int(t_w * 0.8), int(t_h * 0.8), cv2.INTER_LINEAR),
+                             (int(t_w * 1.2), int(t_h * 1.2), cv2.INTER_LINEAR)}
+
+    screenshot, (center_x, center_y) = synthetic_screenshot(1280, 720, template)
+    match = match_template(screenshot, store.get("registry:0"), variants)
+    assert match is not None
+    assert abs((match['box'][0] + match['box'][2]) // 2 - center_x) <= 6
+
+
+def test_precomputed_embeddings_skip_the_encoder(tmp_path):
+    registry = _compile(tmp_path, [{"selector": "#login", "description": "log in button"}])
+    calls = []
+
+    def encoder(texts):
+        calls.append(list(texts))
+        return _encoder(texts)
+
+    cache = EmbeddingCache(encoder, namespace="test-model",
+                           vector_source=lambda text: registry.vector(text, "test-model"))
+    vectors = cache.encode(["log in button", "search field"])
+
+    assert calls == [["search field"]]
+    expected = _encoder(["log in button"])[0]
+    assert np.allclose(vectors[0], expected / np.linalg.norm(expected), atol=1e-3)
+    assert registry.vector("log in button", "other-model") is None
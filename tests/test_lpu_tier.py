@@ -0,0 +1,140 @@
+# tests/test_lpu_tier.py
+import sys
+import os
+import pytest
+from types import SimpleNamespace
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import groq_lpu_healing
+from utils.lpu_stub_server import start_stub_server
+from utils.telemetry import Telemetry
+
+RECORDS = [
+    {'tag': 'button', 'text': 'Sign Up', 'attrs': {}, 'box': [10, 10, 80, 30], 'visible': True, 'selector': '#signup'},
+    {'tag': 'button', 'text': 'Log In', 'attrs': {}, 'box': [100, 10, 80, 30], 'visible': True, 'selector': '#login'},
+    {'tag': 'a', 'text': 'Forgot password?', 'attrs': {}, 'box': [10, 60, 120, 20], 'visible': True, 'selector': '#forgot'},
+]
+
+
+class _FakeStream:
+    """Streamed completion that records how many chunks were read before close()."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for token in self.tokens:
+            self.read += 1
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    def close(self):
+        self.closed = True
+
+
+def _fake_client(respond):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: respond(kwargs))))
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server, url = start_stub_server()
+    monkeypatch.setattr(groq_lpu_healing, "GROQ_BASE_URL", url)
+    monkeypatch.setattr(groq_lpu_healing, "_client", None)
+    monkeypatch.setattr(groq_lpu_healing, "TELEMETRY", Telemetry())
+    groq_lpu_healing._response_cache.clear()
+    yield server
+    server.shutdown()
+    groq_lpu_healing._client = None
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_lpu_picks_candidate_by_index(stub, monkeypatch, stream):
+    monkeypatch.setattr(groq_lpu_healing, "LPU_STREAM", stream)
+
+    match = groq_lpu_healing.choose_lpu_match("log in button", RECORDS)
+
+    assert match['selector'] == '#login'
+    assert stub.request_count == 1
+
+
+def test_lpu_response_cache_skips_repeat_requests(stub):
+    first = groq_lpu_healing.choose_lpu_match("forgot password link", RECORDS)
+    # Same candidate set in a different order hashes the same
+    second = groq_lpu_healing.choose_lpu_match("forgot password link", list(reversed(RECORDS)))
+
+    assert first['selector'] == second['selector'] == '#forgot'
+    assert stub.request_count == 1
+
+
+def test_lpu_no_match_is_cached_as_none(stub):
+    assert groq_lpu_healing.choose_lpu_match("checkout", RECORDS) is None
+    assert groq_lpu_healing.choose_lpu_match("checkout", RECORDS) is None
+    assert stub.request_count == 1
+
+
+def test_lpu_stream_stops_reading_after_a_complete_index(monkeypatch):
+    stream = _FakeStream(["1", "\n", "Because", " the", " label"])
+    monkeypatch.setattr(groq_lpu_healing, "LPU_STREAM", True)
+    monkeypatch.setattr(groq_lpu_healing, "get_groq_client", lambda: _fake_client(lambda kwargs: stream))
+
+    assert groq_lpu_healing._ask_lpu("prompt") == "1\n"
+    assert stream.read == 2 and stream.closed
+
+
+def test_lpu_duplicate_texts_resolve_to_the_chosen_one(monkeypatch):
+    records = [dict(RECORDS[1], selector='#login-header'), RECORDS[0], dict(RECORDS[1], selector='#login-form')]
+    requests = []
+
+    def answer_last(kwargs):
+        requests.append(kwargs)
+        return SimpleNamespace(id="fake", usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="2"))])
+
+    monkeypatch.setattr(groq_lpu_healing, "LPU_STREAM", False)
+    monkeypatch.setattr(groq_lpu_healing, "get_groq_client", lambda: _fake_client(answer_last))
+    monkeypatch.setattr(groq_lpu_healing, "TELEMETRY", Telemetry())
+    groq_lpu_healing._response_cache.clear()
+
+    assert groq_lpu_healing.choose_lpu_match("log in button", records)['selector'] == '#login-form'
+    # Cache hit for the same set in another order: again the second "Log In" in document order
+    reordered = [records[2], records[0], records[1]]
+    assert groq_lpu_healing.choose_lpu_match("log in button", reordered)['selector'] == '#login-header'
+    assert len(requests) == 1
+
+
+def test_batch_heal_includes_the_lpu_tier_when_enabled(tmp_path, monkeypatch):
+    import healing_strategy
+    from config import ELEMENT_MAPPING
+    from utils.primary_probe import ProbeHistory
+    from utils.tier_scheduler import TierScheduler
+
+    class _Hidden:
+        @property
+        def first(self):
+            return self
+
+        def is_visible(self):
+            return False
+
+    class _Page:
+        url = "http://localhost:5000/login"
+
+        def locator(self, selector):
+            return _Hidden()
+
+    tiers = []
+    monkeypatch.setitem(ELEMENT_MAPPING, "#log-in", ("log in button", "log_in.png"))
+    monkeypatch.setattr(healing_strategy, "LPU_ENABLED", True)
+    monkeypatch.setattr(healing_strategy, "PROBE_HISTORY", ProbeHistory(str(tmp_path / "history.json")))
+    monkeypatch.setattr(healing_strategy, "TIER_SCHEDULER", TierScheduler(str(tmp_path / "tiers.json"), enabled=False))
+    monkeypatch.setattr(healing_strategy, "page_settled", lambda page: True)
+    monkeypatch.setattr(healing_strategy, "heal_cache_keys", lambda page, selectors: dict.fromkeys(selectors))
+    monkeypatch.setattr(healing_strategy, "lookup_healed", lambda page, key: None)
+    monkeypatch.setattr(healing_strategy, "find_lpu_matches",
+                        lambda page, descs: tiers.append("lpu") or [{'selector': '#login', 'text': 'Log In', 'box': []}])
+    monkeypatch.setattr(healing_strategy, "find_semantic_matches", lambda page, descs: tiers.append("semantic") or [None])
+
+    result = healing_strategy._heal_batch(_Page(), ["#log-in"])["#log-in"]
+
+    assert tiers == ["lpu"] and result['tier'] == 'lpu' and result['selector'] == '#login'
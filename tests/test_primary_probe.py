@@ -0,0 +1,58 @@
+# tests/test_primary_probe.py
+import sys
+import os
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import ELEMENT_MAPPING
+import healing_strategy
+from utils import primary_probe
+from utils.primary_probe import ProbeHistory, probe_primary
+
+
+class _FakeElement:
+    def is_visible(self):
+        return True
+
+    def bounding_box(self, timeout=None):
+        return {"x": 10, "y": 10, "width": 100, "height": 30}
+
+    @property
+    def first(self):
+        return self
+
+
+class _FakeLocator:
+    """Matches several elements: only `.first` may be acted on (strict mode)."""
+
+    def __init__(self):
+        self.first = _FakeElement()
+
+    def is_visible(self):
+        raise AssertionError("strict mode violation: locator resolved to 2 elements")
+
+
+class _FakePage:
+    viewport_size = {"width": 1280, "height": 720}
+
+    def __init__(self):
+        self.locators = {}
+
+    def on(self, event, handler):
+        pass
+
+    def locator(self, selector):
+        return self.locators.setdefault(selector, _FakeLocator())
+
+
+def test_primary_success_returns_the_element_that_was_checked(tmp_path, monkeypatch):
+    history = ProbeHistory(str(tmp_path / "history.json"))
+    monkeypatch.setattr(primary_probe, "PROBE_HISTORY", history)
+    monkeypatch.setattr(healing_strategy, "PROBE_HISTORY", history)
+    monkeypatch.setattr(healing_strategy, "ensure_template_captured", lambda locator, path: None)
+    monkeypatch.setattr(healing_strategy.SPATIAL_PRIOR, "enabled", False)
+    monkeypatch.setitem(ELEMENT_MAPPING, ".row-action", ("row action button", "row_action.png"))
+    page = _FakePage()
+
+    assert probe_primary(page, ".row-action") is page.locator(".row-action").first
+    result = healing_strategy._heal_batch(page, [".row-action"])[".row-action"]
+    assert result["value"] is page.locator(".row-action").first and result["verified"]
@@ -0,0 +1,91 @@
+# tests/test_screen_capture.py
+import sys
+import os
+import base64
+import cv2
+import numpy as np
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import screen_capture
+from utils.screen_capture import capture_gray, decode_gray, screenshot_options
+
+
+def _frame():
+    frame = np.zeros((120, 200, 3), np.uint8)
+    frame[:, :, 1] = 180                                            # green → gray 106 after BGR2GRAY
+    cv2.rectangle(frame, (40, 30), (120, 80), (255, 255, 255), -1)
+    return frame
+
+
+class _FakeCDPSession:
+    def __init__(self, png_bytes):
+        self.png_bytes = png_bytes
+        self.calls = []
+
+    def send(self, method, params):
+        self.calls.append((method, params))
+        return {"data": base64.b64encode(self.png_bytes).decode()}
+
+
+class _FakeContext:
+    def __init__(self, session):
+        self.session = session
+
+    def new_cdp_session(self, page):
+        if self.session is None:
+            raise RuntimeError("CDP sessions are only supported in Chromium")
+        return self.session
+
+
+class _FakePage:
+    def __init__(self, png_bytes, session=None):
+        self.png_bytes = png_bytes
+        self.context = _FakeContext(session)
+        self.screenshots = []
+
+    def screenshot(self, **kwargs):
+        self.screenshots.append(kwargs)
+        return self.png_bytes
+
+
+def test_decode_gray_matches_color_conversion():
+    frame = _frame()
+    png = cv2.imencode(".png", frame)[1].tobytes()
+    gray = decode_gray(png)
+    assert gray.ndim == 2
+    # The codec's own RGB→gray may round differently from cvtColor by one level
+    assert np.abs(gray.astype(int) - cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(int)).max() <= 1
+
+    jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+    assert np.abs(decode_gray(jpeg).astype(int) - gray.astype(int)).mean() < 2   # ringing only at the edges
+
+
+def test_screenshot_options_follow_format_and_clip(monkeypatch):
+    clip = {"x": 10, "y": 20, "width": 30, "height": 40, "scrollX": 0, "scrollY": 500}
+    monkeypatch.setattr(screen_capture, "VISUAL_SCREENSHOT_FORMAT", "jpeg")
+    assert screenshot_options(clip) == {"type": "jpeg", "quality": screen_capture.VISUAL_JPEG_QUALITY,
+                                        "clip": {"x": 10, "y": 20, "width": 30, "height": 40}}
+    monkeypatch.setattr(screen_capture, "VISUAL_SCREENSHOT_FORMAT", "png")
+    assert screenshot_options() == {"type": "png"}
+
+
+def test_cdp_capture_uses_document_clip_and_falls_back(monkeypatch):
+    png = cv2.imencode(".png", _frame())[1].tobytes()
+    monkeypatch.setattr(screen_capture, "VISUAL_CAPTURE", "cdp")
+    monkeypatch.setattr(screen_capture, "VISUAL_SCREENSHOT_FORMAT", "jpeg")
+
+    session = _FakeCDPSession(png)
+    page = _FakePage(png, session)
+    gray = capture_gray(page, {"x": 10, "y": 20, "width": 30, "height": 40, "scrollX": 5, "scrollY": 500})
+    capture_gray(page)
+    assert gray.shape == (120, 200) and not page.screenshots
+    method, params = session.calls[0]
+    assert method == "Page.captureScreenshot" and params["format"] == "jpeg"
+    assert params["clip"] == {"x": 15, "y": 520, "width": 30, "height": 40, "scale": 1}
+    assert "clip" not in session.calls[1][1]
+
+    # No CDP (Firefox/WebKit): one failed attempt, then page.screenshot() for this page
+    page = _FakePage(png)
+    capture_gray(page)
+    capture_gray(page)
+    assert len(page.screenshots) == 2 and page.screenshots[0]["type"] == "jpeg"
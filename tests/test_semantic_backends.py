@@ -0,0 +1,107 @@
+# tests/test_semantic_backends.py
+import sys
+import os
+import subprocess
+import numpy as np
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.semantic_backends import (OnnxBackend, cosine_scores, mean_pool_normalize, onnx_model_path,
+                                     resolve_backend_name, ONNX_MODEL_FILE, ONNX_INT8_MODEL_FILE, TOKENIZER_FILE)
+from utils.embedding_cache import EmbeddingCache
+
+
+class _Encoding:
+    def __init__(self, ids, length):
+        self.ids = ids + [0] * (length - len(ids))
+        self.attention_mask = [1] * len(ids) + [0] * (length - len(ids))
+        self.type_ids = [0] * length
+
+
+class _FakeTokenizer:
+    def encode_batch(self, texts):
+        tokens = [[len(word) for word in text.split()] for text in texts]
+        length = max(len(t) for t in tokens)
+        return [_Encoding(t, length) for t in tokens]
+
+
+class _Input:
+    def __init__(self, name):
+        self.name = name
+
+
+class _FakeSession:
+    """Token embedding = [token id, 1]; padding tokens get a huge value that pooling must ignore."""
+
+    def __init__(self):
+        self.feeds = []
+
+    def get_inputs(self):
+        return [_Input("input_ids"), _Input("attention_mask")]
+
+    def run(self, outputs, feed):
+        self.feeds.append(feed)
+        ids, mask = feed["input_ids"].astype(np.float32), feed["attention_mask"]
+        hidden = np.stack([ids, np.ones_like(ids)], axis=-1)
+        hidden[mask == 0] = 1000.0
+        return [hidden]
+
+
+def test_mean_pooling_ignores_padding_and_normalizes():
+    tokens = np.array([[[3.0, 4.0], [100.0, 100.0]]])
+    pooled = mean_pool_normalize(tokens, np.array([[1, 0]]))
+    np.testing.assert_allclose(pooled, [[0.6, 0.8]], rtol=1e-6)
+
+
+def test_onnx_backend_feeds_only_model_inputs():
+    session = _FakeSession()
+    backend = OnnxBackend("model.onnx", "tokenizer.json", session=session, tokenizer=_FakeTokenizer())
+
+    vectors = backend.encode(["log in", "sign up now"])
+
+    assert set(session.feeds[0]) == {"input_ids", "attention_mask"}      # no token_type_ids
+    assert vectors.shape == (2, 2)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-6)
+    expected = np.array([2.5, 1.0]) / np.linalg.norm([2.5, 1.0])          # mean of [3, 1] and [2, 1]
+    np.testing.assert_allclose(vectors[0], expected, rtol=1e-6)
+
+
+def test_float16_storage_scores_like_float32():
+    rng = np.random.default_rng(0)
+    candidates = rng.normal(size=(500, 384)).astype(np.float32)
+    candidates /= np.linalg.norm(candidates, axis=1, keepdims=True)
+    targets = candidates[:3]
+
+    cache = EmbeddingCache(lambda texts: candidates[[int(t) for t in texts]], dtype="float16")
+    stored = cache.encode([str(i) for i in range(500)])
+    scores = cosine_scores(stored, cache.encode(["0", "1", "2"]))
+
+    assert stored.dtype == np.float16 and scores.dtype == np.float32
+    np.testing.assert_allclose(scores, candidates @ targets.T, atol=2e-3)
+    assert list(scores.argmax(axis=0)) == [0, 1, 2]
+
+
+def test_onnx_model_discovery_prefers_int8(tmp_path):
+    model_dir = str(tmp_path)
+    assert onnx_model_path(model_dir) is None
+    (tmp_path / TOKENIZER_FILE).write_text("{}")
+    (tmp_path / ONNX_MODEL_FILE).write_bytes(b"")
+    assert onnx_model_path(model_dir, quantized=True).endswith(ONNX_MODEL_FILE)
+    (tmp_path / ONNX_INT8_MODEL_FILE).write_bytes(b"")
+    assert onnx_model_path(model_dir, quantized=True).endswith(ONNX_INT8_MODEL_FILE)
+    assert onnx_model_path(model_dir, quantized=False).endswith(ONNX_MODEL_FILE)
+
+    assert resolve_backend_name("sentence-transformers") == "sentence-transformers"
+    assert resolve_backend_name("onnx") == "onnx"
+
+
+def test_onnx_without_exported_model_fails_on_first_use_not_on_import(tmp_path):
+    script = ("from utils.embedding_cache import EMBEDDING_CACHE\n"
+              "from utils.semantic_backends import get_semantic_backend\n"
+              "print(EMBEDDING_CACHE.namespace)\n"
+              "get_semantic_backend()")
+    env = dict(os.environ, SEMANTIC_BACKEND="onnx", SEMANTIC_ONNX_DIR=str(tmp_path))
+    proc = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env,
+                          cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+    assert proc.stdout.strip() == "all-MiniLM-L6-v2"
+    assert proc.returncode != 0 and "FileNotFoundError: No exported ONNX model" in proc.stderr
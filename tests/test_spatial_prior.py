@@ -0,0 +1,96 @@
+# tests/test_spatial_prior.py
+import sys
+import os
+import json
+import cv2
+import numpy as np
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import visual_healing
+from utils.spatial_prior import SpatialPrior
+from utils.visual_healing import match_template, match_with_prior, locate_in_viewport
+
+_VIEWPORT = (1920, 1080)
+
+
+def _page_with_button(x, y):
+    rng = np.random.default_rng(3)
+    page = cv2.GaussianBlur((rng.random((_VIEWPORT[1], _VIEWPORT[0])) * 255).astype(np.uint8), (0, 0), 3)
+    button = np.full((60, 180), 200, np.uint8)
+    cv2.putText(button, "Login", (10, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 30, 3)
+    page[y:y + 60, x:x + 180] = button
+    return page, button
+
+
+def test_windows_grow_around_recorded_positions(tmp_path):
+    prior = SpatialPrior(str(tmp_path / "prior.json"))
+    assert prior.windows("#login", _VIEWPORT, (60, 180)) == []
+
+    for dx in (0, 4, -4):
+        prior.record("#login", {"x": 900 + dx, "y": 500, "width": 180, "height": 60}, _VIEWPORT)
+    windows = prior.windows("#login", _VIEWPORT, (60, 180))
+
+    assert len(windows) == 2
+    (x0, y0, x1, y1), (bx0, by0, bx1, by1) = windows
+    assert x0 < 990 < x1 and y0 < 530 < y1                      # around the median center
+    assert x1 - x0 >= 3 * 180 and bx1 - bx0 > x1 - x0           # factor × element size, widening
+    assert prior.windows("#login", (1280, 720), (60, 180)) == []  # other viewport size: no prior
+
+
+def test_positions_persist_and_merge(tmp_path):
+    path = str(tmp_path / "prior.json")
+    first, second = SpatialPrior(path), SpatialPrior(path)
+    first.record("#login", {"x": 10, "y": 20, "width": 100, "height": 40}, {"width": 1280, "height": 720})
+    first.flush()
+    second.record("#signup", {"x": 50, "y": 20, "width": 100, "height": 40}, {"width": 1280, "height": 720})
+    second.flush()
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["#login"]["1280x720"] == [[60.0, 40.0, 100.0, 40.0]]
+    assert set(data) == {"#login", "#signup"}
+
+
+def test_match_with_prior_searches_window_then_full_frame(tmp_path, monkeypatch):
+    prior = SpatialPrior(str(tmp_path / "prior.json"))
+    monkeypatch.setattr(visual_healing, "SPATIAL_PRIOR", prior)
+    page, button = _page_with_button(1500, 700)
+    full = match_template(page, button)
+
+    # Element drifted a few pixels since it was last seen: found inside the first window
+    prior.record("#login", {"x": 1490, "y": 705, "width": 180, "height": 60}, _VIEWPORT)
+    assert match_with_prior(page, button, None, "#login")["box"] == full["box"]
+
+    # Stale prior on the other side of the page: windows miss, full frame still finds it
+    prior.record("#stale", {"x": 100, "y": 100, "width": 180, "height": 60}, _VIEWPORT)
+    assert match_with_prior(page, button, None, "#stale")["box"] == full["box"]
+
+
+def test_hidpi_screenshot_positions_are_kept_in_css_pixels(tmp_path, monkeypatch):
+    prior = SpatialPrior(str(tmp_path / "prior.json"))
+    monkeypatch.setattr(visual_healing, "SPATIAL_PRIOR", prior)
+    page, button = _page_with_button(1500, 700)                 # a 960×540 CSS viewport at device scale 2
+    cv2.imwrite(str(tmp_path / "login.png"), button)
+    viewport = {"width": 960, "height": 540}
+
+    result = locate_in_viewport(page, str(tmp_path / "login.png"), None, "#login", viewport)
+    assert abs(result["x"] - 795) <= 2 and abs(result["y"] - 365) <= 2          # CSS pixels, like clicks
+    [[cx, cy, width, height]] = prior._data["#login"]["960x540"]
+    assert abs(cx - 795) <= 2 and abs(cy - 365) <= 2 and abs(width - 90) <= 2 and abs(height - 30) <= 2
+
+    # The next search starts in the prior's window, scaled back to screenshot pixels
+    (x0, y0, x1, y1), *_ = prior.windows("#login", (960, 540), (30, 90))
+    box = match_with_prior(page, button, None, "#login", viewport)["box"]
+    assert box == match_template(page, button)["box"]
+    assert 2 * x0 <= box[0] and box[2] <= 2 * x1 and 2 * y0 <= box[1] and box[3] <= 2 * y1
+
+    region = {"x": 700, "y": 300, "width": 200, "height": 150}
+    in_region = locate_in_viewport(page, str(tmp_path / "login.png"), region, "#login", viewport)
+    assert (in_region["x"], in_region["y"]) == (result["x"], result["y"])
+
+
+def test_primary_samples_are_throttled(tmp_path):
+    prior = SpatialPrior(str(tmp_path / "prior.json"))
+    assert prior.wants_primary_sample("#login")
+    assert not prior.wants_primary_sample("#login")
+    assert prior.wants_primary_sample("#signup")
@@ -0,0 +1,138 @@
+# tests/test_telemetry.py
+import sys
+import os
+import asyncio
+import json
+import subprocess
+import pytest
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.telemetry import Telemetry, NULL_SPAN
+
+
+def test_spans_are_recorded_per_tier_with_attributes():
+    telemetry = Telemetry()
+
+    @telemetry.traced
+    def heal(page, primary_selector):
+        with telemetry.span("primary"):
+            pass
+        with telemetry.span("semantic") as span:
+            telemetry.annotate(candidates=42, best_score=0.91)
+            span.found()
+        return {'type': 'locator', 'tier': 'semantic'}
+
+    heal(None, "#login")
+
+    trace = telemetry.traces[0]
+    assert trace.selector == "#login" and trace.tier == "semantic"
+    assert [(s.name, s.outcome) for s in trace.spans] == [("primary", "miss"), ("semantic", "found")]
+    assert trace.spans[1].attrs == {"candidates": 42, "best_score": 0.91}
+
+
+def test_errors_and_cancellations_are_marked():
+    telemetry = Telemetry()
+
+    async def tier():
+        with telemetry.span("visual"):
+            await asyncio.sleep(10)
+
+    @telemetry.traced
+    async def heal(page, primary_selector):
+        task = asyncio.create_task(tier())
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        with telemetry.span("semantic"):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(heal(None, "#login"))
+
+    trace = telemetry.traces[0]
+    assert trace.tier is None
+    assert {s.name: s.outcome for s in trace.spans} == {"visual": "cancelled", "semantic": "error"}
+
+
+def test_disabled_and_untraced_spans_are_no_ops():
+    telemetry = Telemetry(enabled=False)
+    with telemetry.heal("#login") as trace:
+        with telemetry.span("primary") as span:
+            telemetry.annotate(ignored=True)
+    assert trace is None and span is NULL_SPAN
+    assert not telemetry.traces
+
+    with Telemetry().span("primary") as span:          # outside a heal
+        assert span is NULL_SPAN
+
+
+def test_jsonl_and_openmetrics_export(tmp_path):
+    telemetry = Telemetry()
+    for tier in ("semantic", "visual"):
+        with telemetry.heal("#login") as trace:
+            with telemetry.span(tier) as span:
+                span.found()
+            trace.tier = tier
+    telemetry.count("heal_cache_miss", 2)
+
+    path = tmp_path / "traces.jsonl"
+    assert telemetry.export_jsonl(str(path)) == 2
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["tier"] for line in lines] == ["semantic", "visual"]
+
+    metrics = telemetry.openmetrics()
+    assert 'heal_tier_attempts_total{tier="semantic",outcome="found"} 1' in metrics
+    assert 'heal_tier_duration_seconds_count{tier="visual"} 1' in metrics
+    assert 'heal_events_total{event="heal_cache_miss"} 2' in metrics
+    assert metrics.endswith("# EOF\n")
+    assert "semantic" in telemetry.summary()
+
+
+def _heal(telemetry, tier, found):
+    with telemetry.heal("#login") as trace:
+        with telemetry.span(tier) as span:
+            if found:
+                span.found()
+        trace.tier = tier if found else None
+
+
+def test_worker_aggregates_merge_into_the_controller():
+    workers = [Telemetry(), Telemetry()]
+    _heal(workers[0], "semantic", True)
+    _heal(workers[1], "semantic", False)
+    _heal(workers[1], "visual", True)
+    workers[1].count("heal_cache_hit", 3)
+
+    controller = Telemetry()
+    for worker in workers:
+        controller.merge(json.loads(json.dumps(worker.aggregates())))     # what crosses the xdist channel
+
+    assert controller.heals == 3 and not controller.traces
+    metrics = controller.openmetrics()
+    assert 'heal_tier_attempts_total{tier="semantic",outcome="found"} 1' in metrics
+    assert 'heal_tier_attempts_total{tier="semantic",outcome="miss"} 1' in metrics
+    assert 'heal_tier_duration_seconds_count{tier="semantic"} 2' in metrics
+    assert 'heals_total{tier="unresolved"} 1' in metrics
+    assert 'heal_events_total{event="heal_cache_hit"} 3' in metrics
+    assert "visual" in controller.summary()
+
+
+def test_xdist_session_summary_covers_every_worker(tmp_path):
+    pytest.importorskip("xdist")
+    (tmp_path / "test_heals.py").write_text(
+        "import pytest\n"
+        "from utils.telemetry import TELEMETRY\n\n"
+        "@pytest.mark.parametrize('n', range(4))\n"
+        "def test_heal(n):\n"
+        "    with TELEMETRY.heal('#login') as trace:\n"
+        "        with TELEMETRY.span('semantic') as span:\n"
+        "            span.found()\n"
+        "        trace.tier = 'semantic'\n")
+    jsonl = tmp_path / "traces.jsonl"
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    env = dict(os.environ, PYTHONPATH=project_root, EMBEDDING_SERVICE="0", TEMPLATE_WARMUP="0",
+               TELEMETRY_ENABLED="1", TELEMETRY_JSONL_PATH=str(jsonl))
+    out = subprocess.run([sys.executable, "-m", "pytest", "-p", "conftest", "-n", "2", "-q", "test_heals.py"],
+                         cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert out.returncode == 0, out.stdout + out.stderr
+    assert "4 heals" in out.stdout and len(jsonl.read_text().splitlines()) == 4
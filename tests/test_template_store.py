@@ -0,0 +1,73 @@
+# tests/test_template_store.py
+import sys
+import os
+import cv2
+import numpy as np
+import pytest
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.template_store import TemplateStore
+
+SCALES = [0.5, 1.0, 2.0]
+
+
+def _write_png(path, width, height, value):
+    cv2.imwrite(str(path), np.full((height, width), value, np.uint8))
+
+
+def _bump_mtime(path):
+    """Moves the file's mtime forward, so a rewrite within the filesystem's mtime granularity still counts."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def store():
+    return TemplateStore(SCALES)
+
+
+def test_template_is_decoded_once_with_a_variant_per_scale(store, tmp_path):
+    path = str(tmp_path / "button.png")
+    _write_png(path, 40, 20, 100)
+
+    gray = store.get(path)
+    assert gray.shape == (20, 40) and store.get(path) is gray
+    assert set(store.variants(path)) == {(20, 10, cv2.INTER_LINEAR), (40, 20, cv2.INTER_LINEAR),
+                                         (80, 40, cv2.INTER_LINEAR)}
+
+
+def test_rewritten_template_drops_stale_variants(store, tmp_path):
+    path = str(tmp_path / "button.png")
+    _write_png(path, 40, 20, 100)
+    old = store.get(path)
+    store.variants(path)[(10, 5, cv2.INTER_AREA)] = np.zeros((5, 10), np.uint8)   # memoized pyramid level
+
+    _write_png(path, 60, 30, 200)
+    _bump_mtime(path)
+    new = store.get(path)
+    assert new is not old and new.shape == (30, 60) and int(new[0, 0]) == 200
+    variants = store.variants(path)
+    assert set(variants) == {(30, 15, cv2.INTER_LINEAR), (60, 30, cv2.INTER_LINEAR), (120, 60, cv2.INTER_LINEAR)}
+    assert all(int(image[0, 0]) == 200 for image in variants.values())
+
+
+def test_deleted_template_is_forgotten(store, tmp_path):
+    path = str(tmp_path / "button.png")
+    _write_png(path, 40, 20, 100)
+    assert store.has(path) and store.get(path) is not None
+
+    os.remove(path)
+    assert store.get(path) is None and store.variants(path) == {} and not store.has(path)
+
+
+def test_captured_template_is_served_until_its_file_changes(store, tmp_path):
+    path = str(tmp_path / "captured.png")
+    _, png = cv2.imencode(".png", np.full((20, 40), 50, np.uint8))
+    captured = store.put_captured(path, png.tobytes())
+    assert store.get(path) is captured                          # before the background write lands
+    store.flush()
+    assert os.path.exists(path) and store.get(path) is captured
+
+    _write_png(path, 40, 20, 150)
+    _bump_mtime(path)
+    assert int(store.get(path)[0, 0]) == 150
@@ -0,0 +1,73 @@
+# tests/test_tier_scheduler.py
+import sys
+import os
+import json
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import healing_strategy
+from utils.tier_scheduler import TierScheduler, GLOBAL_KEY
+
+_URL = "http://localhost:5000/orders/12345?tab=1"
+_DEFAULT_COSTS = {"semantic": 300.0, "visual": 400.0}
+
+
+def _scheduler(tmp_path, name="stats.json"):
+    return TierScheduler(str(tmp_path / name), default_cost_ms=_DEFAULT_COSTS)
+
+
+def test_tiers_ordered_by_expected_cost_and_failing_tiers_demoted(tmp_path):
+    scheduler = _scheduler(tmp_path)
+    assert scheduler.order(_URL, "#login", ["semantic", "visual"]) == (["semantic", "visual"], [])
+
+    # Semantic keeps missing on this page, visual keeps finding it
+    for _ in range(2):
+        scheduler.record(_URL, "#login", "semantic", False, 250)
+        scheduler.record(_URL, "#login", "visual", True, 450, score=0.9)
+    assert scheduler.order(_URL, "#login", ["semantic", "visual"]) == (["visual", "semantic"], [])
+
+    for _ in range(3):
+        scheduler.record(_URL, "#login", "semantic", False, 250)
+    assert scheduler.order(_URL, "#login", ["semantic", "visual"]) == (["visual"], ["semantic"])
+    # Same page pattern (id segment and query ignored) → same stats
+    assert scheduler.order("http://localhost:5000/orders/999", "#login", ["semantic", "visual"])[1] == ["semantic"]
+    # Other selector: only the cross-page rates apply, which reorder but never demote
+    assert scheduler.order(_URL, "#signup", ["semantic", "visual"]) == (["visual", "semantic"], [])
+
+
+def test_stats_persist_merge_and_are_inspectable(tmp_path):
+    first, second = _scheduler(tmp_path), _scheduler(tmp_path)
+    first.record(_URL, "#login", "visual", True, 400, score=0.8)
+    first.flush()
+    second.record(_URL, "#signup", "semantic", True, 200, score=0.75)
+    second.flush()
+
+    with open(tmp_path / "stats.json", encoding="utf-8") as f:
+        data = json.load(f)
+    assert set(data) == {GLOBAL_KEY, "http://localhost:5000/orders/* #login", "http://localhost:5000/orders/* #signup"}
+
+    rows = _scheduler(tmp_path).rows("#login")
+    assert rows == [{"key": "http://localhost:5000/orders/* #login", "tier": "visual", "samples": 1,
+                     "success_rate": 1.0, "cost_ms": 400.0, "confidence": 0.8, "status": "scheduled"}]
+
+
+class _Page:
+    url = _URL
+
+
+def test_heal_runs_demoted_tier_only_as_last_resort(tmp_path, monkeypatch):
+    scheduler = _scheduler(tmp_path)
+    monkeypatch.setattr(healing_strategy, "TIER_SCHEDULER", scheduler)
+    for _ in range(5):
+        scheduler.record(_URL, "#login", "semantic", False, 250)
+
+    calls = []
+    tiers = {"semantic": lambda: calls.append("semantic") or {'tier': 'semantic', 'score': 0.8},
+             "visual": lambda: calls.append("visual") or {'tier': 'visual', 'score': 0.9}}
+    assert healing_strategy._run_scheduled(_Page(), "#login", tiers)['tier'] == 'visual'
+    assert calls == ["visual"]                                  # semantic skipped
+
+    calls.clear()
+    tiers["visual"] = lambda: calls.append("visual")            # visual misses → semantic still gets its turn
+    assert healing_strategy._run_scheduled(_Page(), "#login", tiers)['tier'] == 'semantic'
+    assert calls == ["visual", "semantic"]
+    assert scheduler.rows("#login")[0]["samples"] == 6
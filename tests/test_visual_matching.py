@@ -0,0 +1,66 @@
+# tests/test_visual_matching.py
+import sys
+import os
+import cv2
+import numpy as np
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import visual_healing
+from utils.visual_healing import match_template
+
+
+def _synthetic_page(height=1080, width=1920, button_at=(1500, 700)):
+    """Blurred noise background with one high-contrast 'Login' button pasted in."""
+    rng = np.random.default_rng(1)
+    page = cv2.GaussianBlur((rng.random((height, width)) * 255).astype(np.uint8), (0, 0), 3)
+    button = np.full((60, 180), 200, np.uint8)
+    cv2.putText(button, "Login", (10, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 30, 3)
+    x, y = button_at
+    page[y:y + 60, x:x + 180] = button
+    return page, button
+
+
+def test_pyramid_search_finds_scaled_template(monkeypatch):
+    page, button = _synthetic_page()
+    template = cv2.resize(button, (150, 50))          # element rendered 1.2x larger than the template
+    monkeypatch.setattr(visual_healing, "SCALES", [0.8 + 0.05 * i for i in range(13)])
+
+    match = match_template(page, template)
+
+    assert match is not None
+    x1, y1, x2, y2 = match['box']
+    assert abs(x1 - 1500) <= 3 and abs(y1 - 700) <= 3
+    assert abs((x2 - x1) - 180) <= 6
+    assert match['score'] > 0.9
+
+
+def test_pyramid_and_full_resolution_agree(monkeypatch):
+    page, button = _synthetic_page(button_at=(200, 900))
+
+    pyramid = match_template(page, button)
+    monkeypatch.setattr(visual_healing, "PYRAMID_MIN_IMAGE_AREA", page.size + 1)
+    full = match_template(page, button)
+
+    assert pyramid['box'] == full['box']
+    assert abs(pyramid['score'] - full['score']) < 1e-6
+
+
+def test_non_max_suppression_uses_iou_threshold():
+    boxes = [[0, 0, 100, 100], [10, 0, 110, 100], [60, 0, 160, 100], [300, 300, 350, 350]]
+    scores = [0.9, 0.8, 0.7, 0.6]
+
+    # IoU(0, 1) ≈ 0.82, IoU(0, 2) ≈ 0.25, IoU(1, 2) ≈ 0.43
+    assert visual_healing.non_max_suppression(boxes, scores, overlap_thresh=0.3) == [0, 2, 3]
+    assert visual_healing.non_max_suppression(boxes, scores, overlap_thresh=0.9) == [0, 1, 2, 3]
+
+
+def test_find_peaks_keeps_top_k_local_maxima():
+    res = np.zeros((50, 50), np.float32)
+    res[10, 10], res[11, 10] = 0.9, 0.85       # second pixel is not a local maximum
+    res[30, 40] = 0.7
+    res[40, 5] = 0.6
+
+    xs, ys, scores = visual_healing.find_peaks(res, min_score=0.5, top_k=2)
+
+    assert list(zip(xs.tolist(), ys.tolist())) == [(10, 10), (40, 30)]
+    np.testing.assert_allclose(scores, [0.9, 0.7])
@@ -0,0 +1,206 @@
+# utils/action_pipeline.py
+"""
+Heal-and-act pipeline for sequences of steps, e.g. a form:
+
+    results = run_actions(page, [
+        ("#username", "fill", "alice"),
+        ("#password", "fill", "secret"),
+        ('button:has-text("Login")', "click"),
+    ])
+
+- The steps are cut into segments, each ending with a step that may change the page
+  (anything but fill / type / clear / focus). A segment's selectors are resolved together with
+  find_locators_with_healing right before it runs, so elements revealed by a click are looked up
+  after that click.
+- Healing has just confirmed the elements are visible, so steps run without a separate
+  wait_for, and ACTION_TIMEOUT_MS is their action timeout.
+- With ACTION_FUSE_FILLS, consecutive fills of plain text inputs and textareas run in a single
+  page.evaluate. The value is set through the native setter, then input and change events are
+  dispatched. Fills of anything else run through Playwright.
+- A failed step is healed inline with find_locator_with_healing and retried once, then the
+  pipeline goes on.
+
+Returns one row per step: {'selector', 'action', 'ok', 'tier', 'healed', 'fused', 'error'}.
+After an unrecoverable failure the remaining steps are not run (ok False, error 'skipped'),
+unless continue_on_failure=True.
+"""
+import logging
+import time
+from typing import Iterator, NamedTuple
+
+from playwright.sync_api import Page
+
+from config import ACTION_TIMEOUT_MS, ACTION_FUSE_FILLS
+from healing_strategy import find_locator_with_healing, find_locators_with_healing
+from utils.actions import apply_action
+from utils.heal_cache import HEAL_CACHE
+from utils.locator_registry import LOCATORS
+from utils.telemetry import TELEMETRY
+
+logger = logging.getLogger(__name__)
+
+# Actions that leave the page's set of elements alone: they do not end a segment
+_KEEPS_PAGE = {"fill", "type", "clear", "focus"}
+# Locator actions that take a `timeout` keyword
+_TIMEOUT_ACTIONS = {"click", "dblclick", "fill", "type", "press", "hover", "focus", "blur", "clear", "check",
+                    "uncheck", "select_option"}
+
+# Fills elements in order until one is not a plain, visible, editable text field (or its selector
+# is not CSS matching exactly one element). Returns how many were filled.
+_FILL_JS = """
+(fills) => {
+    let done = 0;
+    for (const [selector, value] of fills) {
+        let elements;
+        try { elements = document.querySelectorAll(selector); } catch (e) { break; }
+        if (elements.length !== 1) break;
+        const el = elements[0];
+        const textInput = el instanceof HTMLInputElement && /^(text|password|email|search|tel|url)$/.test(el.type);
+        if (!textInput && !(el instanceof HTMLTextAreaElement)) break;
+        if (el.disabled || el.readOnly || !el.getClientRects().length || getComputedStyle(el).visibility === 'hidden') break;
+        el.focus();
+        const proto = textInput ? HTMLInputElement.prototype : HTMLTextAreaElement.prototype;
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);   // what frameworks listen to
+        el.dispatchEvent(new InputEvent('input', {bubbles: true, inputType: 'insertText', data: value}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+        done++;
+    }
+    return done;
+}
+"""
+
+
+class Step(NamedTuple):
+    selector: str
+    action: str
+    args: tuple = ()
+    kwargs: dict | None = None
+
+
+def _as_step(item) -> Step:
+    if isinstance(item, Step):
+        return item
+    selector, action, *args = item
+    return Step(selector, action, tuple(args))
+
+
+def _segments(steps: list[Step]) -> Iterator[list[int]]:
+    """Step indices, cut after every step that may change the page."""
+    segment = []
+    for i, step in enumerate(steps):
+        segment.append(i)
+        if step.action not in _KEEPS_PAGE:
+            yield segment
+            segment = []
+    if segment:
+        yield segment
+
+
+def _fusable(step: Step, result: dict | None) -> bool:
+    return (ACTION_FUSE_FILLS and step.action == "fill" and len(step.args) == 1 and not step.kwargs
+            and result is not None and result.get('type') == 'locator')
+
+
+def _row(step: Step, result: dict | None, ok: bool, **extra) -> dict:
+    row = {'selector': step.selector, 'action': step.action, 'ok': ok,
+           'tier': result.get('tier') if result else None, 'healed': False, 'fused': False, 'error': None}
+    row.update(extra)
+    return row
+
+
+def _describe(error: Exception) -> str:
+    return str(error).splitlines()[0] if str(error) else type(error).__name__
+
+
+def _act(page: Page, step: Step, result: dict):
+    kwargs = dict(step.kwargs or {})
+    if result.get('type') == 'locator':
+        if step.action in _TIMEOUT_ACTIONS:
+            kwargs.setdefault("timeout", ACTION_TIMEOUT_MS)
+        # The action's own actionability wait replaces the separate wait_for (e.g. after a cache hit)
+        result = dict(result, verified=True)
+    apply_action(page, result, step.action, *step.args, **kwargs)
+
+
+def _run_step(page: Page, step: Step, resolved: dict) -> dict:
+    """Runs one step; on failure heals its selector again and retries once."""
+    result = resolved.get(step.selector)
+    error = "not found"
+    if result is not None:
+        try:
+            _act(page, step, result)
+            return _row(step, result, True)
+        except Exception as e:
+            error = _describe(e)
+            logger.info(f"Step {step.action} on {step.selector} failed ({error}) → healing inline")
+            if result.get('tier') == 'cache':
+                # The key the entry was found under: the DOM may have changed since the lookup
+                HEAL_CACHE.invalidate(result.get('cache_key'))
+    TELEMETRY.count("action_inline_heal")
+    healed = find_locator_with_healing(page, step.selector)
+    if healed is None:
+        return _row(step, result, False, healed=True, error=error)
+    resolved[step.selector] = healed
+    try:
+        _act(page, step, healed)
+        return _row(step, healed, True, healed=True)
+    except Exception as e:
+        return _row(step, healed, False, healed=True, error=_describe(e))
+
+
+def _fuse_fills(page: Page, steps: list[Step], resolved: dict) -> int:
+    """Fills the leading steps of `steps` in one evaluate. Returns how many were done."""
+    fills = [[resolved[step.selector].get('selector') or step.selector, str(step.args[0])] for step in steps]
+    try:
+        done = page.evaluate(_FILL_JS, fills)
+    except Exception as e:
+        logger.debug(f"Fused fill failed: {e}")
+        return 0
+    if done:
+        TELEMETRY.count("action_fused_fill", done)
+    return done
+
+
+def run_actions(page: Page, steps: list, continue_on_failure: bool = False) -> list[dict]:
+    """
+    Resolves and runs `steps`: (selector, action, *args) tuples or Step objects, whose
+    selectors must be in ELEMENT_MAPPING or the locator registry. See the module docstring.
+    """
+    steps = [_as_step(item) for item in steps]
+    for step in steps:
+        if step.selector not in LOCATORS:
+            raise ValueError(f"No mapping defined for selector: {step.selector}")
+
+    start = time.perf_counter()
+    rows: list[dict | None] = [None] * len(steps)
+    failed = False
+    for segment in _segments(steps):
+        if failed and not continue_on_failure:
+            break
+        resolved = find_locators_with_healing(page, list(dict.fromkeys(steps[i].selector for i in segment)))
+        pos = 0
+        while pos < len(segment) and not (failed and not continue_on_failure):
+            run = []
+            for i in segment[pos:]:
+                if not _fusable(steps[i], resolved.get(steps[i].selector)):
+                    break
+                run.append(i)
+            if len(run) > 1:
+                done = _fuse_fills(page, [steps[i] for i in run], resolved)
+                for i in run[:done]:
+                    rows[i] = _row(steps[i], resolved[steps[i].selector], True, fused=True)
+                pos += done
+                if done == len(run):
+                    continue
+            # Not fusable, or where the fused fill stopped: through Playwright
+            i = segment[pos]
+            rows[i] = _run_step(page, steps[i], resolved)
+            failed = failed or not rows[i]['ok']
+            pos += 1
+
+    rows = [row if row is not None else _row(step, None, False, error="skipped") for step, row in zip(steps, rows)]
+    succeeded = sum(1 for row in rows if row['ok'])
+    logger.info(f"Action pipeline: {succeeded}/{len(steps)} steps in {(time.perf_counter() - start) * 1000:.0f} ms "
+                f"({sum(1 for row in rows if row['fused'])} fused fills, "
+                f"{sum(1 for row in rows if row['healed'])} healed inline)")
+    return rows
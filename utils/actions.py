@@ -1,5 +1,8 @@
+import logging
 from playwright.sync_api import Page, Locator, TimeoutError as PlaywrightTimeoutError
-from bs4 import BeautifulSoup
+from utils.dom_candidates import extract_candidates, candidate_text
+
+logger = logging.getLogger(__name__)
 
 def perform_action(page: Page, result: dict | None, action: str, *args, **kwargs) -> bool:
     """
@@ -21,88 +24,94 @@ def perform_action(page: Page, result: dict | None, action: str, *args, **kwargs
         perform_action(page, result, "press", "Enter")                     # press key
     """
     if not result:
-        print("No valid locator or coordinates found → cannot perform action")
+        logger.warning("No valid locator or coordinates found → cannot perform action")
         return False
 
+    try:
+        apply_action(page, result, action, *args, **kwargs)
+        if result.get('type') == 'coord':
+            logger.info(f"→ Action '{action}' succeeded at coordinates ({result['x']}, {result['y']})")
+        else:
+            logger.info(f"→ Action '{action}' succeeded on locator")
+        return True
+
+    except PlaywrightTimeoutError:
+        logger.warning(f"Action '{action}' failed: element/position not ready (timeout)")
+        return False
+    except Exception as e:
+        logger.warning(f"Action '{action}' failed: {str(e)}")
+        return False
+
+def apply_action(page: Page, result: dict, action: str, *args, **kwargs):
+    """
+    Performs `action` on a healing result like perform_action, but raises instead of returning
+    False: ValueError for unusable results or actions, Playwright errors as they come.
+    """
     result_type = result.get('type')
 
-    try:
-        if result_type == 'locator':
-            locator: Locator = result['value']
+    if result_type == 'locator':
+        locator: Locator = result['value']
 
-            # Wait for element to be actionable
+        # Wait for element to be actionable (unless healing just confirmed it is visible;
+        # the action itself still auto-waits for actionability)
+        if not result.get('verified'):
             locator.wait_for(state="visible", timeout=8000)
 
-            # Common actions
-            if action == "click":
-                locator.click(**kwargs)
-            elif action in ("type", "fill"):
-                if not args:
-                    raise ValueError(f"Action '{action}' requires text argument")
-                text = str(args[0])
-                if action == "type":
-                    locator.type(text, **kwargs)
-                else:
-                    locator.fill(text, **kwargs)
-            elif action == "press":
-                if not args:
-                    raise ValueError("Action 'press' requires key argument")
-                locator.press(args[0], **kwargs)
-            elif action == "hover":
-                locator.hover(**kwargs)
-            elif action == "focus":
-                locator.focus(**kwargs)
-            elif action == "blur":
-                locator.blur(**kwargs)
-            elif action == "clear":
-                locator.clear(**kwargs)
+        # Common actions
+        if action == "click":
+            locator.click(**kwargs)
+        elif action in ("type", "fill"):
+            if not args:
+                raise ValueError(f"Action '{action}' requires text argument")
+            text = str(args[0])
+            if action == "type":
+                locator.type(text, **kwargs)
             else:
-                # Fallback: call any locator method dynamically
-                method = getattr(locator, action, None)
-                if method and callable(method):
-                    method(*args, **kwargs)
-                else:
-                    raise ValueError(f"Unsupported action '{action}' for locator")
-
-            print(f"→ Action '{action}' succeeded on locator")
-            return True
-
-        elif result_type == 'coord':
-            x = result.get('x')
-            y = result.get('y')  # wait, typo in your example → should be 'y'
-            if x is None or y is None:
-                print("Coordinates missing in result → cannot perform coordinate action")
-                return False
-
-            # Common coordinate-based actions using mouse
-            if action == "click":
-                page.mouse.click(x, y, **kwargs)
-            elif action == "dblclick":
-                page.mouse.dblclick(x, y, **kwargs)
-            elif action == "hover":
-                page.mouse.move(x, y)
-                # no real hover on mouse, but move is closest
-            elif action == "down":
-                page.mouse.down(x, y)
-            elif action == "up":
-                page.mouse.up(x, y)
+                locator.fill(text, **kwargs)
+        elif action == "press":
+            if not args:
+                raise ValueError("Action 'press' requires key argument")
+            locator.press(args[0], **kwargs)
+        elif action == "hover":
+            locator.hover(**kwargs)
+        elif action == "focus":
+            locator.focus(**kwargs)
+        elif action == "blur":
+            locator.blur(**kwargs)
+        elif action == "clear":
+            locator.clear(**kwargs)
+        else:
+            # Fallback: call any locator method dynamically
+            method = getattr(locator, action, None)
+            if method and callable(method):
+                method(*args, **kwargs)
             else:
-                raise ValueError(
-                    f"Action '{action}' not supported for coordinates (only click, dblclick, hover, down, up)")
-
-            print(f"→ Action '{action}' succeeded at coordinates ({x}, {y})")
-            return True
+                raise ValueError(f"Unsupported action '{action}' for locator")
 
+    elif result_type == 'coord':
+        x = result.get('x')
+        y = result.get('y')
+        if x is None or y is None:
+            raise ValueError("Coordinates missing in result → cannot perform coordinate action")
+
+        # Common coordinate-based actions using mouse
+        if action == "click":
+            page.mouse.click(x, y, **kwargs)
+        elif action == "dblclick":
+            page.mouse.dblclick(x, y, **kwargs)
+        elif action == "hover":
+            page.mouse.move(x, y)
+            # no real hover on mouse, but move is closest
+        elif action == "down":
+            page.mouse.down(x, y)
+        elif action == "up":
+            page.mouse.up(x, y)
         else:
-            print(f"Unknown result type: {result_type}")
-            return False
+            raise ValueError(
+                f"Action '{action}' not supported for coordinates (only click, dblclick, hover, down, up)")
 
-    except PlaywrightTimeoutError:
-        print(f"Action '{action}' failed: element/position not ready (timeout)")
-        return False
-    except Exception as e:
-        print(f"Action '{action}' failed: {str(e)}")
-        return False
+    else:
+        raise ValueError(f"Unknown result type: {result_type}")
 
 def click_element_or_coordinates(page: Page, result: dict | None) -> bool:
     """
@@ -111,59 +120,46 @@ def click_element_or_coordinates(page: Page, result: dict | None) -> bool:
     Returns True if click succeeded.
     """
     if not result:
-        print("No result → cannot click")
+        logger.warning("No result → cannot click")
         return False
 
     if result['type'] == 'locator':
         try:
             result['value'].click(timeout=8000)
-            print("→ Clicked using locator")
+            logger.info("→ Clicked using locator")
             return True
         except Exception as e:
-            print(f"Locator click failed: {e}")
+            logger.warning(f"Locator click failed: {e}")
             return False
 
     elif result['type'] == 'coord':
         x = result.get('x')
         y = result.get('y')
         if x is None or y is None:
-            print("Missing x/y coordinates")
+            logger.warning("Missing x/y coordinates")
             return False
         try:
             page.mouse.click(x, y)
-            print(f"→ Clicked at coordinates ({x}, {y})")
+            logger.info(f"→ Clicked at coordinates ({x}, {y})")
             return True
         except Exception as e:
-            print(f"Coordinate click failed: {e}")
+            logger.warning(f"Coordinate click failed: {e}")
             return False
 
     else:
-        print(f"Unsupported result type for click: {result.get('type')}")
+        logger.warning(f"Unsupported result type for click: {result.get('type')}")
         return False
 
 def find_candidates(page: Page):
     try:
-        html = page.content()
-        soup = BeautifulSoup(html, 'html.parser')
-        candidate_tags = ['button', 'a', 'div[role="button"]', 'input[type="submit"]', 'input[type="button"]']
-        candidates = []
-
-        for tag in candidate_tags:
-            for elem in soup.select(tag):
-                text = elem.get_text(strip=True)
-                if not text:
-                    continue
-                attrs = ' '.join([f"{k}={v}" for k, v in elem.attrs.items() if isinstance(v, str)])
-                combined = f"{text} {attrs}".strip()
-                if combined:
-                    candidates.append(combined)
+        candidates = [candidate_text(record) for record in extract_candidates(page, visible_only=True)]
 
         if not candidates:
-            print("No candidate elements found for semantic search.")
+            logger.info("No candidate elements found for semantic search.")
             return None
 
-        print(f"Found {len(candidates)} candidates for LPU intake")
+        logger.info(f"Found {len(candidates)} candidates for LPU intake")
         return candidates
 
     except Exception as e:
-        return None
\ No newline at end of file
+        return None
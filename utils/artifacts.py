@@ -0,0 +1,146 @@
+# utils/artifacts.py
+"""
+Background writer for files the healing pipeline produces as a side effect:
+debug images with the visual click marker, and auto-captured templates.
+
+Jobs go through a bounded queue to a single daemon thread, so a heal never waits on
+image encoding or disk I/O. Optional artifacts (debug images) are opt-in, sampled, and
+dropped when the queue is full; required ones (templates) are never dropped.
+Debug images land in a per-run directory: ARTIFACTS_DIR/<timestamp>-<pid>/debug/.
+"""
+import atexit
+import itertools
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from config import (ARTIFACTS_ENABLED, ARTIFACTS_DIR, ARTIFACT_SAMPLE_RATE, ARTIFACT_FORMAT, ARTIFACT_JPEG_QUALITY,
+                    ARTIFACT_PNG_COMPRESSION, ARTIFACT_CROP_PX, ARTIFACT_QUEUE_SIZE)
+from utils.telemetry import TELEMETRY
+
+logger = logging.getLogger(__name__)
+
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+def encode_params(fmt: str) -> list[int]:
+    """cv2.imwrite parameters favouring encode speed over file size."""
+    if fmt in ("jpg", "jpeg"):
+        return [cv2.IMWRITE_JPEG_QUALITY, ARTIFACT_JPEG_QUALITY]
+    if fmt == "png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, ARTIFACT_PNG_COMPRESSION]
+    if fmt == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, ARTIFACT_JPEG_QUALITY]
+    return []
+
+
+class ArtifactWriter:
+    def __init__(self, root: str, enabled: bool = False, sample_rate: float = 1.0, fmt: str = "jpg",
+                 crop_px: int = 0, queue_size: int = 64):
+        self.root = root
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.fmt = fmt.lower().lstrip(".")
+        self.crop_px = crop_px
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._run_dir: str | None = None
+        self._sequence = itertools.count(1)
+
+    @property
+    def run_dir(self) -> str:
+        """Directory of this run's artifacts, created on first use."""
+        if self._run_dir is None:
+            with self._lock:
+                if self._run_dir is None:
+                    self._run_dir = os.path.join(self.root, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        return self._run_dir
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker, name="artifact-writer", daemon=True)
+                    self._thread.start()
+
+    def _worker(self):
+        while True:
+            job, args = self._queue.get()
+            try:
+                job(*args)
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Artifact write failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, job, *args, required: bool = False) -> bool:
+        """
+        Queues job(*args) for the writer thread. Optional jobs are dropped (returns False)
+        when the queue is full; required jobs wait for a free slot instead.
+        """
+        self._ensure_thread()
+        try:
+            if required:
+                self._queue.put((job, args))
+            else:
+                self._queue.put_nowait((job, args))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            TELEMETRY.count("artifact_dropped")
+            return False
+
+    def save_debug_marker(self, page_gray: np.ndarray, center_x: int, center_y: int, label: str = "",
+                          score: float | None = None) -> bool:
+        """
+        Queues a debug image of `page_gray` with the click marker drawn at (center_x, center_y).
+        No-op unless enabled and sampled in. The caller must not modify `page_gray` afterwards.
+        """
+        if not self.enabled or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return False
+        name = f"{next(self._sequence):05d}_{_SLUG.sub('_', label).strip('_')[:60] or 'visual'}"
+        if score is not None:
+            name += f"_{score:.3f}"
+        path = os.path.join(self.run_dir, "debug", f"{name}.{self.fmt}")
+        return self.submit(self._write_marker, path, page_gray, center_x, center_y)
+
+    def _write_marker(self, path: str, page_gray: np.ndarray, center_x: int, center_y: int):
+        if self.crop_px > 0:
+            x0, y0 = max(0, center_x - self.crop_px), max(0, center_y - self.crop_px)
+            page_gray = page_gray[y0:center_y + self.crop_px, x0:center_x + self.crop_px]
+            center_x, center_y = center_x - x0, center_y - y0
+        debug_img = cv2.cvtColor(page_gray, cv2.COLOR_GRAY2BGR)
+        cv2.circle(debug_img, (center_x, center_y), radius=8, color=(0, 0, 255), thickness=-1)
+        self.write_image(path, debug_img, self.fmt)
+        logger.debug(f"Debug image with click marker saved: {path}")
+
+    def write_image(self, path: str, image: np.ndarray, fmt: str | None = None):
+        """Encodes and writes `image` (on the calling thread: use from jobs)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not cv2.imwrite(path, image, encode_params(fmt or os.path.splitext(path)[1].lstrip("."))):
+            raise OSError(f"could not encode {path}")
+        self.written += 1
+
+    def flush(self):
+        """Blocks until every queued artifact has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+
+ARTIFACT_WRITER = ArtifactWriter(ARTIFACTS_DIR, ARTIFACTS_ENABLED, ARTIFACT_SAMPLE_RATE, ARTIFACT_FORMAT,
+                                 ARTIFACT_CROP_PX, ARTIFACT_QUEUE_SIZE)
+atexit.register(ARTIFACT_WRITER.flush)
@@ -0,0 +1,242 @@
+# utils/candidate_index.py
+"""
+Incremental per-page index of semantic-tier candidates.
+
+A script injected into the page (at document start, so it survives navigations) numbers
+every element matching CANDIDATE_SELECTOR and watches the DOM with a MutationObserver.
+Each sync drains only what changed since the previous one (new, edited and removed
+candidates), so the Python side re-embeds only new or changed text. Geometry,
+visibility and the unique selector are resolved only for the few best-scoring
+candidates, because those change with layout and not with mutations.
+
+A new document (full navigation) gets a fresh page-side index; the token it reports
+makes the Python side start over as well. SPA route changes only send the delta.
+"""
+import json
+import logging
+import weakref
+
+import numpy as np
+from playwright.sync_api import Page
+from playwright.async_api import Page as AsyncPage
+
+from utils.dom_candidates import (CANDIDATE_SELECTOR, SKIPPED_ATTRIBUTES, MAX_ATTRIBUTE_LENGTH,
+                                  CANDIDATE_HELPERS_JS, candidate_text)
+from utils.embedding_cache import EMBEDDING_CACHE
+from utils.semantic_backends import cosine_scores
+
+logger = logging.getLogger(__name__)
+
+INDEX_JS = ("""
+(() => {
+    if (window.__healIndex) return;
+    const [selector, skipped, maxLen] = __CONFIG__;
+""" + CANDIDATE_HELPERS_JS + """
+    const token = Date.now().toString(36) + Math.random().toString(36).slice(2);
+    const ids = new WeakMap();          // element → id
+    const elements = new Map();         // id → indexed element
+    const signatures = new Map();       // id → text/attributes last sent to Python
+    let nextId = 1;
+    let dirty = new Set();
+    let scanned = false;
+
+    // Text of every enclosing candidate changes with its subtree
+    const markAncestors = (node) => {
+        let el = node.nodeType === 1 ? node : node.parentElement;
+        while (el) {
+            const candidate = el.closest(selector);
+            if (!candidate) break;
+            dirty.add(candidate);
+            el = candidate.parentElement;
+        }
+    };
+    const markSubtree = (node) => {
+        if (node.nodeType !== 1) return;
+        dirty.add(node);
+        for (const el of node.querySelectorAll(selector)) dirty.add(el);
+    };
+
+    new MutationObserver((mutations) => {
+        if (!scanned) return;           // the first drain scans the whole document anyway
+        for (const m of mutations) {
+            if (m.type === 'attributes') {
+                if (skipped.includes(m.attributeName)) continue;
+                dirty.add(m.target);
+            }
+            markAncestors(m.target);
+            for (const n of m.addedNodes) markSubtree(n);
+            for (const n of m.removedNodes) markSubtree(n);
+        }
+    }).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+
+    const update = (el, delta) => {
+        const record = el.isConnected && el.matches(selector) ? describe(el, skipped, maxLen) : null;
+        let id = ids.get(el);
+        if (!record) {
+            if (id !== undefined && elements.delete(id)) {
+                signatures.delete(id);
+                delta.removed.push(id);
+            }
+            return;
+        }
+        if (id === undefined) {
+            id = nextId++;
+            ids.set(el, id);
+        }
+        elements.set(id, el);
+        const signature = record.tag + '\\u0001' + record.text + '\\u0001' + JSON.stringify(record.attrs);
+        if (signatures.get(id) === signature) return;
+        signatures.set(id, signature);
+        record.id = id;
+        delta.upserts.push(record);
+    };
+
+    window.__healIndex = {
+        drain() {
+            const delta = {token: token, full: !scanned, upserts: [], removed: []};
+            const batch = scanned ? dirty : document.querySelectorAll(selector);
+            scanned = true;
+            dirty = new Set();
+            for (const el of batch) update(el, delta);
+            return delta;
+        },
+        resolve(idList) {
+            return idList.map((id) => {
+                const el = elements.get(id);
+                if (!el || !el.isConnected) return null;
+                return Object.assign(geometry(el), {selector: uniqueSelector(el)});
+            });
+        },
+    };
+})()
+""").replace("__CONFIG__", json.dumps([CANDIDATE_SELECTOR, SKIPPED_ATTRIBUTES, MAX_ATTRIBUTE_LENGTH]))
+
+_DRAIN_JS = "() => window.__healIndex ? window.__healIndex.drain() : null"
+_RESOLVE_JS = "(ids) => window.__healIndex ? window.__healIndex.resolve(ids) : ids.map(() => null)"
+
+
+class CandidateIndex:
+    """
+    Python side of one page's index: candidate records and their embeddings by page-side id.
+    `apply`, `rank` and `pick` are pure; `sync` / `resolve` (and their async twins) talk to the page.
+    """
+
+    def __init__(self):
+        self.token: str | None = None
+        self.installed = False
+        self._records: dict[int, dict] = {}
+        self._vectors: dict[int, np.ndarray] = {}
+        self._ids: list[int] = []
+        self._matrix: np.ndarray | None = None
+        self.full_scans = 0
+        self.upserts = 0
+        self.removals = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def apply(self, delta: dict) -> int:
+        """Applies one drained delta. Returns the number of records added, changed or removed."""
+        if delta["full"] or delta["token"] != self.token:
+            self.token = delta["token"]
+            self._records.clear()
+            self._vectors.clear()
+            self.full_scans += 1
+        for record in delta["upserts"]:
+            self._records[record["id"]] = record
+            self._vectors.pop(record["id"], None)
+        for record_id in delta["removed"]:
+            self._records.pop(record_id, None)
+            self._vectors.pop(record_id, None)
+        changes = len(delta["upserts"]) + len(delta["removed"])
+        self.upserts += len(delta["upserts"])
+        self.removals += len(delta["removed"])
+        if changes or delta["full"]:
+            self._matrix = None
+        return changes
+
+    def embeddings(self) -> tuple[list[int], np.ndarray]:
+        """(ids, matrix) of every indexed candidate; only records without a vector are encoded."""
+        if self._matrix is None:
+            missing = [record_id for record_id in self._records if record_id not in self._vectors]
+            if missing:
+                encoded = EMBEDDING_CACHE.encode([candidate_text(self._records[i]) for i in missing])
+                self._vectors.update(zip(missing, encoded))
+            self._ids = list(self._records)
+            self._matrix = np.stack([self._vectors[i] for i in self._ids]) if self._ids \
+                else np.empty((0, 0), dtype=EMBEDDING_CACHE.dtype)
+        return self._ids, self._matrix
+
+    def rank(self, target_embeddings: np.ndarray, threshold: float, top_k: int) -> list[list[tuple[int, float]]]:
+        """Per target: up to `top_k` (id, score) at or above `threshold`, best first."""
+        ids, matrix = self.embeddings()
+        if not ids:
+            return [[] for _ in range(len(target_embeddings))]
+        similarities = cosine_scores(matrix, target_embeddings)         # (candidates, targets)
+        ranked = []
+        for column in similarities.T:
+            k = min(top_k, len(column))
+            top = np.argpartition(-column, k - 1)[:k]
+            top = top[np.argsort(-column[top])]
+            ranked.append([(ids[i], float(column[i])) for i in top if column[i] >= threshold])
+        return ranked
+
+    def pick(self, ranked: list[list[tuple[int, float]]], resolved: dict[int, dict | None]) -> list[dict | None]:
+        """First visible candidate per target → {'selector', 'score', 'text', 'box'} (or None)."""
+        matches = []
+        for candidates in ranked:
+            match = None
+            for record_id, score in candidates:
+                where = resolved.get(record_id)
+                if where and where["visible"]:
+                    match = {'selector': where['selector'], 'score': score,
+                             'text': self._records[record_id]['text'], 'box': where['box']}
+                    break
+            matches.append(match)
+        return matches
+
+    # --- browser glue ---
+
+    def sync(self, page: Page) -> int:
+        delta = page.evaluate(_DRAIN_JS)
+        if delta is None:
+            if not self.installed:
+                page.add_init_script(script=INDEX_JS)      # every later document starts indexed
+                self.installed = True
+            page.evaluate(INDEX_JS)
+            delta = page.evaluate(_DRAIN_JS)
+        return self.apply(delta)
+
+    async def sync_async(self, page: AsyncPage) -> int:
+        delta = await page.evaluate(_DRAIN_JS)
+        if delta is None:
+            if not self.installed:
+                await page.add_init_script(script=INDEX_JS)
+                self.installed = True
+            await page.evaluate(INDEX_JS)
+            delta = await page.evaluate(_DRAIN_JS)
+        return self.apply(delta)
+
+    @staticmethod
+    def _wanted(ranked: list[list[tuple[int, float]]]) -> list[int]:
+        return list(dict.fromkeys(record_id for candidates in ranked for record_id, _ in candidates))
+
+    def resolve(self, page: Page, ranked: list[list[tuple[int, float]]]) -> dict[int, dict | None]:
+        """Geometry, visibility and unique selector of the ranked candidates, in one round trip."""
+        wanted = self._wanted(ranked)
+        return dict(zip(wanted, page.evaluate(_RESOLVE_JS, wanted))) if wanted else {}
+
+    async def resolve_async(self, page: AsyncPage, ranked: list[list[tuple[int, float]]]) -> dict[int, dict | None]:
+        wanted = self._wanted(ranked)
+        return dict(zip(wanted, await page.evaluate(_RESOLVE_JS, wanted))) if wanted else {}
+
+
+_indexes: "weakref.WeakKeyDictionary[Page | AsyncPage, CandidateIndex]" = weakref.WeakKeyDictionary()
+
+
+def index_for(page: Page | AsyncPage) -> CandidateIndex:
+    """The candidate index of `page`, created on first use and dropped with the page."""
+    index = _indexes.get(page)
+    if index is None:
+        index = _indexes[page] = CandidateIndex()
+    return index
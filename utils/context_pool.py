@@ -0,0 +1,214 @@
+# utils/context_pool.py
+"""
+Pool of warm browser contexts for the pytest fixtures (conftest.py).
+
+Each context is created once, optionally from a Playwright storage state (e.g. a logged-in
+session). Between tests the context is reset instead of torn down:
+- its pages are closed, taking their init scripts, bindings, event handlers, sessionStorage
+  and viewport with them, and the next test gets a new page
+- context routes are removed
+- localStorage and IndexedDB of every origin the test visited are cleared and reseeded from
+  the storage state (on a blank document served by a route, so the app is not loaded)
+- cookies and permissions are reset, along with HTTP headers, offline mode and timeouts
+A reset costs a new page plus one navigation per visited origin, where a new context costs
+tens to hundreds of milliseconds.
+A context is retired after CONTEXT_POOL_MAX_USES tests, as soon as a reset fails, or when the
+test registered something on the context itself that cannot be removed (add_init_script,
+expose_binding, expose_function, event handlers).
+
+Idle contexts are handed out oldest first, so every warm context takes its turn. A retired
+context is only closed on release; its replacement is created by acquire() when no warm
+context is idle, so release never builds one on the way to the next test.
+
+The pool is per process, so under pytest-xdist every worker has its own. pool_size() divides
+the CPUs between the workers, capped at CONTEXT_POOL_MAX_PER_WORKER: 1 by default, since a
+worker runs one test at a time and a second warm context would only sit idle.
+"""
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+from playwright.sync_api import Browser, BrowserContext, Page
+
+from config import CONTEXT_POOL_SIZE, CONTEXT_POOL_MAX_PER_WORKER
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_TIMEOUT_MS = 30000                 # Playwright's own default
+
+# Context registrations with no way back: a context that got one is replaced on release
+_STICKY = ("add_init_script", "expose_binding", "expose_function", "on", "once")
+# Served for every visited origin during a reset, to clear its storage without loading the app
+_RESET_PATH = "/__context_pool_reset__"
+
+# Clears the origin's localStorage and IndexedDB, then restores what the storage state seeds for it
+_RESET_STORAGE_JS = """
+async (seed) => {
+    localStorage.clear();
+    const databases = indexedDB.databases ? await indexedDB.databases() : [];
+    await Promise.all(databases.map(db => new Promise(resolve => {
+        const request = indexedDB.deleteDatabase(db.name);
+        request.onsuccess = request.onerror = request.onblocked = resolve;
+    })));
+    for (const item of seed) localStorage.setItem(item.name, item.value);
+}
+"""
+
+
+def _origin(url: str) -> str | None:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}" if parts.scheme in ("http", "https") else None
+
+
+def _blank(route):
+    route.fulfill(status=200, content_type="text/html", body="<!doctype html><title>reset</title>")
+
+
+def pool_size(workers: int | None = None, cpus: int | None = None) -> int:
+    """Contexts per worker: CONTEXT_POOL_SIZE, else the CPUs shared out between the xdist workers (1 to CONTEXT_POOL_MAX_PER_WORKER)."""
+    if CONTEXT_POOL_SIZE > 0:
+        return CONTEXT_POOL_SIZE
+    workers = workers or int(os.getenv("PYTEST_XDIST_WORKER_COUNT", "1"))
+    cpus = cpus or os.cpu_count() or 1
+    return max(1, min(CONTEXT_POOL_MAX_PER_WORKER, cpus // max(1, workers)))
+
+
+class PooledContext:
+    __slots__ = ("context", "page", "uses", "origins", "sticky")
+
+    def __init__(self, context: BrowserContext, page: Page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.origins: set[str] = set()      # visited by any page since the last reset
+        self.sticky = False                 # got a registration a reset cannot undo
+
+
+class ContextPool:
+    def __init__(self, browser: Browser, size: int = 1, storage_state: str | None = None, max_uses: int = 50,
+                 context_options: dict | None = None):
+        self.browser = browser
+        self.size = size
+        self.storage_state = storage_state
+        self.max_uses = max_uses
+        self.context_options = context_options or {}
+        self.created = 0
+        self.reused = 0
+        self.replaced = 0
+        self._idle: list[PooledContext] = []
+        self._in_use: list[PooledContext] = []
+        self._cookies: list[dict] = []
+        self._origins: list[dict] = []
+        if storage_state:
+            with open(storage_state, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self._cookies = state.get("cookies", [])
+            self._origins = state.get("origins", [])
+
+    def _create(self) -> PooledContext:
+        options = dict(self.context_options)
+        if self.storage_state:
+            options["storage_state"] = self.storage_state
+        context = self.browser.new_context(**options)
+        self.created += 1
+        pooled = PooledContext(context, None)
+        context.on("page", lambda page: self._track(pooled, page))
+        for name in _STICKY:
+            setattr(context, name, self._sticky(pooled, getattr(context, name)))
+        pooled.page = context.new_page()
+        return pooled
+
+    @staticmethod
+    def _track(pooled: PooledContext, page: Page):
+        def navigated(frame):
+            origin = _origin(frame.url)
+            if origin:
+                pooled.origins.add(origin)
+        page.on("framenavigated", navigated)
+
+    @staticmethod
+    def _sticky(pooled: PooledContext, method):
+        def wrapper(*args, **kwargs):
+            pooled.sticky = True
+            return method(*args, **kwargs)
+        return wrapper
+
+    def warm(self):
+        """Creates contexts until `size` are ready."""
+        while len(self._idle) + len(self._in_use) < self.size:
+            self._idle.append(self._create())
+
+    def acquire(self) -> PooledContext:
+        if self._idle:
+            pooled = self._idle.pop(0)
+            if pooled.uses:
+                self.reused += 1
+        else:
+            pooled = self._create()
+        pooled.uses += 1
+        self._in_use.append(pooled)
+        return pooled
+
+    def release(self, pooled: PooledContext):
+        """Resets `pooled` for the next test, or retires it when worn out or not resettable."""
+        self._in_use.remove(pooled)
+        if pooled.uses < self.max_uses:
+            try:
+                start = time.perf_counter()
+                self.reset(pooled)
+                logger.debug(f"Context reset in {(time.perf_counter() - start) * 1000:.1f} ms")
+                self._idle.append(pooled)
+                return
+            except Exception as e:
+                logger.info(f"Context reset failed ({e}) → replacing it")
+        self._close(pooled)
+        self.replaced += 1
+
+    def reset(self, pooled: PooledContext):
+        context = pooled.context
+        if pooled.sticky:
+            raise RuntimeError("the test registered an init script, binding or event handler on the context")
+        context.unroute_all(behavior="ignoreErrors")
+        for page in list(context.pages):
+            page.close()
+        context.set_offline(False)
+        context.set_default_timeout(_DEFAULT_TIMEOUT_MS)
+        context.set_default_navigation_timeout(_DEFAULT_TIMEOUT_MS)
+
+        page = context.new_page()
+        visited = sorted(pooled.origins)
+        if visited:
+            seeds = {o["origin"]: o.get("localStorage", []) for o in self._origins}
+            page.route(f"**{_RESET_PATH}", _blank)
+            for origin in visited:
+                page.goto(f"{origin}{_RESET_PATH}")
+                page.evaluate(_RESET_STORAGE_JS, seeds.get(origin, []))
+            page.unroute_all(behavior="ignoreErrors")
+            page.goto("about:blank")
+        pooled.origins.clear()
+        pooled.page = page
+
+        context.clear_cookies()
+        if self._cookies:
+            context.add_cookies(self._cookies)
+        context.clear_permissions()
+        context.set_extra_http_headers({})
+
+    @staticmethod
+    def _close(pooled: PooledContext):
+        try:
+            pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Context close failed: {e}")
+
+    def close(self):
+        for pooled in self._idle + self._in_use:
+            self._close(pooled)
+        self._idle.clear()
+        self._in_use.clear()
+
+    def summary(self) -> str:
+        return (f"context pool: size {self.size}, {self.created} contexts created, "
+                f"{self.reused} reuses, {self.replaced} replaced")
@@ -0,0 +1,109 @@
+# utils/dom_candidates.py
+from playwright.sync_api import Page
+from playwright.async_api import Page as AsyncPage
+
+# Interactive elements considered by the semantic and LPU tiers
+CANDIDATE_SELECTOR = 'button, a, div[role="button"], input[type="submit"], input[type="button"]'
+
+# Attributes that never help matching and only bloat the records
+SKIPPED_ATTRIBUTES = ["class", "style"]
+MAX_ATTRIBUTE_LENGTH = 100
+
+# Page-side helpers shared by the one-shot extraction below and the incremental
+# candidate index (utils/candidate_index.py).
+CANDIDATE_HELPERS_JS = """
+    const quote = (v) => '"' + v.replace(/\\\\/g, '\\\\\\\\').replace(/"/g, '\\\\"') + '"';
+    const isUnique = (sel) => { try { return document.querySelectorAll(sel).length === 1; } catch (e) { return false; } };
+
+    const uniqueSelector = (el) => {
+        const tag = el.tagName.toLowerCase();
+        if (el.id && isUnique('#' + CSS.escape(el.id))) return '#' + CSS.escape(el.id);
+        for (const attr of ['data-testid', 'data-test', 'name', 'aria-label']) {
+            const v = el.getAttribute(attr);
+            if (v && isUnique(tag + '[' + attr + '=' + quote(v) + ']')) return tag + '[' + attr + '=' + quote(v) + ']';
+        }
+        // Structural path, anchored at the nearest ancestor with a unique id
+        const parts = [];
+        let node = el;
+        while (node && node.nodeType === 1 && node !== document.documentElement) {
+            if (node !== el && node.id && isUnique('#' + CSS.escape(node.id))) {
+                parts.unshift('#' + CSS.escape(node.id));
+                break;
+            }
+            let part = node.tagName.toLowerCase();
+            const parent = node.parentElement;
+            if (parent) {
+                const sameTag = Array.from(parent.children).filter(c => c.tagName === node.tagName);
+                if (sameTag.length > 1) part += ':nth-of-type(' + (sameTag.indexOf(node) + 1) + ')';
+            }
+            parts.unshift(part);
+            node = parent;
+        }
+        return parts.join(' > ');
+    };
+
+    // Text and attributes of a candidate, or null when it has no text to match on
+    const describe = (el, skipped, maxLen) => {
+        const tag = el.tagName.toLowerCase();
+        let text = (el.textContent || '').replace(/\\s+/g, ' ').trim();
+        if (!text && tag === 'input') text = (el.value || '').trim();
+        if (!text) return null;
+
+        const attrs = {};
+        for (const a of el.attributes) {
+            if (skipped.includes(a.name) || !a.value) continue;
+            attrs[a.name] = a.value.length > maxLen ? a.value.slice(0, maxLen) : a.value;
+        }
+        return {tag: tag, text: text.slice(0, 200), attrs: attrs};
+    };
+
+    const geometry = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = getComputedStyle(el);
+        const visible = rect.width > 0 && rect.height > 0
+            && style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+        return {box: {x: rect.x, y: rect.y, width: rect.width, height: rect.height}, visible: visible};
+    };
+"""
+
+# Runs inside the page: one round trip returns compact records for every candidate,
+# instead of shipping the whole DOM to Python and re-parsing it there.
+EXTRACT_CANDIDATES_JS = """
+([selector, skipped, maxLen]) => {
+""" + CANDIDATE_HELPERS_JS + """
+    const records = [];
+    for (const el of document.querySelectorAll(selector)) {
+        const record = describe(el, skipped, maxLen);
+        if (!record) continue;
+        records.push(Object.assign(record, geometry(el), {selector: uniqueSelector(el)}));
+    }
+    return records;
+}
+"""
+
+
+def extract_candidates(page: Page, visible_only: bool = False) -> list[dict]:
+    """
+    Collects interactive candidates inside the page with a single evaluate call.
+
+    Each record: {'tag', 'text', 'attrs', 'box': {x, y, width, height}, 'visible', 'selector'}
+    where 'selector' is a CSS selector unique in the current document.
+    """
+    records = page.evaluate(EXTRACT_CANDIDATES_JS, [CANDIDATE_SELECTOR, SKIPPED_ATTRIBUTES, MAX_ATTRIBUTE_LENGTH])
+    if visible_only:
+        records = [r for r in records if r['visible']]
+    return records
+
+
+async def extract_candidates_async(page: AsyncPage, visible_only: bool = False) -> list[dict]:
+    """Async-API counterpart of extract_candidates."""
+    records = await page.evaluate(EXTRACT_CANDIDATES_JS, [CANDIDATE_SELECTOR, SKIPPED_ATTRIBUTES, MAX_ATTRIBUTE_LENGTH])
+    if visible_only:
+        records = [r for r in records if r['visible']]
+    return records
+
+
+def candidate_text(record: dict) -> str:
+    """String used for semantic matching: visible text followed by key=value attributes."""
+    attrs = ' '.join(f"{k}={v}" for k, v in record['attrs'].items())
+    return f"{record['text']} {attrs}".strip()
@@ -0,0 +1,165 @@
+# utils/embedding_cache.py
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+import numpy as np
+from config import EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_DIR, SEMANTIC_EMBEDDING_DTYPE
+from utils.semantic_backends import get_semantic_backend, backend_namespace
+from utils.locator_registry import LOCATOR_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_with_model(texts: list[str]) -> np.ndarray:
+    return get_semantic_backend().encode(texts)
+
+
+def _encode(texts: list[str]) -> np.ndarray:
+    """Encodes through the shared embedding service when one is configured, else with the local model."""
+    from utils.embedding_service import remote_encode
+    vectors = remote_encode(texts)
+    return vectors if vectors is not None else _encode_with_model(texts)
+
+
+class EmbeddingCache:
+    """
+    Bounded, content-hashed cache of L2-normalized sentence embeddings.
+
+    - In memory: LRU of at most `max_entries` vectors.
+    - On disk (optional): evicted vectors are spilled to `spill_dir` as .npy files
+      and read back instead of being re-encoded.
+    - Pinned entries (e.g. ELEMENT_MAPPING descriptions) are never evicted.
+    - Precomputed (optional): `vector_source(text)` is asked before the encoder, e.g. for
+      the descriptions of a compiled locator registry.
+
+    Only strings that were never seen are sent to the encoder, in one batch.
+    Vectors are stored (and returned) as `dtype`.
+    """
+
+    def __init__(self, encoder: Callable[[list[str]], np.ndarray], max_entries: int = 4096,
+                 spill_dir: str | None = None, namespace: str = "", dtype: str = "float32",
+                 vector_source: Callable[[str], np.ndarray | None] | None = None):
+        self.encoder = encoder
+        self.vector_source = vector_source
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.namespace = namespace
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._pinned: dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.namespace}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, key[:2], f"{key}.npy")
+
+    def _get_cached(self, key: str) -> np.ndarray | None:
+        vec = self._pinned.get(key)
+        if vec is not None:
+            return vec
+        vec = self._lru.get(key)
+        if vec is not None:
+            self._lru.move_to_end(key)
+            return vec
+        if self.spill_dir:
+            try:
+                vec = np.load(self._spill_path(key)).astype(self.dtype, copy=False)
+            except (OSError, ValueError):
+                return None
+            self._insert(key, vec)
+            return vec
+        return None
+
+    def _insert(self, key: str, vec: np.ndarray):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            old_key, old_vec = self._lru.popitem(last=False)
+            if self.spill_dir:
+                path = self._spill_path(old_key)
+                if not os.path.exists(path):
+                    try:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        np.save(path, old_vec)
+                    except OSError as e:
+                        logger.warning(f"Embedding spill failed: {e}")
+
+    def encode(self, texts: str | list[str]) -> np.ndarray:
+        """
+        Returns normalized embeddings, shape (dim,) for a single string or (n, dim) for a list.
+        """
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        keys = [self._key(t) for t in items]
+
+        vectors: list[np.ndarray | None] = [None] * len(items)
+        missing: dict[str, list[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vec = self._get_cached(key)
+                if vec is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    vectors[i] = vec
+            if missing and self.vector_source is not None:
+                for key, indices in list(missing.items()):
+                    vec = self.vector_source(items[indices[0]])
+                    if vec is not None:
+                        vec = np.asarray(vec, dtype=self.dtype)
+                        self._insert(key, vec)
+                        for i in indices:
+                            vectors[i] = vec
+                        del missing[key]
+            self.hits += len(items) - sum(len(v) for v in missing.values())
+            self.misses += len(missing)
+
+        if missing:
+            new_texts = [items[idx[0]] for idx in missing.values()]
+            encoded = np.asarray(self.encoder(new_texts), dtype=self.dtype)
+            with self._lock:
+                for (key, indices), vec in zip(missing.items(), encoded):
+                    self._insert(key, vec)
+                    for i in indices:
+                        vectors[i] = vec
+
+        if single:
+            return vectors[0]
+        if not vectors:
+            return np.empty((0, 0), dtype=self.dtype)
+        return np.stack(vectors)
+
+    def pin(self, texts: Iterable[str]):
+        """Encodes `texts` once and keeps them resident for the life of the process."""
+        texts = [t for t in dict.fromkeys(texts) if t]
+        if not texts:
+            return
+        vectors = self.encode(texts)
+        with self._lock:
+            for text, vec in zip(texts, vectors):
+                key = self._key(text)
+                self._pinned[key] = vec
+                self._lru.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self.hits = self.misses = 0
+
+
+_NAMESPACE = backend_namespace()
+EMBEDDING_CACHE = EmbeddingCache(
+    _encode,
+    max_entries=EMBEDDING_CACHE_SIZE,
+    spill_dir=EMBEDDING_CACHE_DIR,
+    namespace=_NAMESPACE,
+    dtype=SEMANTIC_EMBEDDING_DTYPE,
+    vector_source=(lambda text: LOCATOR_REGISTRY.vector(text, _NAMESPACE)) if len(LOCATOR_REGISTRY) else None,
+)
@@ -0,0 +1,327 @@
+# utils/embedding_service.py
+"""
+Local embedding service shared by pytest-xdist workers.
+
+One process owns the sentence-transformers model and serves encode requests over a Unix
+socket; workers point EMBEDDING_SERVICE_SOCKET at it and never import torch themselves.
+Requests that arrive within EMBEDDING_SERVICE_BATCH_WINDOW_MS of each other (from any
+worker) are encoded as one batch, with duplicate strings encoded once.
+
+Wire format (both directions length-prefixed, network byte order):
+    request:  uint32 length + JSON {"texts": [...]}          ({"texts": []} is a ping)
+    response: uint32 rows, uint32 dim + rows*dim float32      (rows = 0xFFFFFFFF: error,
+              followed by uint32 length + UTF-8 message)
+
+    python -m utils.embedding_service --socket /tmp/heal-embed.sock --warm
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from config import (PROJECT_ROOT, EMBEDDING_SERVICE_SOCKET, EMBEDDING_SERVICE_TIMEOUT_S,
+                    EMBEDDING_SERVICE_BATCH_WINDOW_MS, EMBEDDING_SERVICE_MAX_BATCH)
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct("!I")
+_HEADER = struct.Struct("!II")
+_ERROR_ROWS = 0xFFFFFFFF
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = conn.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("embedding service connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_frame(conn: socket.socket, payload: bytes):
+    conn.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_frame(conn: socket.socket) -> bytes:
+    (size,) = _LENGTH.unpack(_recv_exact(conn, _LENGTH.size))
+    return _recv_exact(conn, size)
+
+
+def default_socket_path() -> str:
+    return os.path.join(tempfile.gettempdir(), f"heal-embed-{os.getpid()}.sock")
+
+
+class _Request:
+    __slots__ = ("texts", "done", "vectors", "error")
+
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+        self.done = threading.Event()
+        self.vectors: np.ndarray | None = None
+        self.error: str | None = None
+
+
+class EmbeddingService:
+    """
+    Unix-socket server around `encode(texts) -> (n, dim) array`.
+    One thread per connection; a single batcher thread calls `encode`.
+    """
+
+    def __init__(self, socket_path: str, encode, max_batch: int = 256, batch_window_ms: float = 5.0):
+        self.socket_path = socket_path
+        self.encode = encode
+        self.max_batch = max_batch
+        self.batch_window_s = batch_window_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue: queue.Queue[_Request] = queue.Queue()
+        self._listener: socket.socket | None = None
+        self._closed = threading.Event()
+
+    def start(self) -> "EmbeddingService":
+        """Binds the socket and serves from daemon threads. Returns self."""
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        self._listener.listen(64)
+        threading.Thread(target=self._batcher, name="embed-batcher", daemon=True).start()
+        threading.Thread(target=self._accept, name="embed-accept", daemon=True).start()
+        return self
+
+    def close(self):
+        self._closed.set()
+        if self._listener is not None:
+            self._listener.close()
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+    def _accept(self):
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="embed-conn", daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        with conn:
+            while True:
+                try:
+                    texts = json.loads(_recv_frame(conn))["texts"]
+                except (ConnectionError, OSError):
+                    return
+                except (ValueError, KeyError) as e:
+                    self._send_error(conn, f"bad request: {e}")
+                    continue
+                if not texts:
+                    conn.sendall(_HEADER.pack(0, 0))
+                    continue
+                request = _Request([str(t) for t in texts])
+                self._queue.put(request)
+                request.done.wait()
+                try:
+                    if request.error is not None:
+                        self._send_error(conn, request.error)
+                    else:
+                        vectors = np.ascontiguousarray(request.vectors, dtype=np.float32)
+                        conn.sendall(_HEADER.pack(*vectors.shape) + vectors.tobytes())
+                except OSError:
+                    return
+
+    @staticmethod
+    def _send_error(conn: socket.socket, message: str):
+        conn.sendall(_HEADER.pack(_ERROR_ROWS, 0))
+        _send_frame(conn, message.encode("utf-8"))
+
+    def _batcher(self):
+        while not self._closed.is_set():
+            batch = [self._queue.get()]
+            size = len(batch[0].texts)
+            deadline = time.monotonic() + self.batch_window_s
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            unique = list(dict.fromkeys(text for request in batch for text in request.texts))
+            try:
+                encoded = np.asarray(self.encode(unique), dtype=np.float32)
+                rows = {text: i for i, text in enumerate(unique)}
+                for request in batch:
+                    request.vectors = encoded[[rows[text] for text in request.texts]]
+            except Exception as e:
+                logger.warning(f"Embedding service encode failed: {e}")
+                for request in batch:
+                    request.error = f"{type(e).__name__}: {e}"
+            self.batches += 1
+            self.requests += len(batch)
+            for request in batch:
+                request.done.set()
+
+
+class EmbeddingClient:
+    """Encodes through an EmbeddingService. One persistent connection per calling thread."""
+
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _request(self, texts: list[str]) -> np.ndarray:
+        conn = self._connection()
+        _send_frame(conn, json.dumps({"texts": texts}).encode("utf-8"))
+        rows, dim = _HEADER.unpack(_recv_exact(conn, _HEADER.size))
+        if rows == _ERROR_ROWS:
+            raise RuntimeError(f"embedding service error: {_recv_frame(conn).decode('utf-8')}")
+        return np.frombuffer(_recv_exact(conn, rows * dim * 4), dtype=np.float32).reshape(rows, dim)
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        try:
+            return self._request(list(texts))
+        except (ConnectionError, BrokenPipeError):
+            # Stale connection (service restarted): reconnect once
+            self._drop_connection()
+            return self._request(list(texts))
+        except Exception:
+            self._drop_connection()
+            raise
+
+    def ping(self) -> bool:
+        try:
+            self._request([])
+            return True
+        except (OSError, RuntimeError):
+            self._drop_connection()
+            return False
+
+
+_client: EmbeddingClient | None = None
+_client_failed = False
+_client_lock = threading.Lock()
+
+
+def connect(socket_path: str):
+    """Routes this process's encodes through the service at `socket_path` (overrides EMBEDDING_SERVICE_SOCKET)."""
+    global _client, _client_failed
+    with _client_lock:
+        _client = EmbeddingClient(socket_path, EMBEDDING_SERVICE_TIMEOUT_S)
+        _client_failed = False
+
+
+def remote_encode(texts: list[str]) -> np.ndarray | None:
+    """
+    Encodes through the shared service, if this process has one (EMBEDDING_SERVICE_SOCKET or connect()).
+    Returns None when there is none, or after it failed once in this process
+    (callers then fall back to the local model).
+    """
+    global _client_failed
+    if _client is None and EMBEDDING_SERVICE_SOCKET and not _client_failed:
+        connect(EMBEDDING_SERVICE_SOCKET)
+    if _client is None or _client_failed:
+        return None
+    try:
+        return _client.encode(texts)
+    except Exception as e:
+        logger.warning(f"Embedding service unavailable ({e}) → using the local model")
+        _client_failed = True
+        return None
+
+
+def start_service_process(socket_path: str | None = None, warm: bool = False,
+                          ready_timeout_s: float = 30.0) -> tuple[subprocess.Popen, str]:
+    """
+    Starts `python -m utils.embedding_service` and waits until it answers a ping.
+    Returns (process, socket_path).
+    """
+    socket_path = socket_path or default_socket_path()
+    command = [sys.executable, "-m", "utils.embedding_service", "--socket", socket_path]
+    if warm:
+        command.append("--warm")
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT)
+    client = EmbeddingClient(socket_path, timeout=5.0)
+    deadline = time.monotonic() + ready_timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"embedding service exited with code {process.returncode}")
+        if os.path.exists(socket_path) and client.ping():
+            client._drop_connection()
+            return process, socket_path
+        time.sleep(0.05)
+    process.terminate()
+    raise TimeoutError(f"embedding service did not come up within {ready_timeout_s} s")
+
+
+def stop_service_process(process: subprocess.Popen, timeout_s: float = 5.0):
+    process.terminate()
+    try:
+        process.wait(timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding service for pytest-xdist workers")
+    parser.add_argument("--socket", default=default_socket_path())
+    parser.add_argument("--max-batch", type=int, default=EMBEDDING_SERVICE_MAX_BATCH)
+    parser.add_argument("--window-ms", type=float, default=EMBEDDING_SERVICE_BATCH_WINDOW_MS)
+    parser.add_argument("--warm", action="store_true", help="Load the model before accepting requests")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s embedding-service %(message)s")
+
+    # The service's own cache dedups strings across workers; it always encodes locally
+    from utils.embedding_cache import EMBEDDING_CACHE, _encode_with_model
+    EMBEDDING_CACHE.encoder = _encode_with_model
+    if args.warm:
+        from config import get_semantic_model
+        get_semantic_model()
+
+    service = EmbeddingService(args.socket, EMBEDDING_CACHE.encode, args.max_batch, args.window_ms).start()
+    logger.info(f"Listening on {args.socket}")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))     # stop_service_process → remove the socket
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,180 @@
-import json
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
 from playwright.sync_api import Page, Locator
-from groq import Groq
-from utils.actions import find_candidates
-from config import GROQ_API_KEY  # Ensure this is in your config
+from utils.dom_candidates import extract_candidates, candidate_text
+from utils.telemetry import TELEMETRY
+from config import (GROQ_API_KEY, GROQ_BASE_URL, LPU_MODEL, LPU_PREFILTER_TOP_K, LPU_TIMEOUT_S, LPU_MAX_RETRIES,
+                    LPU_STREAM, LPU_CACHE_SIZE)
 
-client = Groq(api_key=GROQ_API_KEY)
+logger = logging.getLogger(__name__)
 
+_client = None
+_client_lock = threading.Lock()
 
-def try_lpu_healing(page: Page, semantic_desc: str) -> Locator | None:
-    try:
-        candidates = find_candidates(page)
-        prompt = f"Target: '{semantic_desc}'. Candidates: {json.dumps(candidates)}. Return ONLY the exact 'text' value of the best match. No explanation."
-        # Groq LPU handles this in <50ms
+# (description, candidate-set hash) → chosen position in the candidate set sorted by text
+# (None = model found no match)
+_response_cache: "OrderedDict[str, int | None]" = OrderedDict()
+_MAX_CANDIDATE_CHARS = 160
+_INDEX_ANSWER = re.compile(r"-?\d+")
+
+
+def get_groq_client():
+    """
+    Creates the Groq client on first use, so importing this module costs nothing when the tier is off.
+    The client keeps one pooled HTTP connection (keep-alive) with explicit timeouts and retries.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+                from groq import Groq
+                http_client = httpx.Client(
+                    timeout=httpx.Timeout(LPU_TIMEOUT_S, connect=min(LPU_TIMEOUT_S, 2.0)),
+                    limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=60),
+                )
+                _client = Groq(
+                    api_key=GROQ_API_KEY or ("offline-stub" if GROQ_BASE_URL else None),
+                    base_url=GROQ_BASE_URL,
+                    max_retries=LPU_MAX_RETRIES,
+                    http_client=http_client,
+                )
+    return _client
+
+
+def _prefilter(semantic_desc: str, records: list[dict]) -> list[dict]:
+    """Keeps the LPU_PREFILTER_TOP_K candidates closest to the description (embedding similarity)."""
+    if len(records) <= LPU_PREFILTER_TOP_K:
+        return records
+    from utils.embedding_cache import EMBEDDING_CACHE
+    from utils.semantic_backends import cosine_scores
+    target = EMBEDDING_CACHE.encode([semantic_desc])
+    scores = cosine_scores(EMBEDDING_CACHE.encode([candidate_text(r) for r in records]), target)[:, 0]
+    top = sorted(range(len(records)), key=lambda i: -scores[i])[:LPU_PREFILTER_TOP_K]
+    return [records[i] for i in sorted(top)]           # keep document order in the prompt
+
+
+def _build_prompt(semantic_desc: str, texts: list[str]) -> str:
+    lines = "\n".join(f"{i}: {text}" for i, text in enumerate(texts))
+    return (f"Target: '{semantic_desc}'.\nCandidates:\n{lines}\n"
+            "Reply with ONLY the number of the best matching candidate, or -1 if none matches. No explanation.")
+
+
+def _ask_lpu(prompt: str) -> str:
+    """Sends the prompt; with LPU_STREAM, stops reading as soon as a complete index has arrived."""
+    client = get_groq_client()
+    start = time.perf_counter()
+    if not LPU_STREAM:
         chat_completion = client.chat.completions.create(
-            messages =[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-            temperature=0
+            messages=[{"role": "user", "content": prompt}],
+            model=LPU_MODEL,
+            temperature=0,
+            max_tokens=8,
         )
-
-        # 1. Get the Request ID
-        request_id = chat_completion.id
-        # 2. Get Inference Time (LPU execution only)
-        # This is usually found in the x_groq dictionary within usage or response metadata
         usage_metadata = chat_completion.usage
         inference_time = getattr(usage_metadata, 'queue_time', 0) + getattr(usage_metadata, 'prompt_time', 0) + getattr(
             usage_metadata, 'completion_time', 0)
+        logger.debug(f"Request ID: {chat_completion.id} | LPU inference {inference_time}s | "
+                     f"round trip {(time.perf_counter() - start) * 1000:.0f} ms")
+        return chat_completion.choices[0].message.content or ""
+
+    stream = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=LPU_MODEL,
+        temperature=0,
+        max_tokens=8,
+        stream=True,
+    )
+    answer = ""
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            answer += chunk.choices[0].delta.content or ""
+            # A number followed by anything else is a complete answer: stop reading
+            if _INDEX_ANSWER.search(answer) and not answer[-1:].isdigit():
+                break
+    finally:
+        stream.close()
+    logger.debug(f"LPU streamed answer {answer.strip()!r} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return answer
+
 
-        print(f"Request ID: {request_id}")
-        print(f"Actual LPU Inference Time: {inference_time}s")
-        # Clean the output in case it still includes quotes or newlines
-        match_text = chat_completion.choices[0].message.content.strip().split('\n')[-1].replace("'", "").replace('"',"")
-        print(f"→ Groq LPU Match: {match_text}")
-        # Use a specific locator method
-        return page.get_by_text(match_text, exact=True).first
+def choose_lpu_match(semantic_desc: str, records: list[dict]) -> dict | None:
+    """
+    Picks the best candidate record for `semantic_desc` with the LPU model.
+
+    Candidates are prefiltered to the semantic top-k, sent as a numbered list, and the
+    model answers with an index. Answers are cached per (description, candidate set).
+    """
+    if not records:
+        logger.info("No candidate elements found for LPU intake.")
+        return None
+
+    shortlist = _prefilter(semantic_desc, records)
+    texts = [candidate_text(r)[:_MAX_CANDIDATE_CHARS] for r in shortlist]
+    # Canonical order: the same set in another document order hashes (and indexes) the same;
+    # the sort is stable, so duplicate texts keep their relative order
+    order = sorted(range(len(texts)), key=texts.__getitem__)
+    candidate_hash = hashlib.sha1("\x1e".join(texts[i] for i in order).encode("utf-8")).hexdigest()
+    cache_key = f"{semantic_desc}\x1f{candidate_hash}"
+    TELEMETRY.annotate(candidates=len(records), candidates_sent=len(shortlist))
+
+    if cache_key in _response_cache:
+        _response_cache.move_to_end(cache_key)
+        chosen = _response_cache[cache_key]
+        logger.info(f"→ LPU response cache hit: {None if chosen is None else texts[order[chosen]]!r}")
+        TELEMETRY.annotate(response_cache_hit=True)
+        TELEMETRY.count("lpu_response_cache_hit")
+    else:
+        logger.info(f"Sending {len(shortlist)}/{len(records)} candidates to LPU")
+        TELEMETRY.annotate(response_cache_hit=False)
+        answer = _INDEX_ANSWER.search(_ask_lpu(_build_prompt(semantic_desc, texts)))
+        index = int(answer.group()) if answer else -1
+        chosen = order.index(index) if 0 <= index < len(texts) else None
+        _response_cache[cache_key] = chosen
+        while len(_response_cache) > LPU_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+    if chosen is None:
+        return None
+    record = shortlist[order[chosen]]
+    logger.info(f"→ Groq LPU Match: {record['text'][:60]!r} | Selector: {record['selector']}")
+    return {'selector': record['selector'], 'text': record['text'], 'box': record['box']}
+
+
+def find_lpu_match(page: Page, semantic_desc: str) -> dict | None:
+    """LPU counterpart of find_semantic_match: {'selector', 'text', 'box'} or None."""
+    try:
+        return choose_lpu_match(semantic_desc, extract_candidates(page, visible_only=True))
     except Exception as e:
-        print(f"LPU healing error: {e}")
-        return None
\ No newline at end of file
+        logger.warning(f"LPU healing error: {e}")
+        return None
+
+
+def find_lpu_matches(page: Page, semantic_descs: list[str]) -> list[dict | None]:
+    """Batch version of find_lpu_match: one candidate extraction, one LPU request per description."""
+    try:
+        records = extract_candidates(page, visible_only=True)
+    except Exception as e:
+        logger.warning(f"LPU healing error: {e}")
+        return [None] * len(semantic_descs)
+    matches = []
+    for semantic_desc in semantic_descs:
+        try:
+            matches.append(choose_lpu_match(semantic_desc, records))
+        except Exception as e:
+            logger.warning(f"LPU healing error: {e}")
+            matches.append(None)
+    return matches
+
+
+def try_lpu_healing(page: Page, semantic_desc: str) -> Locator | None:
+    match = find_lpu_match(page, semantic_desc)
+    if match is None:
+        return None
+    return page.locator(match['selector']).first
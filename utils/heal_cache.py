@@ -0,0 +1,300 @@
+# utils/heal_cache.py
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from playwright.sync_api import Page
+from playwright.async_api import Page as AsyncPage
+from config import HEAL_CACHE_ENABLED, HEAL_CACHE_PATH, HEAL_CACHE_MAX_ENTRIES
+from utils.telemetry import TELEMETRY
+
+logger = logging.getLogger(__name__)
+
+# Cheap structural fingerprint of the interactive part of the DOM.
+# Text and class names are left out on purpose: they are exactly what drifts
+# when a locator breaks, and the count() check on lookup catches real changes.
+_FINGERPRINT_JS = """
+() => {
+    const nodes = document.querySelectorAll('button, a, [role="button"], input, select, textarea');
+    let h = 5381;
+    for (const el of nodes) {
+        const sig = el.tagName + '#' + (el.id || '') + '@' + (el.getAttribute('name') || '')
+            + ':' + (el.getAttribute('type') || '') + ';';
+        for (let i = 0; i < sig.length; i++) {
+            h = ((h << 5) + h + sig.charCodeAt(i)) | 0;
+        }
+    }
+    return nodes.length + '-' + (h >>> 0).toString(16);
+}
+"""
+
+_TAG_AT_POINT_JS = "([x, y]) => { const el = document.elementFromPoint(x, y); return el ? el.tagName : null; }"
+
+# Path segments that are ids rather than routes: numbers, hex hashes, uuids
+_DYNAMIC_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{8,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$", re.I)
+
+
+def url_pattern(url: str) -> str:
+    """
+    Normalizes a URL to the page it represents:
+    query string and fragment are dropped, id-like path segments become '*'.
+    """
+    parts = urlsplit(url)
+    segments = ["*" if _DYNAMIC_SEGMENT.match(s) else s for s in parts.path.split("/")]
+    return f"{parts.scheme}://{parts.netloc}{'/'.join(segments)}"
+
+
+class HealCache:
+    """
+    Persistent map of (primary selector, URL pattern, DOM fingerprint) → healed result.
+
+    Entries are JSON-serializable dicts:
+        {'type': 'locator', 'selector': ..., 'score': ..., 'tier': ..., 'updated': ...}
+        {'type': 'coord', 'x': ..., 'y': ..., 'tag': ..., 'score': ..., 'tier': ..., 'updated': ...}
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: dict | None = None
+        self._pending: dict = {}           # key → entry (or None for deletion) not yet on disk
+        self._lock = threading.Lock()
+
+    # ---------- persistence ----------
+
+    def _read_disk(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = self._read_disk()
+        return self._entries
+
+    def _flush(self):
+        # Re-read before writing so parallel workers sharing the file do not drop each other's entries
+        merged = self._read_disk()
+        for key, entry in self._pending.items():
+            if entry is None:
+                merged.pop(key, None)
+            else:
+                merged[key] = entry
+        if len(merged) > self.max_entries:
+            newest = sorted(merged.items(), key=lambda kv: kv[1].get("updated", 0), reverse=True)
+            merged = dict(newest[:self.max_entries])
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(merged, f)
+        os.replace(tmp_path, self.path)
+
+        self._entries = merged
+        self._pending.clear()
+
+    def _put(self, key: str, entry: dict | None):
+        with self._lock:
+            entries = self._load()
+            if entry is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = entry
+            self._pending[key] = entry
+            try:
+                self._flush()
+            except OSError as e:
+                logger.warning(f"Heal cache write failed: {e}")
+
+    # ---------- helpers shared by the sync and async APIs ----------
+
+    @staticmethod
+    def _keys(primary_selectors: list[str], url: str, fingerprint: str) -> dict[str, str]:
+        pattern = url_pattern(url)
+        return {selector: "\x1f".join((selector, pattern, fingerprint)) for selector in primary_selectors}
+
+    def _get(self, key: str | None) -> dict | None:
+        if key is None:
+            return None
+        with self._lock:
+            return self._load().get(key)
+
+    @staticmethod
+    def _hit(entry: dict, key: str, locator=None) -> dict:
+        """Result for a cache hit; 'cache_key' lets callers invalidate exactly this entry if acting on it fails."""
+        logger.info(f"→ Heal cache hit: {entry.get('selector') or (entry.get('x'), entry.get('y'))} "
+                    f"(score {entry.get('score', 0):.3f})")
+        TELEMETRY.count("heal_cache_hit")
+        if entry["type"] == "locator":
+            return {'type': 'locator', 'value': locator.first, 'selector': entry["selector"],
+                    'score': entry.get("score"), 'tier': 'cache', 'cache_key': key}
+        return {'type': 'coord', 'x': entry["x"], 'y': entry["y"], 'score': entry.get("score"), 'tier': 'cache',
+                'cache_key': key}
+
+    @staticmethod
+    def _report_stale():
+        logger.info("→ Cached heal no longer resolves → invalidating")
+        TELEMETRY.count("heal_cache_stale")
+
+    def _miss(self, key: str):
+        self._report_stale()
+        self.invalidate(key)
+
+    @staticmethod
+    def _entry_for(result: dict, tier: str) -> dict | None:
+        if not result:
+            return None
+        entry = {'type': result['type'], 'score': float(result.get('score') or 0.0),
+                 'tier': tier, 'updated': time.time()}
+        if result['type'] == 'locator':
+            if not result.get('selector'):
+                return None
+            entry['selector'] = result['selector']
+        elif result['type'] == 'coord':
+            entry['x'], entry['y'] = int(result['x']), int(result['y'])
+        else:
+            return None
+        return entry
+
+    # ---------- public API (sync Playwright) ----------
+
+    def key_for(self, page: Page, primary_selector: str) -> str | None:
+        """Builds the cache key for the page's current state (one evaluate round trip)."""
+        return self.keys_for(page, [primary_selector])[primary_selector]
+
+    def keys_for(self, page: Page, primary_selectors: list[str]) -> dict[str, str | None]:
+        """Cache keys for several selectors on the same page, sharing one fingerprint round trip."""
+        try:
+            fingerprint = page.evaluate(_FINGERPRINT_JS)
+        except Exception as e:
+            logger.warning(f"Heal cache fingerprint failed: {e}")
+            return {selector: None for selector in primary_selectors}
+        return self._keys(primary_selectors, page.url, fingerprint)
+
+    def lookup(self, page: Page, key: str | None) -> dict | None:
+        """
+        Returns a healing result for a cached entry that still resolves, else None.
+        Entries that no longer resolve are invalidated.
+        """
+        entry = self._get(key)
+        if not entry:
+            TELEMETRY.count("heal_cache_miss")
+            return None
+        try:
+            if entry["type"] == "locator":
+                locator = page.locator(entry["selector"])
+                if locator.count() > 0:
+                    return self._hit(entry, key, locator)
+            elif entry["type"] == "coord":
+                tag = page.evaluate(_TAG_AT_POINT_JS, [entry["x"], entry["y"]])
+                if tag and tag == entry.get("tag"):
+                    return self._hit(entry, key)
+        except Exception as e:
+            logger.warning(f"Heal cache validation error: {e}")
+        self._miss(key)
+        return None
+
+    def store(self, page: Page, key: str | None, result: dict, tier: str):
+        """Remembers a successful heal. Locator results must carry their 'selector'."""
+        entry = self._entry_for(result, tier)
+        if key is None or entry is None:
+            return
+        if entry['type'] == 'coord':
+            try:
+                entry['tag'] = page.evaluate(_TAG_AT_POINT_JS, [entry['x'], entry['y']])
+            except Exception:
+                entry['tag'] = None
+        self._put(key, entry)
+
+    # ---------- public API (async Playwright) ----------
+
+    async def key_for_async(self, page: AsyncPage, primary_selector: str) -> str | None:
+        try:
+            fingerprint = await page.evaluate(_FINGERPRINT_JS)
+        except Exception as e:
+            logger.warning(f"Heal cache fingerprint failed: {e}")
+            return None
+        return self._keys([primary_selector], page.url, fingerprint)[primary_selector]
+
+    # The async API keeps file I/O (first load, write-through) off the event loop
+
+    async def lookup_async(self, page: AsyncPage, key: str | None) -> dict | None:
+        entry = self._get(key) if self._entries is not None else \
+            await asyncio.get_running_loop().run_in_executor(None, self._get, key)
+        if not entry:
+            TELEMETRY.count("heal_cache_miss")
+            return None
+        try:
+            if entry["type"] == "locator":
+                locator = page.locator(entry["selector"])
+                if await locator.count() > 0:
+                    return self._hit(entry, key, locator)
+            elif entry["type"] == "coord":
+                tag = await page.evaluate(_TAG_AT_POINT_JS, [entry["x"], entry["y"]])
+                if tag and tag == entry.get("tag"):
+                    return self._hit(entry, key)
+        except Exception as e:
+            logger.warning(f"Heal cache validation error: {e}")
+        self._report_stale()
+        await self.invalidate_async(key)
+        return None
+
+    async def store_async(self, page: AsyncPage, key: str | None, result: dict, tier: str):
+        entry = self._entry_for(result, tier)
+        if key is None or entry is None:
+            return
+        if entry['type'] == 'coord':
+            try:
+                entry['tag'] = await page.evaluate(_TAG_AT_POINT_JS, [entry['x'], entry['y']])
+            except Exception:
+                entry['tag'] = None
+        await asyncio.get_running_loop().run_in_executor(None, self._put, key, entry)
+
+    def invalidate(self, key: str | None):
+        if key is not None:
+            self._put(key, None)
+
+    async def invalidate_async(self, key: str | None):
+        if key is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._put, key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._pending.clear()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+HEAL_CACHE = HealCache(HEAL_CACHE_PATH, HEAL_CACHE_MAX_ENTRIES)
+
+
+def heal_cache_key(page: Page, primary_selector: str) -> str | None:
+    return HEAL_CACHE.key_for(page, primary_selector) if HEAL_CACHE_ENABLED else None
+
+
+def heal_cache_keys(page: Page, primary_selectors: list[str]) -> dict[str, str | None]:
+    if not HEAL_CACHE_ENABLED:
+        return {selector: None for selector in primary_selectors}
+    return HEAL_CACHE.keys_for(page, primary_selectors)
+
+
+def lookup_healed(page: Page, key: str | None) -> dict | None:
+    return HEAL_CACHE.lookup(page, key) if HEAL_CACHE_ENABLED else None
+
+
+def remember_heal(page: Page, key: str | None, result: dict, tier: str):
+    if HEAL_CACHE_ENABLED:
+        HEAL_CACHE.store(page, key, result, tier)
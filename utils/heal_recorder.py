@@ -0,0 +1,208 @@
+# utils/heal_recorder.py
+"""
+Opt-in recorder of heals, for offline regression tests and profiling (utils/heal_replay.py).
+
+With HEAL_RECORD_ENABLED=1, every heal that goes through find_locator_with_healing (or its
+async twin) is archived as one compressed .npz case in HEAL_RECORD_DIR:
+
+    meta        UTF-8 JSON: selector, description, URL, viewport, region rectangle, the visible
+                DOM candidates, the outcome (tier, selector or coordinates, element box),
+                the expected element box, and the telemetry spans of the live heal
+    screenshot  viewport screenshot as captured for the visual tier (JPEG/PNG bytes)
+    template    the element's template file (PNG bytes), when it exists (re-encoded when it
+                comes from the compiled locator registry)
+
+The snapshot is taken after the heal returns, so recorded tier latencies are the live ones,
+and the file is written by the background artifact writer. Primary successes are skipped
+unless HEAL_RECORD_PRIMARY=1; those cases carry an exact label for the semantic and visual tiers.
+"""
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import time
+
+import cv2
+import numpy as np
+
+from config import HEAL_RECORD_ENABLED, HEAL_RECORD_DIR, HEAL_RECORD_PRIMARY, HEAL_RECORD_SAMPLE_RATE
+from utils.artifacts import ARTIFACT_WRITER
+from utils.dom_candidates import extract_candidates, extract_candidates_async
+from utils.locator_registry import LOCATORS, REGIONS, TEMPLATE_PREFIX
+from utils.screen_capture import capture_bytes, capture_bytes_async, region_rect, region_rect_async
+from utils.telemetry import TELEMETRY
+from utils.template_store import TEMPLATE_STORE
+
+logger = logging.getLogger(__name__)
+
+CASE_VERSION = 1
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _as_array(data: bytes | None) -> np.ndarray:
+    return np.frombuffer(data or b"", np.uint8)
+
+
+def save_case(path: str, meta: dict, screenshot: bytes, template: bytes | None):
+    """Writes one case archive (on the calling thread)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp_path, meta=_as_array(json.dumps(meta).encode("utf-8")),
+                        screenshot=_as_array(screenshot), template=_as_array(template))
+    os.replace(tmp_path, path)
+
+
+def load_case(path: str) -> dict:
+    """Reads a case archive: the meta dict plus 'screenshot' and 'template' bytes (None if absent)."""
+    with np.load(path, allow_pickle=False) as archive:
+        case = json.loads(archive["meta"].tobytes().decode("utf-8"))
+        case["screenshot"] = archive["screenshot"].tobytes()
+        case["template"] = archive["template"].tobytes() or None
+    case["path"] = path
+    return case
+
+
+def label_case(path: str, selector: str) -> dict:
+    """
+    Marks the candidate with `selector` as the element this case should heal to (for cases
+    where the live heal picked the wrong one). Returns the new expectation.
+    """
+    case = load_case(path)
+    record = next((r for r in case["candidates"] if r["selector"] == selector), None)
+    if record is None:
+        raise ValueError(f"No recorded candidate matches {selector!r}")
+    screenshot, template = case.pop("screenshot"), case.pop("template")
+    case.pop("path")
+    case["expected"] = {"selector": selector, "box": record["box"], "source": "label"}
+    save_case(path, case, screenshot, template)
+    return case["expected"]
+
+
+def _outcome(result: dict | None, box: dict | None) -> dict:
+    if not result:
+        return {"tier": None}
+    outcome = {"tier": result.get("tier"), "type": result.get("type"), "score": result.get("score"), "box": box}
+    if result.get("type") == "coord":
+        outcome.update(x=result["x"], y=result["y"])
+    else:
+        outcome["selector"] = result.get("selector")
+    return outcome
+
+
+def _expected(outcome: dict) -> dict | None:
+    """What the replayed tiers should find: the live outcome, unless labelled otherwise."""
+    if outcome.get("box"):
+        return {"box": outcome["box"], "source": outcome["tier"]}
+    if outcome.get("type") == "coord":
+        return {"point": [outcome["x"], outcome["y"]], "source": outcome["tier"]}
+    return None
+
+
+def _bundled_template_png(template_path: str) -> bytes | None:
+    gray = TEMPLATE_STORE.get(template_path)
+    return cv2.imencode(".png", gray)[1].tobytes() if gray is not None else None
+
+
+class HealRecorder:
+    def __init__(self, directory: str, enabled: bool = False, record_primary: bool = False,
+                 sample_rate: float = 1.0):
+        self.directory = directory
+        self.enabled = enabled
+        self.record_primary = record_primary
+        self.sample_rate = sample_rate
+        self.recorded_cases = 0
+        self._sequence = itertools.count(1)
+
+    def wants(self, result: dict | None) -> bool:
+        if not self.enabled:
+            return False
+        if result and result.get("tier") == "primary" and not self.record_primary:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def recorded(self, func):
+        """Decorator for heal entry points (outside TELEMETRY.traced): records each call's case."""
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(page, primary_selector, *args, **kwargs):
+                result = await func(page, primary_selector, *args, **kwargs)
+                if self.wants(result):
+                    try:
+                        await self.record_async(page, primary_selector, result)
+                    except Exception as e:
+                        logger.warning(f"Heal recording failed for {primary_selector}: {e}")
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(page, primary_selector, *args, **kwargs):
+            result = func(page, primary_selector, *args, **kwargs)
+            if self.wants(result):
+                try:
+                    self.record(page, primary_selector, result)
+                except Exception as e:
+                    logger.warning(f"Heal recording failed for {primary_selector}: {e}")
+            return result
+        return wrapper
+
+    def record(self, page, primary_selector: str, result: dict | None):
+        """Snapshots the page (sync API) and queues the case for writing."""
+        region_selector = REGIONS.get(primary_selector)
+        box = None
+        if result and result.get("type") == "locator":
+            box = result["value"].first.bounding_box(timeout=1000)
+        candidates = extract_candidates(page, visible_only=True)
+        region = region_rect(page, region_selector) if region_selector else None
+        self._submit(page, primary_selector, result, box, candidates, region, capture_bytes(page))
+
+    async def record_async(self, page, primary_selector: str, result: dict | None):
+        """Async-API counterpart of record."""
+        region_selector = REGIONS.get(primary_selector)
+        box = None
+        if result and result.get("type") == "locator":
+            box = await result["value"].first.bounding_box(timeout=1000)
+        candidates = await extract_candidates_async(page, visible_only=True)
+        region = await region_rect_async(page, region_selector) if region_selector else None
+        self._submit(page, primary_selector, result, box, candidates, region, await capture_bytes_async(page))
+
+    def _submit(self, page, primary_selector: str, result: dict | None, box: dict | None,
+                candidates: list[dict], region: dict | None, screenshot: bytes):
+        semantic_desc, template_path = LOCATORS[primary_selector]
+        trace = TELEMETRY.traces[-1] if TELEMETRY.traces else None
+        outcome = _outcome(result, box)
+        meta = {
+            "version": CASE_VERSION,
+            "recorded_at": round(time.time(), 3),
+            "selector": primary_selector,
+            "description": semantic_desc,
+            "template": os.path.basename(template_path),
+            "url": page.url,
+            "viewport": page.viewport_size,
+            "region_selector": REGIONS.get(primary_selector),
+            "region": region,
+            "candidates": candidates,
+            "outcome": outcome,
+            "expected": _expected(outcome),
+            "trace": trace.to_dict() if trace is not None and trace.selector == primary_selector else None,
+        }
+        template = None
+        if template_path.startswith(TEMPLATE_PREFIX):
+            template = _bundled_template_png(template_path)
+        elif os.path.exists(template_path):
+            with open(template_path, "rb") as f:
+                template = f.read()
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence):05d}_" \
+               f"{_SLUG.sub('_', primary_selector).strip('_')[:60] or 'heal'}.npz"
+        ARTIFACT_WRITER.submit(save_case, os.path.join(self.directory, name), meta, screenshot, template,
+                               required=True)
+        self.recorded_cases += 1
+        logger.debug(f"Heal case queued: {name} ({len(candidates)} candidates)")
+
+
+HEAL_RECORDER = HealRecorder(HEAL_RECORD_DIR, HEAL_RECORD_ENABLED, HEAL_RECORD_PRIMARY, HEAL_RECORD_SAMPLE_RATE)
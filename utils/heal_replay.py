@@ -0,0 +1,251 @@
+# utils/heal_replay.py
+"""
+Offline replay of recorded heals (utils/heal_recorder.py): re-runs the semantic and visual
+tiers on each case's DOM candidates and screenshot, without a browser, across processes.
+
+For each tier, the report shows the replay latency next to the live latency of the recording,
+and accuracy per threshold. A pick is correct when it lands inside the expected element's box,
+which is the live outcome unless the case was relabelled. Each case is replayed once at the
+lowest threshold of a sweep, so a sweep costs no extra runs.
+
+    python -m utils.heal_replay run heal_corpus/ --workers 8 --semantic-thresholds 0.6 0.7 0.8
+    python -m utils.heal_replay label heal_corpus/<case>.npz "#login-button"
+"""
+import argparse
+import functools
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import SEMANTIC_THRESHOLD, VISUAL_THRESHOLD, REPLAY_TOLERANCE_PX
+from utils.heal_recorder import load_case, label_case
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("semantic", "visual")
+
+
+def case_paths(inputs: list[str]) -> list[str]:
+    """Case files from a mix of .npz paths and corpus directories (searched recursively)."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "**", "*.npz"), recursive=True)))
+        else:
+            paths.append(item)
+    return paths
+
+
+def expected_box(case: dict) -> dict | None:
+    """
+    Box {x, y, width, height} the replayed tiers should land in. A point-only expectation
+    (a visual or cached coordinate heal) maps to the smallest recorded candidate containing it.
+    """
+    expected = case.get("expected")
+    if not expected:
+        return None
+    if expected.get("box"):
+        return expected["box"]
+    x, y = expected["point"]
+    containing = [r["box"] for r in case["candidates"] if _contains(r["box"], x, y, 0)]
+    if containing:
+        return min(containing, key=lambda box: box["width"] * box["height"])
+    return {"x": x, "y": y, "width": 0, "height": 0}
+
+
+def _contains(box: dict, x: float, y: float, tolerance: float) -> bool:
+    return (box["x"] - tolerance <= x <= box["x"] + box["width"] + tolerance
+            and box["y"] - tolerance <= y <= box["y"] + box["height"] + tolerance)
+
+
+def _replay_semantic(case: dict, target: dict | None, threshold: float) -> dict:
+    from utils.semantic_healing import rank_candidates
+    start = time.perf_counter()
+    match = rank_candidates(case["candidates"], [case["description"]], threshold=threshold)[0]
+    row = {"ms": (time.perf_counter() - start) * 1000, "score": None, "hit": None}
+    if match:
+        box = match["box"]
+        row.update(score=match["score"], selector=match["selector"])
+        if target is not None:
+            row["hit"] = _contains(target, box["x"] + box["width"] / 2, box["y"] + box["height"] / 2,
+                                   REPLAY_TOLERANCE_PX)
+    return row
+
+
+def _replay_visual(case: dict, target: dict | None, threshold: float) -> dict | None:
+    from utils.screen_capture import decode_gray
+    from utils.visual_healing import match_template
+    if not case["template"] or not case["screenshot"]:
+        return None
+    start = time.perf_counter()
+    viewport_gray = decode_gray(case["screenshot"])
+    template_gray = decode_gray(case["template"])
+    # Screenshots are in device pixels, boxes in CSS pixels
+    scale = viewport_gray.shape[1] / case["viewport"]["width"] if case.get("viewport") else 1.0
+    search, offset_x, offset_y = viewport_gray, 0, 0
+    if case.get("region"):
+        region = case["region"]
+        offset_x, offset_y = int(region["x"] * scale), int(region["y"] * scale)
+        search = viewport_gray[offset_y:offset_y + int(region["height"] * scale),
+                               offset_x:offset_x + int(region["width"] * scale)]
+    match = match_template(search, template_gray, threshold=threshold)
+    row = {"ms": (time.perf_counter() - start) * 1000, "score": None, "hit": None}
+    if match:
+        box = match["box"]
+        x = (offset_x + (box[0] + box[2]) / 2) / scale
+        y = (offset_y + (box[1] + box[3]) / 2) / scale
+        row.update(score=match["score"], x=round(x, 1), y=round(y, 1))
+        if target is not None:
+            row["hit"] = _contains(target, x, y, REPLAY_TOLERANCE_PX)
+    return row
+
+
+def replay_case(path: str, tiers: tuple[str, ...] = TIERS, semantic_threshold: float = SEMANTIC_THRESHOLD,
+                visual_threshold: float = VISUAL_THRESHOLD) -> dict:
+    """Replays one case. Returns {'case', 'selector', 'recorded_tier', 'labeled', 'recorded_ms', <tier>: ...}."""
+    row = {"case": os.path.basename(path)}
+    try:
+        case = load_case(path)
+        target = expected_box(case)
+        trace = case.get("trace") or {}
+        row.update(selector=case["selector"], recorded_tier=case["outcome"]["tier"], labeled=target is not None,
+                   recorded_ms={span["name"]: span["duration_ms"] for span in trace.get("spans", [])})
+        if "semantic" in tiers:
+            row["semantic"] = _replay_semantic(case, target, semantic_threshold)
+        if "visual" in tiers:
+            row["visual"] = _replay_visual(case, target, visual_threshold)
+    except Exception as e:
+        logger.warning(f"Replay failed for {path}: {e}")
+        row["error"] = str(e)
+    return row
+
+
+def _prepare(tiers: tuple[str, ...], socket_path: str | None):
+    """Connects to the shared embedding service, if any, and loads the model before anything is timed."""
+    if socket_path:
+        from utils.embedding_service import connect
+        connect(socket_path)
+    if "semantic" in tiers:
+        from utils.semantic_healing import warm_up_semantic_tier
+        warm_up_semantic_tier()
+
+
+def _init_worker(tiers: tuple[str, ...], socket_path: str | None):
+    """Process-pool initializer: per-case tier logs would interleave across workers."""
+    logging.getLogger().setLevel(logging.WARNING)
+    _prepare(tiers, socket_path)
+
+
+def replay(paths: list[str], tiers: tuple[str, ...] = TIERS, workers: int = 1,
+           semantic_threshold: float = SEMANTIC_THRESHOLD, visual_threshold: float = VISUAL_THRESHOLD,
+           socket_path: str | None = None) -> list[dict]:
+    """Replays `paths` in this process (workers <= 1) or across a pool of `workers` processes."""
+    job = functools.partial(replay_case, tiers=tiers, semantic_threshold=semantic_threshold,
+                            visual_threshold=visual_threshold)
+    if workers <= 1 or len(paths) <= 1:
+        _prepare(tiers, socket_path)
+        return [job(path) for path in paths]
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(tiers, socket_path)) as pool:
+        return list(pool.map(job, paths, chunksize=chunksize))
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def summarize(rows: list[dict], semantic_thresholds: list[float], visual_thresholds: list[float]) -> dict:
+    """
+    Per tier: replayed cases, replay and recorded p50/p95 latency (ms), and per threshold the
+    cases found, the labelled ones found in the right place, and accuracy = correct / labelled.
+    """
+    summary = {"cases": len(rows), "errors": sum(1 for row in rows if "error" in row), "tiers": {}}
+    for tier, thresholds in (("semantic", semantic_thresholds), ("visual", visual_thresholds)):
+        replayed = [row[tier] for row in rows if row.get(tier)]
+        if not replayed:
+            continue
+        latencies = [r["ms"] for r in replayed]
+        recorded = [row["recorded_ms"][tier] for row in rows if tier in row.get("recorded_ms", {})]
+        labeled = [r for row, r in ((row, row.get(tier)) for row in rows) if r and row["labeled"]]
+        stats = {"cases": len(replayed), "labeled": len(labeled),
+                 "p50_ms": _percentile(latencies, 50), "p95_ms": _percentile(latencies, 95),
+                 "recorded_p50_ms": _percentile(recorded, 50), "recorded_p95_ms": _percentile(recorded, 95),
+                 "thresholds": {}}
+        for threshold in sorted(thresholds):
+            found = [r for r in replayed if r["score"] is not None and r["score"] >= threshold]
+            correct = [r for r in labeled if r["score"] is not None and r["score"] >= threshold and r["hit"]]
+            stats["thresholds"][threshold] = {"found": len(found), "correct": len(correct),
+                                              "accuracy": len(correct) / len(labeled) if labeled else None}
+        summary["tiers"][tier] = stats
+    return summary
+
+
+def format_summary(summary: dict) -> str:
+    lines = [f"{summary['cases']} cases replayed, {summary['errors']} errors"]
+    for tier, stats in summary["tiers"].items():
+        lines.append(f"{tier:<9} {stats['cases']:>6} cases ({stats['labeled']} labelled) | "
+                     f"replay p50 {stats['p50_ms']:.1f} ms p95 {stats['p95_ms']:.1f} ms | "
+                     f"live p50 {stats['recorded_p50_ms']:.1f} ms p95 {stats['recorded_p95_ms']:.1f} ms")
+        for threshold, result in stats["thresholds"].items():
+            accuracy = "n/a" if result["accuracy"] is None else f"{result['accuracy']:.1%}"
+            lines.append(f"    threshold {threshold:.2f}: found {result['found']:>6} | "
+                         f"correct {result['correct']:>6} | accuracy {accuracy}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline replay of recorded heals")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Replay a corpus and report accuracy and latency per tier")
+    run.add_argument("corpus", nargs="+", help="Case files and/or corpus directories")
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    run.add_argument("--tiers", nargs="+", choices=TIERS, default=list(TIERS))
+    run.add_argument("--semantic-thresholds", nargs="+", type=float, default=[SEMANTIC_THRESHOLD])
+    run.add_argument("--visual-thresholds", nargs="+", type=float, default=[VISUAL_THRESHOLD])
+    run.add_argument("--embedding-service", action="store_true",
+                     help="Share one model across workers (utils/embedding_service.py)")
+    run.add_argument("--json", metavar="PATH", help="Write per-case results and the summary here")
+    label = commands.add_parser("label", help="Set the element a case should heal to")
+    label.add_argument("case")
+    label.add_argument("selector", help="Selector of one of the case's recorded candidates")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    if args.command == "label":
+        print(f"{args.case}: expected {label_case(args.case, args.selector)}")
+        return
+
+    paths = case_paths(args.corpus)
+    if not paths:
+        parser.error("no .npz cases found")
+    service, socket_path = None, None
+    if args.embedding_service and "semantic" in args.tiers:
+        from utils.embedding_service import start_service_process
+        service, socket_path = start_service_process(warm=True)
+    try:
+        start = time.perf_counter()
+        rows = replay(paths, tuple(args.tiers), args.workers, min(args.semantic_thresholds),
+                      min(args.visual_thresholds), socket_path)
+        elapsed = time.perf_counter() - start
+    finally:
+        if service is not None:
+            from utils.embedding_service import stop_service_process
+            stop_service_process(service)
+
+    summary = summarize(rows, args.semantic_thresholds, args.visual_thresholds)
+    print(format_summary(summary))
+    print(f"({elapsed:.1f} s with {min(args.workers, len(paths))} worker processes)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "cases": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+# utils/locator_registry.py
+"""
+Compiled locator registry: a declarative catalog of locators, compiled into one
+memory-mapped bundle that every worker opens instead of re-encoding descriptions and
+re-decoding templates.
+
+Catalog (JSON, or YAML when PyYAML is installed):
+
+    {"locators": [
+        {"selector": "button:has-text(\"Login\")", "description": "log in button",
+         "template": "templates/login_button_template.png", "region": "nav div.flex"},
+        ...
+    ]}
+
+`template` (relative to the catalog) and `region` are optional. The bundle holds:
+- hash tables selector → entry and description → entry
+- the descriptions, normalized embeddings (SEMANTIC_EMBEDDING_DTYPE) and region hints
+- each template in grayscale, at its own size and every scale in SCALES
+
+Opening a bundle reads a fixed-size header and maps the file. A lookup is one hash probe
+into the mapped pages. Both cost the same for ten locators or ten thousand, and the
+workers of a run share the bundle through the page cache.
+
+At runtime, LOCATORS and REGIONS chain config.ELEMENT_MAPPING / REGION_SELECTORS (which
+win) with the bundle at LOCATOR_REGISTRY_PATH. Bundled templates are served to the visual
+tier from the mapping (TEMPLATE_STORE). Bundled embeddings are served to EMBEDDING_CACHE
+when they were computed with the configured encoder.
+
+    python -m utils.locator_registry export locators.json       # ELEMENT_MAPPING → catalog
+    python -m utils.locator_registry compile locators.json -o locators.bundle
+    python -m utils.locator_registry show locators.bundle ["#checkout-btn"]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import time
+from collections import ChainMap
+from collections.abc import Mapping
+from typing import Callable, Iterator
+
+import cv2
+import numpy as np
+
+from config import (PROJECT_ROOT, ELEMENT_MAPPING, REGION_SELECTORS, LOCATOR_REGISTRY_PATH, SCALES,
+                    SEMANTIC_EMBEDDING_DTYPE)
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LOCREG01"
+TEMPLATE_PREFIX = "registry:"              # template paths of bundled templates: "registry:<entry>"
+_PREFIX = struct.Struct("<8sQ")            # magic, header length
+_ALIGN = 64
+_EMPTY = 0xFFFFFFFF
+_ENCODE_BATCH = 256
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+SLOT_DTYPE = np.dtype([("hash", "<u8"), ("entry", "<u4"), ("pad", "<u4")])
+ENTRY_DTYPE = np.dtype([(f"{field}{part}", kind) for field in ("selector", "description", "region", "template")
+                        for part, kind in (("_off", "<u8"), ("_len", "<u4"))]
+                       + [("image_start", "<u4"), ("image_count", "<u4")])
+IMAGE_DTYPE = np.dtype([("offset", "<u8"), ("height", "<u4"), ("width", "<u4"), ("scale", "<f4")])
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def load_catalog(path: str) -> list[dict]:
+    """
+    Normalized catalog entries {selector, description, template, region}. Template paths
+    are resolved against the catalog's directory; a missing one defaults to templates/<slug>.png.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:
+                raise RuntimeError("YAML catalogs need PyYAML (pip install pyyaml), or use JSON") from e
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    items = data.get("locators", []) if isinstance(data, dict) else data
+    base = os.path.dirname(os.path.abspath(path))
+    entries, seen = [], set()
+    for i, item in enumerate(items):
+        selector, description = item.get("selector"), item.get("description")
+        if not selector or not description:
+            raise ValueError(f"Catalog entry {i} needs a selector and a description")
+        if selector in seen:
+            raise ValueError(f"Duplicate selector in catalog: {selector}")
+        seen.add(selector)
+        template = item.get("template") or os.path.join("templates", f"{_SLUG.sub('_', selector).strip('_')}.png")
+        entries.append({"selector": selector, "description": description,
+                        "template": os.path.normpath(os.path.join(base, template)),
+                        "region": item.get("region") or ""})
+    return entries
+
+
+def catalog_from_config(catalog_dir: str = PROJECT_ROOT) -> dict:
+    """ELEMENT_MAPPING and REGION_SELECTORS as a catalog stored in `catalog_dir` (template paths relative to it)."""
+    locators = []
+    for selector, (description, template_path) in ELEMENT_MAPPING.items():
+        item = {"selector": selector, "description": description,
+                "template": os.path.relpath(os.path.join(PROJECT_ROOT, template_path), catalog_dir)}
+        if REGION_SELECTORS.get(selector):
+            item["region"] = REGION_SELECTORS[selector]
+        locators.append(item)
+    return {"locators": locators}
+
+
+def _slot_table(keys: list[str]) -> np.ndarray:
+    """Open-addressing table (linear probing, load factor <= 0.5): hash(key) → index of its first occurrence."""
+    size = 1 << max(3, (2 * len(keys) - 1).bit_length())
+    table = np.zeros(size, dtype=SLOT_DTYPE)
+    table["entry"] = _EMPTY
+    seen = set()
+    for i, key in enumerate(keys):
+        if key in seen:
+            continue
+        seen.add(key)
+        h = _hash(key)
+        slot = h & (size - 1)
+        while table[slot]["entry"] != _EMPTY:
+            slot = (slot + 1) & (size - 1)
+        table[slot] = (h, i, 0)
+    return table
+
+
+def _scaled(gray: np.ndarray, scales: list[float]) -> list[tuple[float, np.ndarray]]:
+    """The template at its own size, then at each scale (same sizes as TemplateStore builds)."""
+    t_h, t_w = gray.shape
+    images, sizes = [(1.0, gray)], {(t_w, t_h)}
+    for scale in scales:
+        w, h = int(t_w * scale), int(t_h * scale)
+        if w >= 1 and h >= 1 and (w, h) not in sizes:
+            sizes.add((w, h))
+            images.append((scale, cv2.resize(gray, (w, h))))
+    return images
+
+
+def compile_registry(entries: list[dict], bundle_path: str, encode: Callable[[list[str]], np.ndarray] | None = None,
+                     namespace: str | None = None, scales: list[float] | None = None,
+                     dtype: str = SEMANTIC_EMBEDDING_DTYPE) -> dict:
+    """
+    Writes the bundle for `entries` (see load_catalog). Embeddings come from `encode`
+    (default: EMBEDDING_CACHE, i.e. the configured semantic backend); `namespace` records
+    which encoder produced them. Returns a summary of what was written.
+    """
+    if encode is None:
+        from utils.embedding_cache import EMBEDDING_CACHE
+        from utils.semantic_backends import backend_namespace
+        encode, namespace = EMBEDDING_CACHE.encode, backend_namespace()
+    scales = SCALES if scales is None else scales
+    bundle_dir = os.path.dirname(os.path.abspath(bundle_path))
+
+    descriptions = [entry["description"] for entry in entries]
+    batches = [np.asarray(encode(descriptions[i:i + _ENCODE_BATCH]), dtype=np.float32)
+               for i in range(0, len(descriptions), _ENCODE_BATCH)]
+    vectors = np.concatenate(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True) if len(vectors) else None
+    vectors = (vectors / np.maximum(norms, 1e-12) if norms is not None else vectors).astype(dtype)
+
+    strings, pixels = bytearray(), bytearray()
+    table = np.zeros(len(entries), dtype=ENTRY_DTYPE)
+    images: list[tuple] = []
+    missing_templates = 0
+
+    def put_string(value: str) -> tuple[int, int]:
+        data = value.encode("utf-8")
+        strings.extend(data)
+        return len(strings) - len(data), len(data)
+
+    for i, entry in enumerate(entries):
+        row = table[i]
+        template_rel = os.path.relpath(entry["template"], bundle_dir)
+        for field, value in (("selector", entry["selector"]), ("description", entry["description"]),
+                             ("region", entry["region"]), ("template", template_rel)):
+            row[f"{field}_off"], row[f"{field}_len"] = put_string(value)
+        row["image_start"] = len(images)
+        gray = cv2.imread(entry["template"], cv2.IMREAD_GRAYSCALE) if os.path.exists(entry["template"]) else None
+        if gray is None:
+            missing_templates += 1
+            continue
+        for scale, image in _scaled(gray, scales):
+            images.append((len(pixels), image.shape[0], image.shape[1], scale))
+            pixels.extend(np.ascontiguousarray(image).tobytes())
+        row["image_count"] = len(images) - row["image_start"]
+
+    sections = {
+        "selector_slots": _slot_table([entry["selector"] for entry in entries]).tobytes(),
+        "description_slots": _slot_table(descriptions).tobytes(),
+        "entries": table.tobytes(),
+        "images": np.array(images, dtype=IMAGE_DTYPE).tobytes(),
+        "embeddings": vectors.tobytes(),
+        "strings": bytes(strings),
+        "pixels": bytes(pixels),
+    }
+    header = {"count": len(entries), "regions": sum(1 for entry in entries if entry["region"]),
+              "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0, "dtype": np.dtype(dtype).name,
+              "namespace": namespace or "", "scales": list(scales), "compiled_at": round(time.time()),
+              "sections": {}}
+    # Section offsets depend on the header's own length: reserve room for them first
+    header["sections"] = {name: [0, len(data)] for name, data in sections.items()}
+    offset = _PREFIX.size + len(json.dumps(header).encode("utf-8")) + 32 * len(sections)
+    for name, data in sections.items():
+        offset = -(-offset // _ALIGN) * _ALIGN
+        header["sections"][name] = [offset, len(data)]
+        offset += len(data)
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    directory = os.path.dirname(bundle_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{bundle_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for name, data in sections.items():
+            f.seek(header["sections"][name][0])
+            f.write(data)
+        f.truncate(offset)
+    os.replace(tmp_path, bundle_path)
+    summary = {"locators": len(entries), "templates": len(entries) - missing_templates, "images": len(images),
+               "dim": header["dim"], "bytes": os.path.getsize(bundle_path)}
+    logger.info(f"Compiled {summary['locators']} locators into {bundle_path} ({summary['bytes'] / 1024:.0f} KiB, "
+                f"{missing_templates} without a template)")
+    return summary
+
+
+class LocatorRegistry:
+    """Read-only view of a compiled bundle. An unset or unreadable path gives an empty registry."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.count = 0
+        self.region_count = 0
+        self.namespace = ""
+        self.scales: list[float] = []
+        self.dim = 0
+        self._mm = None
+        self._selector_slots = self._description_slots = np.zeros(0, dtype=SLOT_DTYPE)
+        self._entries = np.zeros(0, dtype=ENTRY_DTYPE)
+        self._images = np.zeros(0, dtype=IMAGE_DTYPE)
+        if path:
+            try:
+                self._open(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Locator registry unavailable ({path}): {e}")
+                self.count = 0
+
+    def _open(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _PREFIX.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError("not a locator registry bundle")
+        header = json.loads(bytes(self._mm[_PREFIX.size:_PREFIX.size + header_len]))
+        self.count, self.region_count = header["count"], header["regions"]
+        self.namespace, self.scales, self.dim = header["namespace"], header["scales"], header["dim"]
+        self._base = os.path.dirname(os.path.abspath(path))
+
+        def view(name: str, dtype) -> np.ndarray:
+            offset, size = header["sections"][name]
+            return np.frombuffer(self._mm, dtype=dtype, count=size // np.dtype(dtype).itemsize, offset=offset)
+
+        self._selector_slots = view("selector_slots", SLOT_DTYPE)
+        self._description_slots = view("description_slots", SLOT_DTYPE)
+        self._entries = view("entries", ENTRY_DTYPE)
+        self._images = view("images", IMAGE_DTYPE)
+        self._embeddings = view("embeddings", header["dtype"]).reshape(self.count, self.dim)
+        self._strings_offset = header["sections"]["strings"][0]
+        self._pixels_offset = header["sections"]["pixels"][0]
+        logger.info(f"Locator registry: {self.count} locators from {path}")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _string(self, index: int, field: str) -> str:
+        entry = self._entries[index]
+        start = self._strings_offset + int(entry[f"{field}_off"])
+        return self._mm[start:start + int(entry[f"{field}_len"])].decode("utf-8")
+
+    def _find(self, slots: np.ndarray, field: str, key: str) -> int | None:
+        if not self.count:
+            return None
+        h = _hash(key)
+        mask = len(slots) - 1
+        slot = h & mask
+        while True:
+            entry = int(slots[slot]["entry"])
+            if entry == _EMPTY:
+                return None
+            if int(slots[slot]["hash"]) == h and self._string(entry, field) == key:
+                return entry
+            slot = (slot + 1) & mask
+
+    def index(self, selector: str) -> int | None:
+        return self._find(self._selector_slots, "selector", selector)
+
+    def selector(self, index: int) -> str:
+        return self._string(index, "selector")
+
+    def lookup(self, selector: str) -> dict | None:
+        """{'description', 'template_path', 'region_selector'} for `selector`, or None."""
+        index = self.index(selector)
+        if index is None:
+            return None
+        return {"description": self._string(index, "description"), "template_path": self.template_path(index),
+                "region_selector": self._string(index, "region") or None}
+
+    def template_path(self, index: int) -> str:
+        """registry:<index> when the template is in the bundle, else the template file (for auto-capture)."""
+        if self._entries[index]["image_count"]:
+            return f"{TEMPLATE_PREFIX}{index}"
+        return os.path.normpath(os.path.join(self._base, self._string(index, "template")))
+
+    def templates(self, index: int) -> list[tuple[float, np.ndarray]]:
+        """(scale, grayscale image) views into the bundle, own size first. Read-only."""
+        entry = self._entries[index]
+        start = int(entry["image_start"])
+        images = []
+        for row in self._images[start:start + int(entry["image_count"])]:
+            height, width = int(row["height"]), int(row["width"])
+            pixels = np.frombuffer(self._mm, dtype=np.uint8, count=height * width,
+                                   offset=self._pixels_offset + int(row["offset"]))
+            images.append((float(row["scale"]), pixels.reshape(height, width)))
+        return images
+
+    def vector(self, description: str, namespace: str) -> np.ndarray | None:
+        """Precomputed embedding of `description`, if it was encoded with the encoder `namespace`."""
+        if namespace != self.namespace:
+            return None
+        index = self._find(self._description_slots, "description", description)
+        return None if index is None else self._embeddings[index]
+
+
+class _Locators(Mapping):
+    """selector → (description, template_path), like ELEMENT_MAPPING."""
+
+    def __init__(self, registry: LocatorRegistry):
+        self.registry = registry
+
+    def __getitem__(self, selector: str) -> tuple[str, str]:
+        found = self.registry.lookup(selector)
+        if found is None:
+            raise KeyError(selector)
+        return found["description"], found["template_path"]
+
+    def __contains__(self, selector) -> bool:
+        return isinstance(selector, str) and self.registry.index(selector) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.registry.selector(i) for i in range(len(self.registry)))
+
+    def __len__(self) -> int:
+        return len(self.registry)
+
+
+class _Regions(Mapping):
+    """selector → region selector, like REGION_SELECTORS (bundled entries with a region only)."""
+
+    def __init__(self, registry: LocatorRegistry):
+        self.registry = registry
+
+    def __getitem__(self, selector: str) -> str:
+        found = self.registry.lookup(selector)
+        if found is None or not found["region_selector"]:
+            raise KeyError(selector)
+        return found["region_selector"]
+
+    def __iter__(self) -> Iterator[str]:
+        return (selector for selector in _Locators(self.registry) if selector in self)
+
+    def __len__(self) -> int:
+        return self.registry.region_count
+
+
+LOCATOR_REGISTRY = LocatorRegistry(LOCATOR_REGISTRY_PATH if LOCATOR_REGISTRY_PATH and
+                                   os.path.exists(LOCATOR_REGISTRY_PATH) else None)
+# What the healing entry points look selectors up in: config first, then the bundle
+LOCATORS = ChainMap(ELEMENT_MAPPING, _Locators(LOCATOR_REGISTRY))
+REGIONS = ChainMap(REGION_SELECTORS, _Regions(LOCATOR_REGISTRY))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile and inspect locator registry bundles")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("compile", help="Compile a JSON/YAML catalog into a bundle")
+    build.add_argument("catalog")
+    build.add_argument("-o", "--output", default=LOCATOR_REGISTRY_PATH)
+    export = commands.add_parser("export", help="Write ELEMENT_MAPPING and REGION_SELECTORS as a catalog")
+    export.add_argument("catalog")
+    show = commands.add_parser("show", help="Summary of a bundle, or one selector's entry")
+    show.add_argument("bundle", nargs="?", default=LOCATOR_REGISTRY_PATH)
+    show.add_argument("selector", nargs="?")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "export":
+        catalog = catalog_from_config(os.path.dirname(os.path.abspath(args.catalog)))
+        with open(args.catalog, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, indent=2)
+        print(f"{len(catalog['locators'])} locators written to {args.catalog}")
+    elif args.command == "compile":
+        start = time.perf_counter()
+        summary = compile_registry(load_catalog(args.catalog), args.output)
+        print(f"{summary['locators']} locators, {summary['templates']} templates ({summary['images']} images), "
+              f"dim {summary['dim']}, {summary['bytes'] / 1024:.0f} KiB → {args.output} "
+              f"in {time.perf_counter() - start:.1f} s")
+    else:
+        registry = LocatorRegistry(args.bundle)
+        if args.selector:
+            found = registry.lookup(args.selector)
+            print(json.dumps(found, indent=2) if found else f"{args.selector}: not in {args.bundle}")
+        else:
+            print(f"{args.bundle}: {len(registry)} locators, {registry.region_count} with a region, "
+                  f"encoder {registry.namespace or '-'}, scales {registry.scales}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# utils/lpu_stub_server.py
+"""
+Offline stand-in for the Groq chat-completions endpoint used by the LPU tier.
+
+Answers prompts built by utils/groq_lpu_healing.py with the index of the candidate whose
+words overlap most with the target description (or -1), supports both plain and streamed
+(SSE) responses, and counts requests so tests can assert on caching.
+
+    python -m utils.lpu_stub_server --port 8765
+    GROQ_BASE_URL=http://127.0.0.1:8765 LPU_ENABLED=1 pytest
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TARGET = re.compile(r"Target: '(.*?)'\.")
+_CANDIDATE = re.compile(r"^(\d+): (.*)$", re.M)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def pick_index(prompt: str) -> int:
+    """Index of the candidate sharing the most words with the target (Jaccard), -1 if none."""
+    target = _TARGET.search(prompt)
+    if not target:
+        return -1
+    target_words = set(_WORD.findall(target.group(1).lower()))
+    best_index, best_score = -1, 0.0
+    for index, text in _CANDIDATE.findall(prompt):
+        words = set(_WORD.findall(text.lower()))
+        score = len(target_words & words) / max(1, len(target_words | words))
+        if score > best_score:
+            best_index, best_score = int(index), score
+    return best_index
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"            # keep-alive, like the real endpoint
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.server.request_count += 1
+        prompt = body["messages"][-1]["content"]
+        answer = str(pick_index(prompt))
+        completion_id = f"stub-{self.server.request_count}"
+        created = int(time.time())
+        model = body.get("model", "stub")
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            # One token per digit, then a trailing newline token, like a real model would
+            for token in list(answer) + ["\n"]:
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+
+        payload = json.dumps({
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 1, "total_tokens": len(prompt) // 4 + 1,
+                      "queue_time": 0.0, "prompt_time": 0.0, "completion_time": 0.0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """Starts the stub in a daemon thread. Returns (server, base_url); call server.shutdown() to stop."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.request_count = 0
+    threading.Thread(target=server.serve_forever, name="lpu-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Groq chat-completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server, url = start_stub_server(args.host, args.port)
+    print(f"LPU stub listening on {url} (set GROQ_BASE_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# utils/primary_probe.py
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+from playwright.sync_api import Page, Locator, TimeoutError as PlaywrightTimeoutError
+from config import (PRIMARY_TIMEOUT_MS, PRIMARY_MIN_TIMEOUT_MS, PRIMARY_PROBE_SLICE_MS, PRIMARY_QUIET_MS,
+                    PRIMARY_HISTORY_PATH)
+from utils.telemetry import TELEMETRY
+
+logger = logging.getLogger(__name__)
+
+# Installs (once per document) a MutationObserver that timestamps the last DOM change,
+# and reports how long the DOM has been quiet plus the document's load state.
+_DOM_QUIET_JS = """
+() => {
+    if (!window.__healLastMutation) {
+        window.__healLastMutation = performance.now();
+        new MutationObserver(() => { window.__healLastMutation = performance.now(); })
+            .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    }
+    return {quietMs: performance.now() - window.__healLastMutation, readyState: document.readyState};
+}
+"""
+
+_HISTORY_SAMPLES = 20
+
+
+class _NetworkTracker:
+    """Counts in-flight requests of a page through Playwright's request events."""
+
+    def __init__(self, page: Page):
+        self.in_flight = 0
+        page.on("request", self._started)
+        page.on("requestfinished", self._finished)
+        page.on("requestfailed", self._finished)
+
+    def _started(self, _request):
+        self.in_flight += 1
+
+    def _finished(self, _request):
+        self.in_flight = max(0, self.in_flight - 1)
+
+
+_trackers: "weakref.WeakKeyDictionary[Page, _NetworkTracker]" = weakref.WeakKeyDictionary()
+
+
+def _tracker(page: Page) -> _NetworkTracker:
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = _trackers[page] = _NetworkTracker(page)
+    return tracker
+
+
+def page_settled(page: Page) -> bool:
+    """
+    True once the page is unlikely to change on its own: document loaded, no requests
+    in flight (as seen since tracking started) and no DOM mutation for PRIMARY_QUIET_MS.
+    """
+    try:
+        state = page.evaluate(_DOM_QUIET_JS)
+    except Exception:
+        return False
+    return (state["readyState"] == "complete"
+            and state["quietMs"] >= PRIMARY_QUIET_MS
+            and _tracker(page).in_flight == 0)
+
+
+class ProbeHistory:
+    """
+    Per-selector history of how long primary locators took to become visible.
+    Kept in memory and written once at interpreter exit (merged with the file on disk).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: dict | None = None
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _read_disk(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self) -> dict:
+        if self._data is None:
+            self._data = self._read_disk()
+        return self._data
+
+    def timeout_for(self, selector: str) -> int:
+        """
+        Learned wait budget (ms):
+        - no history → PRIMARY_TIMEOUT_MS
+        - seen before → 1.5 × slowest observed appearance (+ one probe slice), clamped
+        - never seen in recent history → PRIMARY_MIN_TIMEOUT_MS
+        """
+        with self._lock:
+            entry = self._load().get(selector)
+        if not entry:
+            return PRIMARY_TIMEOUT_MS
+        samples = entry.get("appear_ms", [])
+        if not samples:
+            return PRIMARY_MIN_TIMEOUT_MS
+        learned = int(max(samples) * 1.5) + PRIMARY_PROBE_SLICE_MS
+        return max(PRIMARY_MIN_TIMEOUT_MS, min(PRIMARY_TIMEOUT_MS, learned))
+
+    def record(self, selector: str, appear_ms: float | None):
+        """appear_ms: time until visible, or None when the primary never appeared."""
+        with self._lock:
+            entry = self._load().setdefault(selector, {"appear_ms": [], "misses": 0})
+            if appear_ms is None:
+                entry["misses"] += 1
+            else:
+                entry["appear_ms"] = (entry["appear_ms"] + [round(appear_ms, 1)])[-_HISTORY_SAMPLES:]
+                entry["misses"] = 0
+            self._dirty.add(selector)
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._read_disk()
+            for selector in self._dirty:
+                merged[selector] = self._data[selector]
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(merged, f)
+                os.replace(tmp_path, self.path)
+                self._dirty.clear()
+            except OSError as e:
+                logger.warning(f"Primary probe history write failed: {e}")
+
+
+PROBE_HISTORY = ProbeHistory(PRIMARY_HISTORY_PATH)
+atexit.register(PROBE_HISTORY.flush)
+
+
+def probe_primary(page: Page, primary_selector: str) -> Locator | None:
+    """
+    Adaptive replacement for `locator.wait_for(state="visible", timeout=5000)`.
+
+    1. Immediate visibility check (no wait when the element is already there)
+    2. Wait in PRIMARY_PROBE_SLICE_MS slices, up to the selector's learned budget
+    3. Between slices, give up early once the page has settled (loaded, network idle,
+       DOM quiet) and the element still is not there
+
+    Returns the first matching element's locator if it became visible, else None (the
+    unqualified locator would trip strict mode when the selector matches several elements).
+    """
+    locator = page.locator(primary_selector).first
+    start = time.perf_counter()
+    budget_ms = PROBE_HISTORY.timeout_for(primary_selector)
+    _tracker(page)
+
+    TELEMETRY.annotate(budget_ms=budget_ms)
+    if locator.is_visible():
+        PROBE_HISTORY.record(primary_selector, 0.0)
+        return locator
+
+    while True:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        remaining_ms = budget_ms - elapsed_ms
+        if remaining_ms <= 0:
+            logger.info(f"→ Primary not visible within learned budget {budget_ms} ms")
+            break
+        try:
+            locator.wait_for(state="visible", timeout=min(PRIMARY_PROBE_SLICE_MS, remaining_ms))
+            PROBE_HISTORY.record(primary_selector, (time.perf_counter() - start) * 1000)
+            return locator
+        except PlaywrightTimeoutError:
+            pass
+        if page_settled(page):
+            logger.info(f"→ Page settled without the primary after {(time.perf_counter() - start) * 1000:.0f} ms → giving up early")
+            TELEMETRY.annotate(settled_early=True)
+            break
+
+    PROBE_HISTORY.record(primary_selector, None)
+    return None
@@ -0,0 +1,119 @@
+# utils/screen_capture.py
+"""
+Screenshots for the visual tier, decoded straight to grayscale.
+
+- Format: VISUAL_SCREENSHOT_FORMAT=jpeg (default) is encoded by the browser and decoded by
+  OpenCV several times faster than PNG. Template matching scores barely move at the
+  default quality. png keeps lossless captures.
+- VISUAL_CAPTURE=cdp captures through a raw Chrome DevTools Protocol session
+  (Page.captureScreenshot with optimizeForSpeed). It falls back to page.screenshot() on
+  browsers without CDP.
+- Regions: one in-page lookup returns the region's rectangle clamped to the viewport, then
+  a clipped screenshot of just that rectangle. The rectangle is also the offset of the
+  match, so no second bounding_box round trip is needed.
+"""
+import base64
+import logging
+import weakref
+
+import cv2
+import numpy as np
+from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Page as AsyncPage, TimeoutError as AsyncPlaywrightTimeoutError
+
+from config import VISUAL_SCREENSHOT_FORMAT, VISUAL_JPEG_QUALITY, VISUAL_CAPTURE, VISUAL_REGION_TIMEOUT_MS
+
+logger = logging.getLogger(__name__)
+
+# Region rectangle in viewport pixels, clamped to the visible part; null when off-screen
+_REGION_RECT_JS = """
+(el) => {
+    const r = el.getBoundingClientRect();
+    const x0 = Math.max(0, Math.floor(r.left)), y0 = Math.max(0, Math.floor(r.top));
+    const x1 = Math.min(window.innerWidth, Math.ceil(r.right)), y1 = Math.min(window.innerHeight, Math.ceil(r.bottom));
+    if (x1 <= x0 || y1 <= y0) return null;
+    return {x: x0, y: y0, width: x1 - x0, height: y1 - y0, scrollX: window.scrollX, scrollY: window.scrollY};
+}
+"""
+
+_cdp_sessions: "weakref.WeakKeyDictionary[Page | AsyncPage, object]" = weakref.WeakKeyDictionary()
+
+
+def decode_gray(image_bytes: bytes) -> np.ndarray:
+    """Decodes PNG/JPEG bytes directly to a grayscale array (no intermediate color image)."""
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("screenshot could not be decoded")
+    return gray
+
+
+def screenshot_options(clip: dict | None = None) -> dict:
+    """page.screenshot() keyword arguments for visual-tier captures."""
+    options = {"type": "png"} if VISUAL_SCREENSHOT_FORMAT == "png" else \
+        {"type": "jpeg", "quality": VISUAL_JPEG_QUALITY}
+    if clip:
+        options["clip"] = {k: clip[k] for k in ("x", "y", "width", "height")}
+    return options
+
+
+def _cdp_params(clip: dict | None) -> dict:
+    params = {"format": "png" if VISUAL_SCREENSHOT_FORMAT == "png" else "jpeg", "optimizeForSpeed": True}
+    if params["format"] == "jpeg":
+        params["quality"] = VISUAL_JPEG_QUALITY
+    if clip:
+        # CDP clips are in document coordinates
+        params["clip"] = {"x": clip["x"] + clip.get("scrollX", 0), "y": clip["y"] + clip.get("scrollY", 0),
+                          "width": clip["width"], "height": clip["height"], "scale": 1}
+    return params
+
+
+def region_rect(page: Page, region_selector: str, timeout: float = VISUAL_REGION_TIMEOUT_MS) -> dict | None:
+    """
+    Visible rectangle of the region in viewport pixels ({x, y, width, height, scrollX, scrollY}),
+    or None when it is off-screen or does not show up within `timeout`.
+    """
+    try:
+        return page.locator(region_selector).first.evaluate(_REGION_RECT_JS, timeout=timeout)
+    except PlaywrightTimeoutError:
+        return None
+
+
+async def region_rect_async(page: AsyncPage, region_selector: str,
+                            timeout: float = VISUAL_REGION_TIMEOUT_MS) -> dict | None:
+    """Async-API counterpart of region_rect."""
+    try:
+        return await page.locator(region_selector).first.evaluate(_REGION_RECT_JS, timeout=timeout)
+    except AsyncPlaywrightTimeoutError:
+        return None
+
+
+def capture_bytes(page: Page, clip: dict | None = None) -> bytes:
+    """Viewport (or clipped) screenshot as encoded bytes, through CDP when VISUAL_CAPTURE=cdp."""
+    if VISUAL_CAPTURE == "cdp" and _cdp_sessions.get(page, True) is not None:
+        try:
+            session = _cdp_sessions.get(page)
+            if session is None:
+                session = _cdp_sessions[page] = page.context.new_cdp_session(page)
+            return base64.b64decode(session.send("Page.captureScreenshot", _cdp_params(clip))["data"])
+        except Exception as e:
+            logger.info(f"CDP capture unavailable ({e}) → page.screenshot()")
+            _cdp_sessions[page] = None                  # do not try again on this page
+    return page.screenshot(**screenshot_options(clip))
+
+
+async def capture_bytes_async(page: AsyncPage, clip: dict | None = None) -> bytes:
+    """Async-API counterpart of capture_bytes."""
+    if VISUAL_CAPTURE == "cdp" and _cdp_sessions.get(page, True) is not None:
+        try:
+            session = _cdp_sessions.get(page)
+            if session is None:
+                session = _cdp_sessions[page] = await page.context.new_cdp_session(page)
+            return base64.b64decode((await session.send("Page.captureScreenshot", _cdp_params(clip)))["data"])
+        except Exception as e:
+            logger.info(f"CDP capture unavailable ({e}) → page.screenshot()")
+            _cdp_sessions[page] = None
+    return await page.screenshot(**screenshot_options(clip))
+
+
+def capture_gray(page: Page, clip: dict | None = None) -> np.ndarray:
+    return decode_gray(capture_bytes(page, clip))
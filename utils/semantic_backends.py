@@ -0,0 +1,212 @@
+# utils/semantic_backends.py
+"""
+Pluggable encoders for the semantic tier, chosen with SEMANTIC_BACKEND in config.py.
+
+- "sentence-transformers": the MiniLM SentenceTransformer on torch (torch threads capped
+  at SEMANTIC_THREADS).
+- "onnx": the same model exported to ONNX and run with ONNX Runtime, int8-quantized by
+  default. Tokenization uses the `tokenizers` library, and pooling and normalization run
+  in NumPy, so torch is never imported.
+- "auto": "onnx" when onnxruntime is installed and an exported model exists in
+  SEMANTIC_ONNX_DIR, otherwise "sentence-transformers".
+
+Export the model once (this step needs torch; `--quantize` also writes the int8 model):
+
+    python -m utils.semantic_backends --export models/all-MiniLM-L6-v2-onnx --quantize
+
+Embeddings are stored as SEMANTIC_EMBEDDING_DTYPE (float16 by default). `cosine_scores`
+accumulates in float32, because NumPy has no fast float16 matrix product.
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import threading
+
+import numpy as np
+
+from config import (get_semantic_model, SEMANTIC_MODEL_NAME, SEMANTIC_BACKEND, SEMANTIC_ONNX_DIR,
+                    SEMANTIC_ONNX_QUANTIZED, SEMANTIC_THREADS, SEMANTIC_MAX_SEQ_LENGTH)
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def cosine_scores(candidates: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarities of L2-normalized rows: (candidates, dim) × (targets, dim) → (candidates, targets).
+    Accepts float16 or float32 inputs; the product is computed in float32.
+    """
+    return np.dot(candidates.astype(np.float32, copy=False), targets.astype(np.float32, copy=False).T)
+
+
+def mean_pool_normalize(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Mean over non-padding tokens followed by L2 normalization (what sentence-transformers does for MiniLM)."""
+    mask = attention_mask[..., None].astype(np.float32)
+    pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+def onnx_model_path(model_dir: str = SEMANTIC_ONNX_DIR, quantized: bool = SEMANTIC_ONNX_QUANTIZED) -> str | None:
+    """Exported model to load (int8 preferred when `quantized`), or None if there is none."""
+    names = [ONNX_INT8_MODEL_FILE, ONNX_MODEL_FILE] if quantized else [ONNX_MODEL_FILE]
+    if not os.path.exists(os.path.join(model_dir, TOKENIZER_FILE)):
+        return None
+    for name in names:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def resolve_backend_name(setting: str = SEMANTIC_BACKEND) -> str:
+    """'onnx' or 'sentence-transformers'. Cheap: checks files and installed packages, imports nothing."""
+    if setting != "auto":
+        return setting
+    if importlib.util.find_spec("onnxruntime") and importlib.util.find_spec("tokenizers") and onnx_model_path():
+        return "onnx"
+    return "sentence-transformers"
+
+
+def backend_namespace() -> str:
+    """Embedding-cache namespace: vectors from different backends / quantizations never mix."""
+    model_path = onnx_model_path() if resolve_backend_name() == "onnx" else None
+    if model_path is None:
+        # No exported model: get_semantic_backend() reports that on first use, not at import time
+        return SEMANTIC_MODEL_NAME
+    return f"{SEMANTIC_MODEL_NAME}/{os.path.splitext(os.path.basename(model_path))[0]}"
+
+
+class SentenceTransformerBackend:
+    name = "sentence-transformers"
+
+    def __init__(self, threads: int = 0):
+        self.threads = threads
+        self._threads_set = False
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        model = get_semantic_model()
+        if not self._threads_set and self.threads > 0:
+            import torch
+            torch.set_num_threads(self.threads)
+            self._threads_set = True
+        return model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+
+class OnnxBackend:
+    """MiniLM on ONNX Runtime; the session and tokenizer load on the first encode."""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, tokenizer_path: str, threads: int = 0, max_length: int = 256,
+                 session=None, tokenizer=None):
+        self.model_path = model_path
+        self.tokenizer_path = tokenizer_path
+        self.threads = threads
+        self.max_length = max_length
+        self._session = session
+        self._tokenizer = tokenizer
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._session is not None:
+                return
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.inter_op_num_threads = 1
+            if self.threads > 0:
+                options.intra_op_num_threads = self.threads
+            tokenizer = Tokenizer.from_file(self.tokenizer_path)
+            tokenizer.enable_truncation(max_length=self.max_length)
+            tokenizer.enable_padding()
+            self._tokenizer = tokenizer
+            self._session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+            logger.info(f"ONNX semantic backend loaded: {os.path.basename(self.model_path)}")
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if self._session is None:
+            self._load()
+        encodings = self._tokenizer.encode_batch(list(texts))
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        wanted = {i.name for i in self._session.get_inputs()}
+        token_embeddings = self._session.run(None, {k: v for k, v in inputs.items() if k in wanted})[0]
+        return mean_pool_normalize(token_embeddings, inputs["attention_mask"])
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_semantic_backend():
+    """The configured backend, created on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = resolve_backend_name()
+                if name == "onnx":
+                    model_path = onnx_model_path()
+                    if model_path is None:
+                        raise FileNotFoundError(f"No exported ONNX model in {SEMANTIC_ONNX_DIR} "
+                                                "(python -m utils.semantic_backends --export ...)")
+                    _backend = OnnxBackend(model_path, os.path.join(SEMANTIC_ONNX_DIR, TOKENIZER_FILE),
+                                           SEMANTIC_THREADS, SEMANTIC_MAX_SEQ_LENGTH)
+                elif name == "sentence-transformers":
+                    _backend = SentenceTransformerBackend(SEMANTIC_THREADS)
+                else:
+                    raise ValueError(f"Unknown SEMANTIC_BACKEND: {name!r}")
+    return _backend
+
+
+def export_onnx(model_dir: str, quantize: bool = False):
+    """Exports the SentenceTransformer's transformer to ONNX (+ tokenizer.json), optionally int8-quantized."""
+    import torch
+
+    model = get_semantic_model()
+    transformer, tokenizer = model[0].auto_model, model.tokenizer
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer.save_pretrained(model_dir)            # writes tokenizer.json (fast tokenizer)
+
+    sample = tokenizer(["log in button"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    transformer.eval()
+    with torch.no_grad():
+        torch.onnx.export(transformer, tuple(sample[name] for name in names),
+                          os.path.join(model_dir, ONNX_MODEL_FILE), input_names=names,
+                          output_names=["last_hidden_state"], dynamic_axes=dynamic, opset_version=17)
+    logger.info(f"Exported {SEMANTIC_MODEL_NAME} to {os.path.join(model_dir, ONNX_MODEL_FILE)}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(os.path.join(model_dir, ONNX_MODEL_FILE), os.path.join(model_dir, ONNX_INT8_MODEL_FILE),
+                         weight_type=QuantType.QInt8)
+        logger.info(f"Quantized model written to {os.path.join(model_dir, ONNX_INT8_MODEL_FILE)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic-tier backends")
+    parser.add_argument("--export", metavar="DIR", help="Export the model to ONNX into DIR")
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8-quantized model")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.export:
+        export_onnx(args.export, args.quantize)
+    else:
+        print(f"SEMANTIC_BACKEND={SEMANTIC_BACKEND} → {resolve_backend_name()} (cache namespace {backend_namespace()})")
+
+
+if __name__ == "__main__":
+    main()
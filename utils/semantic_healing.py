@@ -1,70 +1,183 @@
 # utils/semantic_healing.py
-from bs4 import BeautifulSoup
 from playwright.sync_api import Page, Locator
-from sentence_transformers import util
+import logging
+import threading
 import time
 import numpy as np
-from config import SEMANTIC_MODEL, SEMANTIC_THRESHOLD
+from config import ELEMENT_MAPPING, SEMANTIC_THRESHOLD, CANDIDATE_INDEX_ENABLED, CANDIDATE_INDEX_TOP_K
+from utils.embedding_cache import EMBEDDING_CACHE
+from utils.semantic_backends import cosine_scores
+from utils.dom_candidates import extract_candidates, candidate_text
+from utils.candidate_index import CandidateIndex, index_for
+from utils.telemetry import TELEMETRY
+
+logger = logging.getLogger(__name__)
+
+_targets_pinned = False
+
+
+def warm_up_semantic_tier():
+    """
+    Loads the model and encodes the ELEMENT_MAPPING descriptions once.
+    Idempotent; called on the first semantic heal or from the warm-up thread.
+    """
+    global _targets_pinned
+    if not _targets_pinned:
+        EMBEDDING_CACHE.pin(desc for desc, _ in ELEMENT_MAPPING.values())
+        _targets_pinned = True
+
+
+def start_warm_up_thread() -> threading.Thread:
+    """Runs warm_up_semantic_tier() in a daemon thread so it overlaps browser startup."""
+    def _run():
+        start = time.perf_counter()
+        try:
+            warm_up_semantic_tier()
+            logger.info(f"Semantic tier warmed up in {(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            logger.warning(f"Semantic warm-up failed: {e}")
+
+    thread = threading.Thread(target=_run, name="semantic-warm-up", daemon=True)
+    thread.start()
+    return thread
 
 def try_semantic_fallback(page: Page, semantic_desc: str) -> Locator | None:
     """
     Scans interactive elements semantically and returns a locator to the best match.
     Returns None if no good match is found.
     """
-    candidates = []
+    match = find_semantic_match(page, semantic_desc)
+    if match is None:
+        return None
+    return page.locator(match['selector']).first
+
+
+def find_semantic_match(page: Page, semantic_desc: str) -> dict | None:
+    """
+    Same scan as try_semantic_fallback, but returns the raw match
+    {'selector': ..., 'score': ..., 'text': ..., 'box': ...} so callers can cache it.
+    Returns None if no good match is found.
+    """
+    return find_semantic_matches(page, [semantic_desc])[0]
+
+
+def find_semantic_matches(page: Page, semantic_descs: list[str]) -> list[dict | None]:
+    """
+    Batch version of find_semantic_match: one candidate extraction, one encode of the
+    candidates and a (candidates × targets) similarity matrix for all descriptions.
+    Returns one match (or None) per description, in order.
+    """
+    if not semantic_descs:
+        return []
+    if CANDIDATE_INDEX_ENABLED:
+        try:
+            index = index_for(page)
+            TELEMETRY.annotate(index_changes=index.sync(page))
+            ranked = rank_indexed(index, semantic_descs)
+            matches = report_matches(semantic_descs, index.pick(ranked, index.resolve(page, ranked)))
+            hidden = hidden_top_k(ranked, matches)
+            if not hidden:
+                return matches
+            # Strong candidates exist but none of the top-k is visible: a visible one may rank lower
+            fallback = _extracted_matches(page, [semantic_descs[t] for t in hidden])
+            for t, match in zip(hidden, fallback):
+                matches[t] = match
+            return matches
+        except Exception as e:
+            logger.warning(f"Candidate index unavailable ({e}) → full extraction")
+    return _extracted_matches(page, semantic_descs)
+
+
+def _extracted_matches(page: Page, semantic_descs: list[str]) -> list[dict | None]:
+    """find_semantic_matches without the candidate index: a full extraction of the visible candidates."""
     try:
-        html = page.content()
-        soup = BeautifulSoup(html, 'html.parser')
-
-        candidate_tags = ['button', 'a', 'div[role="button"]', 'input[type="submit"]', 'input[type="button"]']
-        candidates = []
-        elements_info = []
-
-        for tag in candidate_tags:
-            for elem in soup.select(tag):
-                text = elem.get_text(strip=True)
-                if not text:
-                    continue
-                attrs = ' '.join([f"{k}={v}" for k, v in elem.attrs.items() if isinstance(v, str)])
-                combined = f"{text} {attrs}".strip()
-                if combined:
-                    candidates.append(combined)
-                    elements_info.append(elem)
+        records = extract_candidates(page, visible_only=True)
+    except Exception as e:
+        logger.warning(f"Semantic fallback error: {e}")
+        return [None] * len(semantic_descs)
+    return rank_candidates(records, semantic_descs)
 
+
+def rank_candidates(records: list[dict], semantic_descs: list[str],
+                    threshold: float = SEMANTIC_THRESHOLD) -> list[dict | None]:
+    """
+    Scores extracted candidate records against each description (pure CPU, no browser).
+    Returns one match {'selector', 'score', 'text', 'box'} or None per description.
+    """
+    matches: list[dict | None] = [None] * len(semantic_descs)
+    try:
+        candidates = [candidate_text(record) for record in records]
+
+        TELEMETRY.annotate(candidates=len(candidates))
         if not candidates:
-            print("No candidate elements found for semantic search.")
-            return None
+            logger.info("No candidate elements found for semantic search.")
+            return matches
 
-        print(f"Found {len(candidates)} candidates. Computing semantic similarity...")
+        logger.info(f"Found {len(candidates)} candidates. Computing semantic similarity...")
 
-        start_cpu = time.perf_counter()
-        target_embedding = SEMANTIC_MODEL.encode(semantic_desc, convert_to_tensor=True)
-        cand_embeddings = SEMANTIC_MODEL.encode(candidates, convert_to_tensor=True)
-        similarities = util.cos_sim(target_embedding, cand_embeddings)[0]
+        start = time.perf_counter()
+        warm_up_semantic_tier()
+        # Embeddings are normalized → cosine similarity is a plain dot product
+        target_embeddings = EMBEDDING_CACHE.encode(list(semantic_descs))
+        cand_embeddings = EMBEDDING_CACHE.encode(candidates)
+        similarities = cosine_scores(cand_embeddings, target_embeddings)   # (candidates, targets)
 
-        best_idx = similarities.argmax().item()
-        best_score = similarities[best_idx].item()
+        best_indices = similarities.argmax(axis=0)
+        TELEMETRY.annotate(scoring_ms=round((time.perf_counter() - start) * 1000, 3),
+                           best_score=round(float(similarities.max()), 4))
 
-        if best_score < SEMANTIC_THRESHOLD:
-            print(f"Best semantic score {best_score:.3f} < threshold {SEMANTIC_THRESHOLD}")
-            return None
+        for t, semantic_desc in enumerate(semantic_descs):
+            best_idx = int(best_indices[t])
+            best_score = float(similarities[best_idx, t])
 
-        best_elem = elements_info[best_idx]
-        text = best_elem.get_text(strip=True)
+            if best_score < threshold:
+                logger.info(f"'{semantic_desc}': best semantic score {best_score:.3f} < threshold {threshold}")
+                continue
 
-        if best_elem.get('id'):
-            selector = f"#{best_elem['id']}"
-        elif text:
-            selector = f"text={text}"
-        else:
-            selector = f"//*[contains(text(), '{text[:30]}')]"
+            best = records[best_idx]
+            text = best['text']
+            selector = best['selector']           # unique in the current document
 
-        cpu_latency = (time.perf_counter() - start_cpu) * 1000
-        print("CPU Latency is ", cpu_latency)
+            logger.info(f"→ Semantic match! Score: {best_score:.3f} | Text: '{text[:60]}' | Selector: {selector}")
+            matches[t] = {'selector': selector, 'score': best_score, 'text': text, 'box': best['box']}
 
-        print(f"→ Semantic match! Score: {best_score:.3f} | Text: '{text[:60]}' | Selector: {selector}")
-        return page.locator(selector).first
+        return matches
 
     except Exception as e:
-        print(f"Semantic fallback error: {e}")
-        return None
\ No newline at end of file
+        logger.warning(f"Semantic fallback error: {e}")
+        return matches
+
+
+def rank_indexed(index: CandidateIndex, semantic_descs: list[str]) -> list[list[tuple[int, float]]]:
+    """
+    Scores the candidates of a synced CandidateIndex against each description (pure CPU).
+    Only candidates added or changed since the last heal on the page are encoded.
+    Returns, per description, the best (id, score) pairs above SEMANTIC_THRESHOLD.
+    """
+    start = time.perf_counter()
+    warm_up_semantic_tier()
+    target_embeddings = EMBEDDING_CACHE.encode(list(semantic_descs))
+    ranked = index.rank(target_embeddings, SEMANTIC_THRESHOLD, CANDIDATE_INDEX_TOP_K)
+    TELEMETRY.annotate(candidates=len(index), scoring_ms=round((time.perf_counter() - start) * 1000, 3),
+                       best_score=round(max((r[0][1] for r in ranked if r), default=0.0), 4))
+    return ranked
+
+
+def hidden_top_k(ranked: list[list[tuple[int, float]]], matches: list[dict | None]) -> list[int]:
+    """Descriptions with candidates above threshold of which none (of the top-k) is visible."""
+    hidden = [t for t, (candidates, match) in enumerate(zip(ranked, matches)) if candidates and match is None]
+    if hidden:
+        logger.info(f"No visible candidate among the top {CANDIDATE_INDEX_TOP_K} for {len(hidden)} "
+                    f"description(s) → full extraction")
+    return hidden
+
+
+def report_matches(semantic_descs: list[str], matches: list[dict | None]) -> list[dict | None]:
+    """Logs the outcome of an indexed heal per description and returns `matches` unchanged."""
+    for semantic_desc, match in zip(semantic_descs, matches):
+        if match is None:
+            logger.info(f"'{semantic_desc}': no visible candidate scores above threshold {SEMANTIC_THRESHOLD}")
+        else:
+            logger.info(f"→ Semantic match! Score: {match['score']:.3f} | Text: '{match['text'][:60]}' "
+                        f"| Selector: {match['selector']}")
+    return matches
@@ -0,0 +1,149 @@
+# utils/spatial_prior.py
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from config import (SPATIAL_PRIOR_ENABLED, SPATIAL_PRIOR_PATH, SPATIAL_PRIOR_SAMPLES, SPATIAL_PRIOR_WINDOWS,
+                    SPATIAL_PRIOR_PRIMARY_REFRESH_S, SCALES)
+
+logger = logging.getLogger(__name__)
+
+
+class SpatialPrior:
+    """
+    Per-selector history of where each element was found (primary locator, semantic or
+    visual heal), as [center_x, center_y, width, height] in viewport coordinates, keyed by
+    viewport size. The visual tier uses it to search small windows around the expected
+    position before the full frame.
+    Kept in memory and written once at interpreter exit (merged with the file on disk).
+    """
+
+    def __init__(self, path: str, max_samples: int = 10, enabled: bool = True):
+        self.path = path
+        self.max_samples = max_samples
+        self.enabled = enabled
+        self._data: dict | None = None
+        self._dirty: set[str] = set()
+        self._primary_sampled: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _read_disk(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self) -> dict:
+        if self._data is None:
+            self._data = self._read_disk()
+        return self._data
+
+    @staticmethod
+    def _viewport_key(viewport: tuple[int, int] | dict | None) -> str:
+        if isinstance(viewport, dict):
+            viewport = (viewport["width"], viewport["height"])
+        return f"{int(viewport[0])}x{int(viewport[1])}" if viewport else "unknown"
+
+    def record(self, selector: str, box: dict | None, viewport: tuple[int, int] | dict | None):
+        """box: {x, y, width, height} in viewport coordinates; viewport: (width, height) or Playwright's dict."""
+        if not self.enabled or not box or box["width"] <= 0 or box["height"] <= 0:
+            return
+        sample = [round(box["x"] + box["width"] / 2, 1), round(box["y"] + box["height"] / 2, 1),
+                  round(box["width"], 1), round(box["height"], 1)]
+        with self._lock:
+            samples = self._load().setdefault(selector, {}).setdefault(self._viewport_key(viewport), [])
+            samples.append(sample)
+            del samples[:-self.max_samples]
+            self._dirty.add(selector)
+
+    def wants_primary_sample(self, selector: str) -> bool:
+        """
+        Primary successes are sampled at most once per SPATIAL_PRIOR_PRIMARY_REFRESH_S per selector,
+        so the hot path pays for a bounding_box call only now and then.
+        """
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._primary_sampled.get(selector)
+            if last is not None and now - last < SPATIAL_PRIOR_PRIMARY_REFRESH_S:
+                return False
+            self._primary_sampled[selector] = now
+        return True
+
+    def record_primary(self, selector: str, locator, viewport: dict | None):
+        """Records a primary success from its (sync) locator, when sampled in."""
+        if self.wants_primary_sample(selector):
+            try:
+                self.record(selector, locator.first.bounding_box(timeout=1000), viewport)
+            except Exception as e:
+                logger.debug(f"Spatial prior sample skipped: {e}")
+
+    async def record_primary_async(self, selector: str, locator, viewport: dict | None):
+        """Async-API counterpart of record_primary."""
+        if self.wants_primary_sample(selector):
+            try:
+                self.record(selector, await locator.first.bounding_box(timeout=1000), viewport)
+            except Exception as e:
+                logger.debug(f"Spatial prior sample skipped: {e}")
+
+    def windows(self, selector: str, viewport: tuple[int, int], template_shape: tuple[int, int]) -> list[tuple]:
+        """
+        Search windows (x0, y0, x1, y1) in viewport pixels, smallest first, one per factor in
+        SPATIAL_PRIOR_WINDOWS. Each is the factor × the element size around the median center,
+        widened by how far past centers strayed, and never smaller than the largest scaled template.
+        Empty when there is no history for this selector at this viewport size.
+        """
+        if not self.enabled:
+            return []
+        with self._lock:
+            samples = self._load().get(selector, {}).get(self._viewport_key(viewport))
+            samples = np.array(samples, dtype=np.float32) if samples else None
+        if samples is None:
+            return []
+        cx, cy, width, height = np.median(samples, axis=0)
+        spread_x = float(np.abs(samples[:, 0] - cx).max())
+        spread_y = float(np.abs(samples[:, 1] - cy).max())
+        min_w, min_h = template_shape[1] * max(SCALES), template_shape[0] * max(SCALES)
+        view_w, view_h = viewport
+
+        windows = []
+        for factor in SPATIAL_PRIOR_WINDOWS:
+            half_w = max(factor * max(width, min_w), min_w + 2) / 2 + spread_x
+            half_h = max(factor * max(height, min_h), min_h + 2) / 2 + spread_y
+            window = (max(0, int(cx - half_w)), max(0, int(cy - half_h)),
+                      min(view_w, int(np.ceil(cx + half_w))), min(view_h, int(np.ceil(cy + half_h))))
+            if window[2] - window[0] >= view_w and window[3] - window[1] >= view_h:
+                break                                   # as large as the frame: the full pass covers it
+            if not windows or window != windows[-1]:
+                windows.append(window)
+        return windows
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._read_disk()
+            for selector in self._dirty:
+                merged[selector] = self._data[selector]
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(merged, f)
+                os.replace(tmp_path, self.path)
+                self._dirty.clear()
+            except OSError as e:
+                logger.warning(f"Spatial prior write failed: {e}")
+
+
+SPATIAL_PRIOR = SpatialPrior(SPATIAL_PRIOR_PATH, SPATIAL_PRIOR_SAMPLES, SPATIAL_PRIOR_ENABLED)
+atexit.register(SPATIAL_PRIOR.flush)
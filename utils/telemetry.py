@@ -0,0 +1,324 @@
+# utils/telemetry.py
+"""
+Low-overhead tracing and metrics for the healing pipeline.
+
+Every heal becomes a trace with one span per tier tried (primary, heal_cache, lpu, semantic,
+visual). Tiers attach attributes to their span (candidate counts, best scores, scales tried,
+cache hits) via `annotate()`, which finds the current span through a context variable, so
+the tier code does not have to pass it around.
+
+Finished traces are kept in a bounded buffer and aggregated per tier. They can be exported
+as JSON lines (`export_jsonl`) or OpenMetrics text (`openmetrics`), and `summary()` renders
+the per-tier table printed at the end of a pytest session. Under pytest-xdist each worker
+ships `aggregates()` to the controller, which `merge()`s them before reporting.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import deque
+
+from config import TELEMETRY_ENABLED, TELEMETRY_MAX_TRACES
+
+# Upper bounds (seconds) of the OpenMetrics duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_PERCENTILE_SAMPLES = 2048
+
+_current_trace: contextvars.ContextVar["HealTrace | None"] = contextvars.ContextVar("heal_trace", default=None)
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("heal_span", default=None)
+
+
+class Span:
+    """One tier attempt. outcome: 'found', 'miss' (default), 'error' or 'cancelled'."""
+
+    __slots__ = ("name", "start", "duration_ms", "outcome", "attrs")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.outcome = "miss"
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def found(self, **attrs):
+        self.outcome = "found"
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "duration_ms": round(self.duration_ms, 3), "outcome": self.outcome, **self.attrs}
+
+
+class _NullSpan:
+    """Returned when telemetry is off or no heal is being traced; every call is a no-op."""
+
+    __slots__ = ()
+    outcome = "miss"
+
+    def set(self, **attrs):
+        pass
+
+    def found(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class HealTrace:
+    __slots__ = ("selector", "timestamp", "start", "duration_ms", "tier", "spans")
+
+    def __init__(self, selector: str):
+        self.selector = selector
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.tier: str | None = None          # tier that produced the result, None = not healed
+        self.spans: list[Span] = []
+
+    def to_dict(self) -> dict:
+        return {"selector": self.selector, "timestamp": round(self.timestamp, 3),
+                "duration_ms": round(self.duration_ms, 3), "tier": self.tier,
+                "spans": [span.to_dict() for span in self.spans]}
+
+
+class _TierStats:
+    __slots__ = ("outcomes", "total_ms", "buckets", "samples")
+
+    def __init__(self):
+        self.outcomes = {"found": 0, "miss": 0, "error": 0, "cancelled": 0}
+        self.total_ms = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.samples: deque[float] = deque(maxlen=_PERCENTILE_SAMPLES)
+
+    def add(self, span: Span):
+        self.outcomes[span.outcome] = self.outcomes.get(span.outcome, 0) + 1
+        self.total_ms += span.duration_ms
+        seconds = span.duration_ms / 1000
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        self.samples.append(span.duration_ms)
+
+    def to_dict(self) -> dict:
+        return {"outcomes": dict(self.outcomes), "total_ms": self.total_ms, "buckets": list(self.buckets),
+                "samples": list(self.samples)}
+
+    def merge(self, data: dict):
+        for outcome, value in data["outcomes"].items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + value
+        self.total_ms += data["total_ms"]
+        self.buckets = [a + b for a, b in zip(self.buckets, data["buckets"])]
+        self.samples.extend(data["samples"])
+
+    @property
+    def count(self) -> int:
+        return sum(self.outcomes.values())
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class Telemetry:
+    def __init__(self, enabled: bool = True, max_traces: int = 10000):
+        self.enabled = enabled
+        self.traces: deque[HealTrace] = deque(maxlen=max_traces)
+        self._merged_traces: deque[dict] = deque(maxlen=max_traces)     # from xdist workers, see merge()
+        self._tiers: dict[str, _TierStats] = {}
+        self._resolved: dict[str, int] = {}
+        self._counters: dict[str, int] = {}
+        self._heal_ms = 0.0
+        self._lock = threading.Lock()
+
+    # --- recording ---
+
+    @contextlib.contextmanager
+    def heal(self, selector: str):
+        """Traces one heal. Yields the HealTrace (or None when disabled); set `.tier` on success."""
+        if not self.enabled:
+            yield None
+            return
+        trace = HealTrace(selector)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.duration_ms = (time.perf_counter() - trace.start) * 1000
+            with self._lock:
+                self.traces.append(trace)
+                self._heal_ms += trace.duration_ms
+                key = trace.tier or "unresolved"
+                self._resolved[key] = self._resolved.get(key, 0) + 1
+
+    def traced(self, func):
+        """Decorator for heal entry points: traces the call and takes the tier from the result dict."""
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(page, primary_selector, *args, **kwargs):
+                with self.heal(primary_selector) as trace:
+                    result = await func(page, primary_selector, *args, **kwargs)
+                    if trace is not None and result:
+                        trace.tier = result.get("tier")
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(page, primary_selector, *args, **kwargs):
+            with self.heal(primary_selector) as trace:
+                result = func(page, primary_selector, *args, **kwargs)
+                if trace is not None and result:
+                    trace.tier = result.get("tier")
+                return result
+        return wrapper
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs):
+        """
+        Times one tier attempt inside the current heal. Yields the Span; call `.found()` when
+        the tier produced a result. Exceptions mark the span as 'error' and propagate.
+        Outside a traced heal (or when disabled) yields a no-op span.
+        """
+        trace = _current_trace.get() if self.enabled else None
+        if trace is None:
+            yield NULL_SPAN
+            return
+        span = Span(name, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.outcome = "cancelled"          # async engine: another tier won the race
+            raise
+        except BaseException:
+            span.outcome = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration_ms = (time.perf_counter() - span.start) * 1000
+            trace.spans.append(span)
+            with self._lock:
+                self._tiers.setdefault(name, _TierStats()).add(span)
+
+    def annotate(self, **attrs):
+        """Adds attributes to the current span, if any (cheap no-op otherwise)."""
+        span = _current_span.get()
+        if span is not None:
+            span.attrs.update(attrs)
+
+    def count(self, name: str, n: int = 1):
+        """Increments a named event counter (e.g. heal_cache_hit)."""
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    @property
+    def heals(self) -> int:
+        """Heals traced in this process plus those merged from workers."""
+        with self._lock:
+            return sum(self._resolved.values())
+
+    def reset(self):
+        with self._lock:
+            self.traces.clear()
+            self._merged_traces.clear()
+            self._tiers.clear()
+            self._resolved.clear()
+            self._counters.clear()
+            self._heal_ms = 0.0
+
+    # --- export ---
+
+    def aggregates(self) -> dict:
+        """Per-tier stats, counters and buffered traces as plain data, for merge() in another process."""
+        with self._lock:
+            return {"tiers": {name: stats.to_dict() for name, stats in self._tiers.items()},
+                    "resolved": dict(self._resolved), "counters": dict(self._counters), "heal_ms": self._heal_ms,
+                    "traces": [json.loads(json.dumps(trace.to_dict(), default=str)) for trace in self.traces]
+                              + list(self._merged_traces)}
+
+    def merge(self, aggregates: dict):
+        """Adds another process's aggregates() (e.g. an xdist worker's) to this one."""
+        with self._lock:
+            for name, data in aggregates["tiers"].items():
+                self._tiers.setdefault(name, _TierStats()).merge(data)
+            for tier, value in aggregates["resolved"].items():
+                self._resolved[tier] = self._resolved.get(tier, 0) + value
+            for event, value in aggregates["counters"].items():
+                self._counters[event] = self._counters.get(event, 0) + value
+            self._heal_ms += aggregates["heal_ms"]
+            self._merged_traces.extend(aggregates["traces"])
+
+    def export_jsonl(self, path: str, append: bool = True) -> int:
+        """Writes every buffered trace (local and merged) as one JSON object per line. Returns the number written."""
+        with self._lock:
+            traces = [trace.to_dict() for trace in self.traces] + list(self._merged_traces)
+        with open(path, "a" if append else "w", encoding="utf-8") as f:
+            for trace in traces:
+                f.write(json.dumps(trace, default=str) + "\n")
+        return len(traces)
+
+    def openmetrics(self) -> str:
+        """Aggregated tier metrics in OpenMetrics text format."""
+        with self._lock:
+            tiers = {name: stats for name, stats in self._tiers.items()}
+            lines = [
+                "# TYPE heal_tier_duration_seconds histogram",
+                "# UNIT heal_tier_duration_seconds seconds",
+                "# HELP heal_tier_duration_seconds Time spent in each healing tier.",
+            ]
+            for name, stats in sorted(tiers.items()):
+                for bound, cumulative in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(f'heal_tier_duration_seconds_bucket{{tier="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'heal_tier_duration_seconds_bucket{{tier="{name}",le="+Inf"}} {stats.count}')
+                lines.append(f'heal_tier_duration_seconds_count{{tier="{name}"}} {stats.count}')
+                lines.append(f'heal_tier_duration_seconds_sum{{tier="{name}"}} {stats.total_ms / 1000:.6f}')
+
+            lines += ["# TYPE heal_tier_attempts counter",
+                      "# HELP heal_tier_attempts Tier attempts by outcome."]
+            for name, stats in sorted(tiers.items()):
+                for outcome, value in sorted(stats.outcomes.items()):
+                    lines.append(f'heal_tier_attempts_total{{tier="{name}",outcome="{outcome}"}} {value}')
+
+            lines += ["# TYPE heals counter",
+                      "# HELP heals Heals by the tier that resolved them."]
+            for tier, value in sorted(self._resolved.items()):
+                lines.append(f'heals_total{{tier="{tier}"}} {value}')
+
+            lines += ["# TYPE heal_events counter",
+                      "# HELP heal_events Cache hits and other pipeline events."]
+            for event, value in sorted(self._counters.items()):
+                lines.append(f'heal_events_total{{event="{event}"}} {value}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Per-tier table: attempts, found, p50/p95 and share of the total heal time."""
+        with self._lock:
+            heals = sum(self._resolved.values())
+            if not heals:
+                return "No heals traced."
+            lines = [f"{heals} heals, {self._heal_ms:.0f} ms total | resolved by: "
+                     + ", ".join(f"{tier} {n}" for tier, n in sorted(self._resolved.items(), key=lambda kv: -kv[1])),
+                     f"{'tier':<12}{'attempts':>9}{'found':>7}{'errors':>7}{'p50 ms':>10}{'p95 ms':>10}"
+                     f"{'total ms':>11}{'share':>7}"]
+            for name, stats in sorted(self._tiers.items(), key=lambda kv: -kv[1].total_ms):
+                share = stats.total_ms / self._heal_ms if self._heal_ms else 0.0
+                lines.append(f"{name:<12}{stats.count:>9}{stats.outcomes['found']:>7}{stats.outcomes['error']:>7}"
+                             f"{stats.percentile(50):>10.1f}{stats.percentile(95):>10.1f}"
+                             f"{stats.total_ms:>11.0f}{share:>7.0%}")
+            if self._counters:
+                lines.append("events: " + ", ".join(f"{k}={v}" for k, v in sorted(self._counters.items())))
+        return "\n".join(lines)
+
+
+TELEMETRY = Telemetry(TELEMETRY_ENABLED, TELEMETRY_MAX_TRACES)
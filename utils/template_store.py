@@ -0,0 +1,179 @@
+# utils/template_store.py
+import logging
+import os
+import threading
+
+import cv2
+import numpy as np
+from config import SCALES
+from utils.artifacts import ARTIFACT_WRITER
+from utils.locator_registry import LOCATOR_REGISTRY, TEMPLATE_PREFIX, LocatorRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class _Template:
+    __slots__ = ("gray", "mtime", "pending", "variants")
+
+    def __init__(self, gray: np.ndarray, mtime: int | None, pending: bool = False):
+        self.gray = gray
+        self.mtime = mtime              # st_mtime_ns of the file this was decoded from
+        self.pending = pending          # captured in memory, file write still queued
+        self.variants: dict = {}        # (width, height, interpolation) → resized template
+
+
+class TemplateStore:
+    """
+    Process-wide cache of grayscale templates.
+
+    - Each PNG is decoded once; the entry is re-read only when the file's mtime changes.
+    - Resized variants for every entry in SCALES are built at load time; other sizes
+      (e.g. coarse pyramid levels) are memoized on first use.
+    - Auto-captured templates are usable immediately; the PNG is written by the background
+      artifact writer (utils/artifacts.py).
+    - "registry:<entry>" paths are served from the compiled locator registry
+      (utils/locator_registry.py): the template and its scaled variants are views into the
+      mapped bundle, nothing is decoded or resized.
+    """
+
+    def __init__(self, scales: list[float], registry: LocatorRegistry = LOCATOR_REGISTRY):
+        self.scales = scales
+        self.registry = registry
+        self._entries: dict[str, _Template] = {}
+        self._known_files: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _build_variants(self, entry: _Template):
+        t_h, t_w = entry.gray.shape
+        for scale in self.scales:
+            w, h = int(t_w * scale), int(t_h * scale)
+            if w >= 1 and h >= 1:
+                entry.variants[(w, h, cv2.INTER_LINEAR)] = cv2.resize(entry.gray, (w, h))
+
+    def has(self, path: str) -> bool:
+        """True if a template exists in memory or on disk. No image decoding."""
+        if path in self._entries or path in self._known_files:
+            return True
+        if path.startswith(TEMPLATE_PREFIX):
+            return self._registry_entry(path) is not None
+        if os.path.exists(path):
+            self._known_files.add(path)
+            return True
+        return False
+
+    def _registry_entry(self, path: str) -> _Template | None:
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None:
+            return entry
+        try:
+            images = self.registry.templates(int(path[len(TEMPLATE_PREFIX):]))
+        except (ValueError, IndexError, TypeError):
+            images = []
+        if not images:
+            logger.warning(f"Template not in the locator registry: {path}")
+            return None
+        entry = _Template(images[0][1], None)
+        for _, image in images:
+            entry.variants[(image.shape[1], image.shape[0], cv2.INTER_LINEAR)] = image
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def _entry(self, path: str) -> _Template | None:
+        if path.startswith(TEMPLATE_PREFIX):
+            return self._registry_entry(path)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and (entry.pending or entry.mtime == mtime):
+                return entry
+
+        if mtime is None:
+            with self._lock:
+                self._entries.pop(path, None)
+                self._known_files.discard(path)
+            return None
+
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            logger.warning(f"Template file exists but is invalid: {path}")
+            return None
+        entry = _Template(gray, mtime)
+        self._build_variants(entry)
+        with self._lock:
+            self._entries[path] = entry
+            self._known_files.add(path)
+        logger.debug(f"Loaded template: {os.path.basename(path)} (shape: {gray.shape})")
+        return entry
+
+    def get(self, path: str) -> np.ndarray | None:
+        """Grayscale template for `path`, decoded at most once per file version."""
+        entry = self._entry(path)
+        return entry.gray if entry is not None else None
+
+    def variants(self, path: str) -> dict:
+        """Memo of resized versions of the template at `path` (see visual_healing.match_template)."""
+        entry = self._entry(path)
+        return entry.variants if entry is not None else {}
+
+    def put_captured(self, path: str, image_bytes: bytes) -> np.ndarray | None:
+        """Decodes a freshly captured screenshot, makes it available at once and persists it in the background."""
+        gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
+        entry = _Template(gray, None, pending=True)
+        self._build_variants(entry)
+        with self._lock:
+            self._entries[path] = entry
+        ARTIFACT_WRITER.submit(self._write, path, entry, required=True)
+        return gray
+
+    def capture_async(self, path: str, image_bytes: bytes):
+        """Like put_captured, but the decode happens off the caller's thread as well."""
+        with self._lock:
+            self._known_files.add(path)        # a capture is underway: do not start another one
+        ARTIFACT_WRITER.submit(self._decode_and_write, path, image_bytes, required=True)
+
+    def _decode_and_write(self, path: str, image_bytes: bytes):
+        gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            logger.warning(f"Auto-capture decode failed: {os.path.basename(path)}")
+            with self._lock:
+                self._known_files.discard(path)
+            return
+        entry = _Template(gray, None, pending=True)
+        self._build_variants(entry)
+        with self._lock:
+            self._entries[path] = entry
+        self._write(path, entry)
+
+    def _write(self, path: str, entry: _Template):
+        try:
+            ARTIFACT_WRITER.write_image(path, entry.gray)
+            mtime = os.stat(path).st_mtime_ns
+        except Exception as e:
+            logger.warning(f"Template write failed: {e}")
+            return
+        with self._lock:
+            entry.mtime = mtime
+            entry.pending = False
+            self._known_files.add(path)
+        logger.info(f"Template auto-captured and saved: {os.path.basename(path)} (shape: {entry.gray.shape})")
+
+    def preload(self, paths) -> int:
+        """Decodes the templates at `paths` that exist (and their scaled variants) ahead of the first heal."""
+        loaded = sum(1 for path in dict.fromkeys(paths) if self._entry(path) is not None)
+        logger.debug(f"Preloaded {loaded} templates")
+        return loaded
+
+    def flush(self):
+        """Blocks until queued template writes are on disk."""
+        ARTIFACT_WRITER.flush()
+
+
+TEMPLATE_STORE = TemplateStore(SCALES)
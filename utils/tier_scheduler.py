@@ -0,0 +1,182 @@
+# utils/tier_scheduler.py
+"""
+Cost-aware ordering of the healing tiers, learned from healing history.
+
+For every (page, selector), each tier keeps decayed counts of attempts and successes, the
+running mean of its latency and of the confidence of its hits. A heal then tries its
+tiers in ascending expected cost to success (mean latency / success probability), the
+order that minimizes the expected time of a sequential search.
+
+Tiers that predictably fail (at least TIER_DEMOTE_MIN_SAMPLES attempts, success rate below
+TIER_DEMOTE_SUCCESS_RATE) are skipped. They run only as a last resort, after every other tier
+has missed. So skipping never turns a heal into a failure, and the stats can recover when
+the page changes. Unseen (page, selector) pairs fall back to each tier's stats across all
+pages ("*"), then to TIER_DEFAULT_COST_MS.
+
+Stored in TIER_STATS_PATH, written at interpreter exit (merged with the file on disk).
+Inspect with:
+
+    python -m utils.tier_scheduler [--selector SUBSTRING] [--json]
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from config import (TIER_SCHEDULER_ENABLED, TIER_STATS_PATH, TIER_STATS_DECAY, TIER_DEMOTE_MIN_SAMPLES,
+                    TIER_DEMOTE_SUCCESS_RATE, TIER_DEFAULT_COST_MS)
+from utils.heal_cache import url_pattern
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = "*"
+
+
+class TierScheduler:
+    def __init__(self, path: str, enabled: bool = True, decay: float = 0.9, min_samples: int = 5,
+                 demote_rate: float = 0.1, default_cost_ms: dict[str, float] | None = None):
+        self.path = path
+        self.enabled = enabled
+        self.decay = decay
+        self.min_samples = min_samples
+        self.demote_rate = demote_rate
+        self.default_cost_ms = default_cost_ms or {}
+        self._data: dict | None = None
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _read_disk(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self) -> dict:
+        if self._data is None:
+            self._data = self._read_disk()
+        return self._data
+
+    @staticmethod
+    def key(url: str, selector: str) -> str:
+        return f"{url_pattern(url)} {selector}"
+
+    def _update(self, key: str, tier: str, found: bool, duration_ms: float, score: float | None):
+        stats = self._load().setdefault(key, {}).setdefault(
+            tier, {"attempts": 0.0, "successes": 0.0, "samples": 0, "cost_ms": 0.0, "confidence": None})
+        stats["attempts"] = stats["attempts"] * self.decay + 1
+        stats["successes"] = stats["successes"] * self.decay + (1 if found else 0)
+        stats["samples"] += 1
+        # Running mean that weights recent attempts like the counts do
+        weight = 1 / stats["attempts"]
+        stats["cost_ms"] = round(stats["cost_ms"] + (duration_ms - stats["cost_ms"]) * weight, 2)
+        if found and score is not None:
+            previous = stats["confidence"]
+            stats["confidence"] = round(score if previous is None else previous + (score - previous) * weight, 4)
+        stats["updated"] = round(time.time())
+        self._dirty.add(key)
+
+    def record(self, url: str, selector: str, tier: str, found: bool, duration_ms: float,
+               score: float | None = None):
+        """One tier attempt for `selector` on the page at `url` (cancelled attempts are not recorded)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._update(self.key(url, selector), tier, found, duration_ms, score)
+            self._update(GLOBAL_KEY, tier, found, duration_ms, score)
+
+    def _estimate(self, entry: dict, tier: str) -> tuple[float, float, bool]:
+        """(success probability, cost in ms, demoted) of `tier` from one key's stats."""
+        fallback = self._load().get(GLOBAL_KEY, {}).get(tier)
+        prior_rate = fallback["successes"] / fallback["attempts"] if fallback and fallback["attempts"] else 0.5
+        prior_cost = fallback["cost_ms"] if fallback and fallback["samples"] else self.default_cost_ms.get(tier, 1000.0)
+        stats = entry.get(tier)
+        if not stats or not stats["samples"]:
+            return prior_rate, prior_cost, False
+        rate = stats["successes"] / stats["attempts"]
+        demoted = stats["samples"] >= self.min_samples and rate < self.demote_rate
+        # One pseudo-attempt at the cross-page rate keeps a single miss from zeroing the estimate
+        probability = (stats["successes"] + prior_rate) / (stats["attempts"] + 1)
+        return probability, stats["cost_ms"], demoted
+
+    def order(self, url: str, selector: str, tiers: list[str]) -> tuple[list[str], list[str]]:
+        """
+        Splits `tiers` (in their default order) into (scheduled, last_resort): scheduled tiers
+        sorted by expected cost to success, then the ones that predictably fail.
+        Disabled → (tiers, []).
+        """
+        if not self.enabled:
+            return list(tiers), []
+        with self._lock:
+            entry = self._load().get(self.key(url, selector), {})
+            estimates = {tier: self._estimate(entry, tier) for tier in tiers}
+        scheduled = [tier for tier in tiers if not estimates[tier][2]]
+        last_resort = [tier for tier in tiers if estimates[tier][2]]
+        scheduled.sort(key=lambda tier: estimates[tier][1] / max(estimates[tier][0], 0.01))
+        if scheduled != list(tiers):
+            logger.info(f"Tier order for {selector}: {' → '.join(scheduled) or '-'}"
+                        f"{' (last resort: ' + ', '.join(last_resort) + ')' if last_resort else ''}")
+        return scheduled, last_resort
+
+    def rows(self, selector_filter: str = "") -> list[dict]:
+        """Inspectable view: one row per (key, tier) with rate, mean cost, confidence and status."""
+        with self._lock:
+            data = {key: {tier: dict(stats) for tier, stats in tiers.items()}
+                    for key, tiers in self._load().items() if selector_filter in key}
+        rows = []
+        for key, tiers in sorted(data.items()):
+            for tier, stats in tiers.items():
+                rate = stats["successes"] / stats["attempts"] if stats["attempts"] else 0.0
+                demoted = key != GLOBAL_KEY and stats["samples"] >= self.min_samples and rate < self.demote_rate
+                rows.append({"key": key, "tier": tier, "samples": stats["samples"], "success_rate": round(rate, 3),
+                             "cost_ms": stats["cost_ms"], "confidence": stats["confidence"],
+                             "status": "last resort" if demoted else "scheduled"})
+        return rows
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._read_disk()
+            for key in self._dirty:
+                merged[key] = self._data[key]
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(merged, f)
+                os.replace(tmp_path, self.path)
+                self._dirty.clear()
+            except OSError as e:
+                logger.warning(f"Tier stats write failed: {e}")
+
+
+TIER_SCHEDULER = TierScheduler(TIER_STATS_PATH, TIER_SCHEDULER_ENABLED, TIER_STATS_DECAY, TIER_DEMOTE_MIN_SAMPLES,
+                               TIER_DEMOTE_SUCCESS_RATE, TIER_DEFAULT_COST_MS)
+atexit.register(TIER_SCHEDULER.flush)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Learned per-page, per-selector tier statistics")
+    parser.add_argument("--selector", default="", help="Only keys containing this substring")
+    parser.add_argument("--json", action="store_true", help="Print the rows as JSON")
+    args = parser.parse_args()
+    rows = TIER_SCHEDULER.rows(args.selector)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'page / selector':<70} {'tier':<9} {'n':>5} {'success':>8} {'cost ms':>9} {'conf':>6}  status")
+    for row in rows:
+        confidence = "-" if row["confidence"] is None else f"{row['confidence']:.3f}"
+        print(f"{row['key'][:70]:<70} {row['tier']:<9} {row['samples']:>5} {row['success_rate']:>8.1%} "
+              f"{row['cost_ms']:>9.1f} {confidence:>6}  {row['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 # utils/visual_healing.py
+import logging
 import os
 from typing import Dict, Optional, Any
 import cv2
 import numpy as np
-from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
-from config import SCALES, VISUAL_THRESHOLD
-from datetime import datetime
+from playwright.sync_api import Page, Locator, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Page as AsyncPage
+from config import (SCALES, VISUAL_THRESHOLD, NMS_OVERLAP_THRESHOLD, VISUAL_TOP_K, VISUAL_PEAK_WINDOW,
+                    PYRAMID_DOWNSCALE, PYRAMID_MAX_LEVELS, PYRAMID_MIN_TEMPLATE_SIDE, PYRAMID_MIN_IMAGE_AREA,
+                    PYRAMID_TOP_PEAKS, PYRAMID_REFINE_MARGIN, PYRAMID_COARSE_SLACK)
+from utils.template_store import TEMPLATE_STORE
+from utils.telemetry import TELEMETRY
+from utils.artifacts import ARTIFACT_WRITER
+from utils.spatial_prior import SPATIAL_PRIOR
+from utils.screen_capture import capture_gray, region_rect
+
+logger = logging.getLogger(__name__)
 
 def get_or_capture_template(
         page: Page,
@@ -14,175 +24,440 @@ def get_or_capture_template(
 ) -> Optional[np.ndarray]:
     """
     Returns grayscale template:
-    - If file exists → load it
+    - If file exists → served from the in-memory TEMPLATE_STORE (decoded once per file version)
     - If missing → try to capture it dynamically using primary_selector
-    - Saves captured image for future use
+    - Saves captured image for future use (in the background)
     """
     # 1. Try to load existing template
-    if os.path.exists(template_path):
-        template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-        if template is not None:
-            print(f"Loaded existing template: {os.path.basename(template_path)} (shape: {template.shape})")
-            return template
-        print(f"Template file exists but is invalid: {template_path}")
+    template = TEMPLATE_STORE.get(template_path)
+    if template is not None:
+        return template
 
     # 2. Automatic capture only if file is missing AND element is visible
-    print(f"No template found → checking if primary locator is visible: {primary_selector}")
+    logger.info(f"No template found → checking if primary locator is visible: {primary_selector}")
     try:
         locator = page.locator(primary_selector)
         if locator.is_visible(timeout=5000):
-            print(f"Primary locator is visible → capturing template automatically")
+            logger.info(f"Primary locator is visible → capturing template automatically")
             png_bytes = locator.screenshot(type="png")
-            img_array = np.frombuffer(png_bytes, np.uint8)
-            template_bgr = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-            template_gray = cv2.cvtColor(template_bgr, cv2.COLOR_BGR2GRAY)
-
-            os.makedirs(os.path.dirname(template_path), exist_ok=True)
-            cv2.imwrite(template_path, template_gray)
-            print(f"Template auto-captured and saved: {os.path.basename(template_path)} (shape: {template_gray.shape})")
-            return template_gray
+            return TEMPLATE_STORE.put_captured(template_path, png_bytes)
         else:
-            print(f"Primary locator not visible → cannot auto-capture")
+            logger.warning(f"Primary locator not visible → cannot auto-capture")
             return None
 
 
     except PlaywrightTimeoutError:
-        print(f"Primary locator timeout/not visible → cannot capture")
+        logger.warning(f"Primary locator timeout/not visible → cannot capture")
         return None
     except Exception as e:
-        print(f"Auto-capture failed: {e}")
+        logger.warning(f"Auto-capture failed: {e}")
         return None
 
+
+async def capture_template_async(page: AsyncPage, primary_selector: str) -> bytes | None:
+    """
+    Async-API part of get_or_capture_template for a missing template: PNG of the primary
+    element if it is visible, else None. Decode it with TEMPLATE_STORE.put_captured.
+    """
+    logger.info(f"No template found → checking if primary locator is visible: {primary_selector}")
+    try:
+        locator = page.locator(primary_selector).first
+        if await locator.is_visible():
+            logger.info("Primary locator is visible → capturing template automatically")
+            return await locator.screenshot(type="png")
+        logger.warning("Primary locator not visible → cannot auto-capture")
+    except Exception as e:
+        logger.warning(f"Auto-capture failed: {e}")
+    return None
+
+
+def ensure_template_captured(locator: Locator, template_path: str):
+    """
+    Primary-path hook: if no template exists yet, screenshot the (visible) element and hand
+    decoding and saving to the background writer. Does no image I/O when the template exists.
+    """
+    if TEMPLATE_STORE.has(template_path):
+        return
+    try:
+        TEMPLATE_STORE.capture_async(template_path, locator.screenshot(type="png"))
+        logger.debug(f"Template capture queued: {os.path.basename(template_path)}")
+    except Exception as e:
+        logger.warning(f"Auto-capture failed: {e}")
+
+
 def non_max_suppression(boxes, scores, overlap_thresh=0.5):
-    """Simple greedy NMS"""
+    """
+    Greedy IoU-based NMS.
+    boxes: (N, 4) [x1, y1, x2, y2], scores: (N,). Returns picked indices, best score first.
+    Each iteration suppresses against all remaining boxes at once, so the cost is
+    (number of picks) vectorized passes rather than a Python loop over every box.
+    """
     if len(boxes) == 0:
         return []
 
-    boxes = np.array(boxes, dtype=np.float32)
-    scores = np.array(scores, dtype=np.float32)
+    boxes = np.asarray(boxes, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
 
-    indices = np.argsort(scores)[::-1]
+    indices = np.argsort(-scores, kind="stable")
     picked = []
 
     while len(indices) > 0:
         i = indices[0]
-        picked.append(i)
+        picked.append(int(i))
+        rest = indices[1:]
 
-        xx1 = np.maximum(boxes[i, 0], boxes[indices[1:], 0])
-        yy1 = np.maximum(boxes[i, 1], boxes[indices[1:], 1])
-        xx2 = np.minimum(boxes[i, 2], boxes[indices[1:], 2])
-        yy2 = np.minimum(boxes[i, 3], boxes[indices[1:], 3])
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
 
-        w = np.maximum(0, xx2 - xx1 + 1)
-        h = np.maximum(0, yy2 - yy1 + 1)
-        overlap = (w * h) / ((boxes[i, 2] - boxes[i, 0] + 1) * (boxes[i, 3] - boxes[i, 1] + 1))
+        inter = np.maximum(0, xx2 - xx1) * np.maximum(0, yy2 - yy1)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
 
-        indices = indices[1:][overlap <= overlap_thresh]
+        indices = rest[iou <= overlap_thresh]
 
     return picked
 
 
-def try_visual_fallback(page: Page, template_path: str, region_selector: str | None = None, primary_selector: str = "") -> Optional[Dict[str, Any]]:
+def find_peaks(res: np.ndarray, min_score: float, top_k: int, window: int = 3):
     """
-    Performs multi-scale template matching + NMS.
-    Clicks the best detected position if successful.
-    Returns True if clicked, False otherwise.
+    Vectorized peak detection on a matchTemplate response map.
+
+    A pixel is a peak if it is the maximum of its `window` × `window` neighbourhood and
+    scores at least `min_score`. Only the `top_k` strongest peaks are kept.
+    Returns (xs, ys, scores) arrays sorted by descending score.
     """
-    try:
-        # Screenshot (region if provided, else viewport)
-        if region_selector:
-            screenshot_bytes = page.locator(region_selector).screenshot()
-            print(f"Visual search restricted to region: {region_selector}")
-        else:
-            screenshot_bytes = page.screenshot(full_page=False)
+    window = max(3, int(window) | 1)
+    dilated = cv2.dilate(res, np.ones((window, window), np.uint8))
+    ys, xs = np.nonzero((res >= dilated) & (res >= min_score))
+    scores = res[ys, xs]
+    if len(scores) > top_k:
+        keep = np.argpartition(-scores, top_k - 1)[:top_k]
+        xs, ys, scores = xs[keep], ys[keep], scores[keep]
+    order = np.argsort(-scores, kind="stable")
+    return xs[order], ys[order], scores[order]
 
-        img_array = np.frombuffer(screenshot_bytes, np.uint8)
-        page_img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        page_gray = cv2.cvtColor(page_img, cv2.COLOR_BGR2GRAY)
 
-        # 2. Get template (load or auto-capture)
-        template_gray = get_or_capture_template(page, primary_selector, template_path)
-        if template_gray is None:
-            print("No usable template available (could not load or auto-capture)")
-            return None
+def _pyramid_factor(page_shape: tuple, template_shape: tuple) -> float:
+    """
+    Downscale factor for the coarse search: halve (by PYRAMID_DOWNSCALE) as long as the
+    smallest scaled template keeps at least PYRAMID_MIN_TEMPLATE_SIDE pixels on its short side.
+    Returns 1.0 when the image is too small for a pyramid to pay off.
+    """
+    if page_shape[0] * page_shape[1] < PYRAMID_MIN_IMAGE_AREA:
+        return 1.0
+    smallest_side = min(template_shape) * min(SCALES)
+    factor = 1.0
+    for _ in range(PYRAMID_MAX_LEVELS):
+        if smallest_side * factor * PYRAMID_DOWNSCALE < PYRAMID_MIN_TEMPLATE_SIDE:
+            break
+        factor *= PYRAMID_DOWNSCALE
+    return factor
+
+
+def _collect_matches(res: np.ndarray, offset_x: int, offset_y: int, new_w: int, new_h: int,
+                     all_boxes: list, all_scores: list, threshold: float = VISUAL_THRESHOLD):
+    xs, ys, scores = find_peaks(res, threshold, VISUAL_TOP_K, VISUAL_PEAK_WINDOW)
+    if len(scores):
+        x1, y1 = xs + offset_x, ys + offset_y
+        all_boxes.append(np.stack([x1, y1, x1 + new_w, y1 + new_h], axis=1))
+        all_scores.append(scores)
+
 
-        t_h, t_w = template_gray.shape
+def _resized(template_gray: np.ndarray, width: int, height: int, interpolation: int, variants: dict | None) -> np.ndarray:
+    key = (width, height, interpolation)
+    if variants is not None and key in variants:
+        return variants[key]
+    scaled = cv2.resize(template_gray, (width, height), interpolation=interpolation)
+    if variants is not None:
+        variants[key] = scaled
+    return scaled
 
-        all_boxes = []
-        all_scores = []
 
-        # After loading page_gray and template_gray
-        print("DEBUG: page_gray shape (height, width) =", page_gray.shape)
-        print("DEBUG: template_gray shape (height, width) =", template_gray.shape)
-        print("DEBUG: region used =", region_selector or "full viewport")
+def match_template(page_gray: np.ndarray, template_gray: np.ndarray, variants: dict | None = None,
+                   threshold: float = VISUAL_THRESHOLD) -> Optional[Dict[str, Any]]:
+    """
+    Multi-scale template matching + NMS on an already captured grayscale image.
+    `variants` is an optional memo of resized templates (TEMPLATE_STORE.variants(path)),
+    so repeated heals do not resize the template again.
+    Returns {'box': [x1, y1, x2, y2], 'score': ..., 'detections': ...} in image coordinates,
+    or None if nothing matches above `threshold` (VISUAL_THRESHOLD).
+
+    Large images are searched coarse-to-fine: every scale is matched on a downscaled
+    image/template pair, and only small windows around the best coarse peaks are
+    re-matched at full resolution. Extra entries in SCALES therefore cost a coarse pass each,
+    not a full-frame one.
+    """
+    t_h, t_w = template_gray.shape
+    p_h, p_w = page_gray.shape
 
-        # 3. Multi-scale matching
+    all_boxes = []
+    all_scores = []
+    scales_tried = []
+
+    logger.debug(f"DEBUG: page_gray {p_h} × {p_w}, template_gray {t_h} × {t_w}")
+
+    factor = _pyramid_factor(page_gray.shape, template_gray.shape)
+    if factor == 1.0:
+        # Small image: plain full-resolution multi-scale matching
         for scale in SCALES:
             new_w, new_h = int(t_w * scale), int(t_h * scale)
-            print(f"Scale {scale:.2f}: scaled template = {new_h} × {new_w}")
-            if new_h > page_gray.shape[0] or new_w > page_gray.shape[1]:
-                print(f"  → SKIPPED (larger than page {page_gray.shape[0]} × {page_gray.shape[1]})")
+            if new_h > p_h or new_w > p_w or new_w < 1 or new_h < 1:
+                logger.debug(f"Scale {scale:.2f}: SKIPPED (template {new_h} × {new_w} larger than page)")
                 continue
 
-            scaled = cv2.resize(template_gray, (new_w, new_h))
+            scales_tried.append(scale)
+            scaled = _resized(template_gray, new_w, new_h, cv2.INTER_LINEAR, variants)
             res = cv2.matchTemplate(page_gray, scaled, cv2.TM_CCOEFF_NORMED)
-            max_val = cv2.minMaxLoc(res)[1]
-            print(f"Scale {scale:.2f} - Max correlation: {max_val:.4f}")
-
-            loc = np.where(res >= VISUAL_THRESHOLD)
-            for pt in zip(*loc[::-1]):
-                box = [pt[0], pt[1], pt[0] + new_w, pt[1] + new_h]
-                score = res[pt[1], pt[0]]
-                all_boxes.append(box)
-                all_scores.append(score)
-
-        if not all_boxes:
-            print(f"No visual matches above threshold {VISUAL_THRESHOLD}")
-            return None
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Scale {scale:.2f} - Max correlation: {cv2.minMaxLoc(res)[1]:.4f}")
+            _collect_matches(res, 0, 0, new_w, new_h, all_boxes, all_scores, threshold)
+    else:
+        # 1. Coarse pass: every scale on the downscaled image
+        coarse_page = cv2.resize(page_gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        c_h, c_w = coarse_page.shape
+        coarse_min = threshold - PYRAMID_COARSE_SLACK
+        peaks = []                                  # (coarse score, scale, x, y) in coarse coordinates
+        for scale in SCALES:
+            cw, ch = int(t_w * scale * factor), int(t_h * scale * factor)
+            if ch > c_h or cw > c_w or cw < 1 or ch < 1:
+                logger.debug(f"Scale {scale:.2f}: SKIPPED (template larger than page)")
+                continue
+            scales_tried.append(scale)
+            coarse_template = _resized(template_gray, cw, ch, cv2.INTER_AREA, variants)
+            res = cv2.matchTemplate(coarse_page, coarse_template, cv2.TM_CCOEFF_NORMED)
+            # Neighbourhood ≈ template size, so one element does not use up every refine slot
+            xs, ys, scores = find_peaks(res, coarse_min, PYRAMID_TOP_PEAKS, min(cw, ch))
+            peaks.extend((float(score), scale, int(x), int(y)) for x, y, score in zip(xs, ys, scores))
 
-        # 4. Apply Non-max suppression
-        picked = non_max_suppression(all_boxes, all_scores, overlap_thresh=0.3)
-        if not picked:
-            print("All matches suppressed by NMS")
-            return None
+        peaks.sort(key=lambda p: p[0], reverse=True)
+        peaks = peaks[:PYRAMID_TOP_PEAKS]
+        logger.debug(f"Pyramid coarse pass (factor {factor:.3f}, {len(SCALES)} scales): {len(peaks)} peaks to refine")
+        TELEMETRY.annotate(refined_peaks=len(peaks))
 
-        # Take the highest remaining
-        best_idx = picked[0]
-        best_box = all_boxes[best_idx]
-        best_score = all_scores[best_idx]
+        # 2. Refine: full-resolution matching in a small window around each coarse peak
+        margin = int(np.ceil(1 / factor)) + PYRAMID_REFINE_MARGIN
+        for coarse_score, scale, x, y in peaks:
+            new_w, new_h = int(t_w * scale), int(t_h * scale)
+            scaled = _resized(template_gray, new_w, new_h, cv2.INTER_LINEAR, variants)
+            x0 = max(0, int(x / factor) - margin)
+            y0 = max(0, int(y / factor) - margin)
+            x1 = min(p_w, int(x / factor) + new_w + margin)
+            y1 = min(p_h, int(y / factor) + new_h + margin)
+            window = page_gray[y0:y1, x0:x1]
+            if window.shape[0] < new_h or window.shape[1] < new_w:
+                continue
+            res = cv2.matchTemplate(window, scaled, cv2.TM_CCOEFF_NORMED)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Scale {scale:.2f} - coarse {coarse_score:.4f} → refined {cv2.minMaxLoc(res)[1]:.4f} at ({x0}, {y0})")
+            _collect_matches(res, x0, y0, new_w, new_h, all_boxes, all_scores, threshold)
 
-        local_center_x = int((best_box[0] + best_box[2]) // 2)
-        local_center_y = int((best_box[1] + best_box[3]) // 2)
+    TELEMETRY.annotate(image=f"{p_w}x{p_h}", pyramid_factor=round(factor, 3), scales=scales_tried)
+    if not all_boxes:
+        logger.info(f"No visual matches above threshold {threshold}")
+        return None
+
+    all_boxes = np.concatenate(all_boxes)
+    all_scores = np.concatenate(all_scores)
+
+    # Apply Non-max suppression
+    picked = non_max_suppression(all_boxes, all_scores, overlap_thresh=NMS_OVERLAP_THRESHOLD)
+    if not picked:
+        logger.info("All matches suppressed by NMS")
+        return None
+
+    # Take the highest remaining
+    best_idx = picked[0]
+    TELEMETRY.annotate(best_score=round(float(all_scores[best_idx]), 4), detections=len(picked))
+    return {'box': [int(v) for v in all_boxes[best_idx]], 'score': float(all_scores[best_idx]),
+            'detections': len(picked)}
 
-        # Get global coordinates
+
+def _device_scale(image_width: int, css_box: dict | None) -> float:
+    """Screenshot pixels per CSS pixel (2 on a HiDPI context); 1 when the CSS size is unknown."""
+    return image_width / css_box['width'] if css_box and css_box.get('width') else 1.0
+
+
+def match_with_prior(viewport_gray: np.ndarray, template_gray: np.ndarray, variants: dict | None = None,
+                     primary_selector: str = "", viewport: dict | None = None) -> Optional[Dict[str, Any]]:
+    """
+    match_template on a viewport screenshot, trying the spatial prior's windows around the
+    element's expected position first (smallest first) and the full frame only if they all miss.
+    The prior is kept in CSS pixels of `viewport` (page.viewport_size; the screenshot size when
+    unknown), the screenshot may be in device pixels. The returned box is in screenshot pixels.
+    """
+    p_h, p_w = viewport_gray.shape
+    scale = _device_scale(p_w, viewport)
+    css_size = (viewport['width'], viewport['height']) if viewport else (p_w, p_h)
+    t_h, t_w = template_gray.shape
+    windows = SPATIAL_PRIOR.windows(primary_selector, css_size, (t_h / scale, t_w / scale)) if primary_selector else []
+    windows = [tuple(int(round(v * scale)) for v in window) for window in windows]
+    TELEMETRY.annotate(prior_windows=len(windows))
+    for i, (x0, y0, x1, y1) in enumerate(windows):
+        match = match_template(viewport_gray[y0:y1, x0:x1], template_gray, variants)
+        if match is not None:
+            box = match['box']
+            match['box'] = [box[0] + x0, box[1] + y0, box[2] + x0, box[3] + y0]
+            TELEMETRY.annotate(prior_hit=i)
+            logger.debug(f"Visual match inside prior window {i} ({x0}, {y0}, {x1}, {y1})")
+            return match
+    if windows:
+        logger.debug(f"No match in {len(windows)} prior windows → full frame")
+    return match_template(viewport_gray, template_gray, variants)
+
+
+def _record_position(primary_selector: str, box: list[int], offset_x: float, offset_y: float, viewport,
+                     scale: float = 1.0):
+    """Records a match `box` found at (offset_x, offset_y) of a screenshot, converted to CSS pixels."""
+    if primary_selector:
+        SPATIAL_PRIOR.record(primary_selector, {'x': (box[0] + offset_x) / scale, 'y': (box[1] + offset_y) / scale,
+                                                'width': (box[2] - box[0]) / scale,
+                                                'height': (box[3] - box[1]) / scale}, viewport)
+
+
+def try_visual_fallback(page: Page, template_path: str, region_selector: str | None = None, primary_selector: str = "") -> Optional[Dict[str, Any]]:
+    """
+    Performs multi-scale template matching + NMS.
+    Returns {'type': 'coord', 'x': ..., 'y': ..., 'score': ...} in viewport coordinates, or None.
+    """
+    try:
+        # Screenshot: one rect lookup + a clipped capture for a region, else the viewport
+        region_box = None
         if region_selector:
-            # Get bounding box of the region locator (global viewport coords)
-            region_locator = page.locator(region_selector)
-            region_box = region_locator.bounding_box(timeout=8000)  # x, y, width, height
+            region_box = region_rect(page, region_selector)
             if region_box:
-                global_x = int(region_box['x'] + local_center_x)
-                global_y = int(region_box['y'] + local_center_y)
-                print(f"→ Region offset: x={region_box['x']}, y={region_box['y']}")
+                logger.debug(f"Visual search restricted to region: {region_selector} → {region_box}")
             else:
-                print("→ Region bounding box not found — falling back to local coords")
-                global_x, global_y = local_center_x, local_center_y
+                logger.info("→ Region not visible in the viewport — searching the full viewport")
+        page_gray = capture_gray(page, region_box)
+
+        # 2. Get template (load or auto-capture)
+        template_gray = get_or_capture_template(page, primary_selector, template_path)
+        if template_gray is None:
+            logger.info("No usable template available (could not load or auto-capture)")
+            return None
+
+        logger.debug(f"DEBUG: region used = {region_selector if region_box else 'full viewport'}")
+        if region_box:
+            match = match_template(page_gray, template_gray, TEMPLATE_STORE.variants(template_path))
         else:
-            # Full viewport screenshot — local is already global
-            global_x, global_y = local_center_x, local_center_y
-
-        print(f"→ Local center (relative to region): ({local_center_x}, {local_center_y})")
-        print(
-            f"→ Global click position (full viewport): ({global_x}, {global_y}) | Score: {best_score:.3f} | Unique detections: {len(picked)}")
-
-        # Optional: Save debug image with click marker
-        debug_img = cv2.cvtColor(page_gray, cv2.COLOR_GRAY2BGR)
-        cv2.circle(debug_img, (local_center_x, local_center_y), radius=8, color=(0, 0, 255), thickness=-1)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        debug_path = f"debug_click_{timestamp}.png"
-        cv2.imwrite(debug_path, debug_img)
-        print(f"Debug image with click marker saved: {debug_path}")
+            match = match_with_prior(page_gray, template_gray, TEMPLATE_STORE.variants(template_path), primary_selector,
+                                     page.viewport_size)
+        if match is None:
+            return None
+
+        best_box = match['box']
+        best_score = match['score']
+
+        # Screenshot (device) pixels; clicks and the region rectangle are in CSS pixels
+        scale = _device_scale(page_gray.shape[1], region_box or page.viewport_size)
+        local_center_x = int((best_box[0] + best_box[2]) // 2)
+        local_center_y = int((best_box[1] + best_box[3]) // 2)
+
+        # Get global coordinates: the clip rectangle is the region's viewport offset
+        offset_x, offset_y = (region_box['x'], region_box['y']) if region_box else (0, 0)
+        global_x = int(round(offset_x + local_center_x / scale))
+        global_y = int(round(offset_y + local_center_y / scale))
+        if region_box:
+            logger.debug(f"→ Region offset: x={region_box['x']}, y={region_box['y']}")
+
+        logger.debug(f"→ Local center (relative to region): ({local_center_x}, {local_center_y})")
+        logger.info(
+            f"→ Global click position (full viewport): ({global_x}, {global_y}) | Score: {best_score:.3f} | Unique detections: {match['detections']}")
+
+        _record_position(primary_selector, best_box, offset_x * scale, offset_y * scale, page.viewport_size, scale)
+        ARTIFACT_WRITER.save_debug_marker(page_gray, local_center_x, local_center_y, primary_selector, best_score)
         return {'type': 'coord', 'x': global_x, 'y': global_y, 'score': best_score}
 
     except Exception as e:
-        print(f"Visual fallback error: {e}")
-        return None
\ No newline at end of file
+        logger.warning(f"Visual fallback error: {e}")
+        return None
+
+
+def locate_in_viewport(viewport_gray: np.ndarray, template_path: str, region_box: dict | None = None,
+                       primary_selector: str = "", viewport: dict | None = None,
+                       template_gray: np.ndarray | None = None) -> Optional[Dict[str, Any]]:
+    """
+    Pure CPU part of the visual tier: match the stored template inside a viewport screenshot,
+    optionally cropped to region_box ({x, y, width, height} in CSS pixels).
+    `viewport` is page.viewport_size: the screenshot may be in device pixels (e.g. 2× on HiDPI),
+    region, result and spatial prior are in CSS pixels. Without it, both are taken to be the same.
+    Without a region, the spatial prior of `primary_selector` narrows the search first.
+    `template_gray` is the template when the caller already has it (e.g. just auto-captured
+    with get_or_capture_template); otherwise it is read from TEMPLATE_STORE.
+    Returns {'type': 'coord', 'x': ..., 'y': ..., 'score': ...} in viewport coordinates, or None.
+    """
+    if template_gray is None:
+        template_gray = TEMPLATE_STORE.get(template_path)
+    if template_gray is None:
+        logger.info(f"No usable template available: {os.path.basename(template_path)}")
+        return None
+
+    scale = _device_scale(viewport_gray.shape[1], viewport)
+    offset_x, offset_y = 0, 0
+    search_gray = viewport_gray
+    if region_box:
+        offset_x, offset_y = max(0, int(region_box['x'] * scale)), max(0, int(region_box['y'] * scale))
+        search_gray = viewport_gray[offset_y:offset_y + int(region_box['height'] * scale),
+                                    offset_x:offset_x + int(region_box['width'] * scale)]
+
+    if region_box:
+        match = match_template(search_gray, template_gray, TEMPLATE_STORE.variants(template_path))
+    else:
+        match = match_with_prior(search_gray, template_gray, TEMPLATE_STORE.variants(template_path), primary_selector,
+                                 viewport)
+    if match is None:
+        return None
+
+    best_box = match['box']
+    global_x = int(round((offset_x + (best_box[0] + best_box[2]) / 2) / scale))
+    global_y = int(round((offset_y + (best_box[1] + best_box[3]) / 2) / scale))
+    _record_position(primary_selector, best_box, offset_x, offset_y, viewport or viewport_gray.shape[::-1], scale)
+    return {'type': 'coord', 'x': global_x, 'y': global_y, 'score': match['score']}
+
+
+def try_visual_fallback_batch(page: Page, targets: list[tuple[str, str, str | None]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Visual fallback for several elements at once.
+
+    targets: list of (primary_selector, template_path, region_selector).
+    Takes ONE viewport screenshot and matches every template against it; region selectors
+    are applied by cropping that screenshot to the region's bounding box.
+    Returns {primary_selector: coord result or None}.
+    """
+    results: Dict[str, Optional[Dict[str, Any]]] = {selector: None for selector, _, _ in targets}
+    if not targets:
+        return results
+    try:
+        viewport_gray = capture_gray(page)
+    except Exception as e:
+        logger.warning(f"Visual fallback error: {e}")
+        return results
+
+    regions: dict[str, dict | None] = {}            # one rectangle lookup per region selector
+    for primary_selector, template_path, region_selector in targets:
+        try:
+            region_box = None
+            if region_selector:
+                if region_selector not in regions:
+                    regions[region_selector] = region_rect(page, region_selector)
+                region_box = regions[region_selector]
+                if region_box:
+                    logger.debug(f"Visual search for {primary_selector} restricted to region: {region_selector}")
+                else:
+                    logger.info(f"→ Region {region_selector} not visible in the viewport — searching the full viewport")
+
+            # Same template lookup as the single-selector tier: auto-captured when missing
+            template_gray = get_or_capture_template(page, primary_selector, template_path)
+            if template_gray is None:
+                continue
+            result = locate_in_viewport(viewport_gray, template_path, region_box, primary_selector, page.viewport_size,
+                                        template_gray)
+            if result:
+                logger.info(f"→ Visual match for {primary_selector}: ({result['x']}, {result['y']}) | Score: {result['score']:.3f}")
+            results[primary_selector] = result
+        except Exception as e:
+            logger.warning(f"Visual fallback error for {primary_selector}: {e}")
+
+    return results